@@ -1,142 +1,152 @@
 from flask import Flask, jsonify, send_from_directory
-from flask_mysqldb import MySQL
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
+from flask_migrate import Migrate
+import importlib
+import logging
 import os
 import sys
+import threading
 from dotenv import load_dotenv
-import nltk
 
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)
-app.static_folder = 'static'
+from config import config_by_name, engine_options
+from models import db
 
-app.config['MYSQL_HOST'] = os.getenv('DB_HOST', 'localhost')
-app.config['MYSQL_USER'] = os.getenv('DB_USER', 'root')
-app.config['MYSQL_PASSWORD'] = os.getenv('DB_PASSWORD', 'admin')
-app.config['MYSQL_DB'] = os.getenv('DB_NAME', 'forum_db')
-app.config['MYSQL_CURSORCLASS'] = 'DictCursor'
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'migrations')
+
+# render_as_batch: ALTER TABLE di SQLite dijalankan lewat salin-tabel
+migrate = Migrate(directory=MIGRATIONS_DIR, render_as_batch=True)
+
+# (modul, nama blueprint, url_prefix); None berarti memakai url_prefix blueprint sendiri
+BLUEPRINTS = [
+    ('routes.auth_routes', 'auth_bp', '/api/auth'),
+    ('routes.chat_routes', 'chat_bp', '/api'),
+    ('routes.forum_routes', 'forum_bp', None),
+    ('routes.comment_routes', 'comment_bp', None),
+    ('routes.notification_routes', 'notification_bp', None),
+    ('routes.food_detection_routes', 'food_detection_bp', '/food_detection'),
+    ('routes.nutrition_routes', 'nutrition_bp', '/nutrition'),
+    ('routes.assessment_routes', 'assessment_bp', '/assessment'),
+]
+
+
+def import_models():
+    """Meng-import semua model agar terdaftar di metadata SQLAlchemy."""
+    from models.user import User
+    from models.forum import Forum
+    from models.comment import Comment
+    from models.notification import Notification
+    from models.like import Like
+    from models.daily_nutrition import DailyNutrition
+    from models.daily_nutrition_log import DailyNutritionLog
+    from models.meal_log import MealLog
+    from models.weekly_assessment import WeeklyAssessment
+    from models.search_index import SearchDocument, SearchPosting
+    from models.chat_session import ChatSessionState, ChatMessageLog
+
+
+def register_blueprints(app):
+    for module_name, attribute, url_prefix in BLUEPRINTS:
+        try:
+            blueprint = getattr(importlib.import_module(module_name), attribute)
+        except ImportError:
+            logger.exception("Gagal mengimpor %s, rute dilewati", module_name)
+            continue
+        if url_prefix is None:
+            app.register_blueprint(blueprint)
+        else:
+            app.register_blueprint(blueprint, url_prefix=url_prefix)
+
+
+def register_core_routes(app):
+    @app.route('/uploads/<path:filename>')
+    def uploaded_file(filename):
+        return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+
+    @app.route('/')
+    def index():
+        return jsonify({'message': 'API Forum berjalan', 'status': 'active'})
+
+    @app.route('/health/db')
+    def db_health():
+        # Status pool koneksi worker ini: ukuran, koneksi terpakai, checkout dan waktu tunggu
+        from utils.db_pool import pool_status
+        return jsonify(pool_status(db.engine))
+
+    @app.errorhandler(404)
+    def not_found(error):
+        return jsonify({'success': False, 'message': 'Endpoint tidak ditemukan'}), 404
+
+    @app.errorhandler(500)
+    def server_error(error):
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+
+def _warm_up_chatbot(app):
+    from routes.chat_routes import warm_up_chatbot
+    with app.app_context():
+        warm_up_chatbot()
+
+
+def create_app(config_name=None, **overrides):
+    """
+    Membuat aplikasi Flask.
+
+    Args:
+        config_name: 'development', 'production' atau 'testing'
+                     (default: env FLASK_CONFIG, lalu 'development')
+        **overrides: Nilai config yang menimpa kelas config, mis. SQLALCHEMY_DATABASE_URI
+    """
+    config_name = config_name or os.getenv('FLASK_CONFIG', 'development')
+    app = Flask(__name__)
+    app.config.from_object(config_by_name[config_name])
+    app.config.update(overrides)
+    if 'SQLALCHEMY_ENGINE_OPTIONS' not in overrides:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+            app.config['SQLALCHEMY_DATABASE_URI'],
+            pool_size=app.config['DB_POOL_SIZE'],
+            max_overflow=app.config['DB_MAX_OVERFLOW'],
+            pool_recycle=app.config['DB_POOL_RECYCLE'],
+            pool_timeout=app.config['DB_POOL_TIMEOUT'],
+            pool_pre_ping=app.config['DB_POOL_PRE_PING']
+        )
+    app.static_folder = 'static'
+    CORS(app)
+
+    db.init_app(app)
+    migrate.init_app(app, db)
+    JWTManager(app)
+
+    from services.notification_dispatcher import notification_dispatcher
+    from services.notification_hub import notification_hub
+    notification_dispatcher.init_app(app)
+    notification_hub.init_app(app)
 
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URI', 
-    f"mysql://{os.getenv('DB_USER', 'root')}:{os.getenv('DB_PASSWORD', 'admin')}@{os.getenv('DB_HOST', 'localhost')}/{os.getenv('DB_NAME', 'forum_db')}")
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'topics'), exist_ok=True)
 
-mysql = MySQL(app)
+    import_models()
+    if app.config['AUTO_CREATE_TABLES']:
+        with app.app_context():
+            db.create_all()
 
-from models import db
-db.init_app(app)  
+    register_blueprints(app)
+    register_core_routes(app)
 
-app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'super-secret-key')
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = 3600
-jwt = JWTManager(app)
+    # Komponen chatbot dibuat saat request chat pertama; CHATBOT_WARM_UP membangunnya
+    # di background segera setelah worker boot
+    if app.config['CHATBOT_WARM_UP']:
+        threading.Thread(target=_warm_up_chatbot, args=(app,), daemon=True).start()
 
-app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static/uploads')
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+    return app
 
-try:
-    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-    os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'topics'), exist_ok=True)
-    print("✅ Direktori upload berhasil dibuat")
-except Exception as e:
-    print(f"❌ Error saat membuat direktori upload: {str(e)}")
-
-with app.app_context():
-    try:
-        from models.user import User
-        from models.forum import Forum
-        from models.comment import Comment
-        from models.notification import Notification
-        from models.like import Like
-        from models.daily_nutrition import DailyNutrition
-        from models.daily_nutrition_log import DailyNutritionLog
-        from models.weekly_assessment import WeeklyAssessment
-
-        db.create_all()
-        print("✅ Semua tabel berhasil diinisialisasi")
-    except Exception as e:
-        import traceback
-        print(f"❌ Error saat menginisialisasi tabel: {str(e)}")
-        print(traceback.format_exc())
-
-try:
-    from routes.auth_routes import auth_bp
-    app.register_blueprint(auth_bp, url_prefix='/api/auth')
-    print("✅ Rute auth berhasil didaftarkan")
-except ImportError as e:
-    print(f"❌ Error saat mengimpor auth_routes: {str(e)}")
-
-try:
-    from routes.chat_routes import chat_bp
-    app.register_blueprint(chat_bp, url_prefix='/api')
-    print("✅ Rute chat berhasil didaftarkan")
-except ImportError as e:
-    print(f"❌ Error saat mengimpor chat_routes: {str(e)}")
-
-try:
-    from routes.forum_routes import forum_bp
-    app.register_blueprint(forum_bp)
-    print("✅ Rute forum berhasil didaftarkan")
-except ImportError as e:
-    print(f"❌ Error saat mengimpor forum_routes: {str(e)}")
-
-try:
-    from routes.comment_routes import comment_bp
-    app.register_blueprint(comment_bp)
-    print("✅ Rute comment berhasil didaftarkan")
-except ImportError as e:
-    print(f"❌ Error saat mengimpor comment_routes: {str(e)}")
-
-try:
-    from routes.notification_routes import notification_bp
-    app.register_blueprint(notification_bp)
-    print("✅ Rute notification berhasil didaftarkan")
-except ImportError as e:
-    print(f"❌ Error saat mengimpor notification_routes: {str(e)}")
-
-try:
-    from routes.food_detection_routes import food_detection_bp
-    app.register_blueprint(food_detection_bp, url_prefix='/food_detection')
-    print("✅ Rute food detection berhasil didaftarkan")    
-except ImportError as e:
-    print(f"❌ Error saat mengimpor notification_routes: {str(e)}")
-
-try:
-    from routes.nutrition_routes import nutrition_bp
-    app.register_blueprint(nutrition_bp, url_prefix='/nutrition')
-    print("✅ Rute nutrition berhasil didaftarkan")    
-except ImportError as e:
-    print(f"❌ Error saat mengimpor nutrition_routes: {str(e)}")
-
-try:
-    from routes.assessment_routes import assessment_bp
-    app.register_blueprint(assessment_bp, url_prefix='/assessment')
-    print("✅ Rute assessment berhasil didaftarkan")    
-except ImportError as e:
-    print(f"❌ Error saat mengimpor assessment_routes: {str(e)}")
-
-
-# Routes
-@app.route('/uploads/<path:filename>')
-def uploaded_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
-
-@app.route('/')
-def index():
-    return jsonify({'message': 'API Forum berjalan', 'status': 'active'})
-
-@app.errorhandler(404)
-def not_found(error):
-    return jsonify({'success': False, 'message': 'Endpoint tidak ditemukan'}), 404
-
-@app.errorhandler(500)
-def server_error(error):
-    return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
 
 # Run the app
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
-    app.run(debug=True, host='0.0.0.0', port=port)
+    create_app().run(debug=True, host='0.0.0.0', port=port)
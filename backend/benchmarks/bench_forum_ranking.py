@@ -0,0 +1,155 @@
+# benchmarks/bench_forum_ranking.py
+"""
+Benchmark sorting daftar forum (created_at, likes, hot) pada 100k forum.
+
+Jalankan dari direktori backend:
+    python benchmarks/bench_forum_ranking.py [--forums 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from sqlalchemy import text
+
+from models import db
+from models.user import User
+from models.forum import Forum, compute_hot_score
+from models.comment import Comment
+from models.like import Like
+from models.notification import Notification
+from models.daily_nutrition import DailyNutrition
+from models.daily_nutrition_log import DailyNutritionLog
+from models.weekly_assessment import WeeklyAssessment
+from services.forum_service import (
+    FORUM_SORT_COLUMNS, forum_listing_query, apply_forum_sort, get_forum_page, get_forum_cursor_page
+)
+from utils.pagination import encode_cursor
+
+PER_PAGE = 20
+
+
+def create_bench_app(db_path):
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{db_path}',
+        SQLALCHEMY_TRACK_MODIFICATIONS=False
+    )
+    db.init_app(app)
+    return app
+
+
+def seed(total_forums, total_users=100):
+    now = datetime.utcnow()
+    db.session.execute(User.__table__.insert(), [
+        {
+            'username': f'user{i}', 'email': f'user{i}@example.com', 'password': 'x',
+            'age': 25, 'height': 160, 'weight': 55, 'created_at': now, 'is_admin': False
+        }
+        for i in range(1, total_users + 1)
+    ])
+
+    rng = random.Random(42)
+    batch = []
+    for i in range(total_forums):
+        created_at = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+        likes = int(rng.paretovariate(1.2)) - 1
+        dislikes = rng.randint(0, 3)
+        batch.append({
+            'title': f'Forum {i}', 'description': 'Deskripsi forum benchmark',
+            'created_at': created_at, 'updated_at': created_at,
+            'user_id': rng.randint(1, total_users),
+            'like_count': likes, 'dislike_count': dislikes, 'comment_count': rng.randint(0, 20),
+            'hot_score': compute_hot_score(likes, dislikes, created_at)
+        })
+        if len(batch) == 10000:
+            db.session.execute(Forum.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(Forum.__table__.insert(), batch)
+    db.session.commit()
+    db.session.execute(text('ANALYZE'))
+
+
+def explain(sort_by):
+    query = apply_forum_sort(forum_listing_query(), sort_by, 'desc').limit(PER_PAGE)
+    statement = query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+    plan = db.session.execute(text(f'EXPLAIN QUERY PLAN {statement}')).fetchall()
+    return ' | '.join(row[-1] for row in plan)
+
+
+def best_of(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+        db.session.remove()
+    return best * 1000
+
+
+def time_page(sort_by, page):
+    """Waktu query item satu halaman (tanpa COUNT total)."""
+    def run():
+        apply_forum_sort(forum_listing_query(), sort_by, 'desc') \
+            .limit(PER_PAGE).offset((page - 1) * PER_PAGE).all()
+    return best_of(run)
+
+
+def time_cursor_page(sort_by, page):
+    """Waktu satu halaman mode cursor yang dimulai di posisi halaman ke-page (tanpa COUNT)."""
+    column = FORUM_SORT_COLUMNS[sort_by]
+    cursor = ''
+    if page > 1:
+        forum, _ = apply_forum_sort(forum_listing_query(), sort_by, 'desc') \
+            .offset((page - 1) * PER_PAGE - 1).first()
+        cursor = encode_cursor([getattr(forum, column.key), forum.id], f'forums:{sort_by}:desc')
+        db.session.remove()
+    return best_of(lambda: get_forum_cursor_page(
+        cursor=cursor, limit=PER_PAGE, sort_by=sort_by, with_total=False))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--forums', type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_bench_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            start = time.perf_counter()
+            seed(args.forums)
+            print(f"Seed {args.forums} forum: {time.perf_counter() - start:.1f}s\n")
+
+            pages = [1, 10, 100, 1000]
+            print("Mode page/per_page (OFFSET):")
+            print(f"{'sort_by':<12}" + ''.join(f"{'page ' + str(p):>12}" for p in pages))
+            for sort_by in ('created_at', 'likes', 'hot'):
+                timings = [time_page(sort_by, page) for page in pages]
+                print(f"{sort_by:<12}" + ''.join(f"{t:>10.2f}ms" for t in timings))
+
+            print(f"\nMode cursor (include_total=false):")
+            print(f"{'sort_by':<12}" + ''.join(f"{'page ' + str(p):>12}" for p in pages))
+            for sort_by in ('created_at', 'likes', 'hot'):
+                timings = [time_cursor_page(sort_by, page) for page in pages]
+                print(f"{sort_by:<12}" + ''.join(f"{t:>10.2f}ms" for t in timings))
+
+            count_ms = best_of(lambda: forum_listing_query().order_by(None).count())
+            full_ms = best_of(lambda: get_forum_page(page=1, per_page=PER_PAGE, sort_by='hot'))
+            print(f"\nCOUNT(*) total untuk paginate(): {count_ms:.2f}ms")
+            print(f"get_forum_page() halaman 1 (item + COUNT): {full_ms:.2f}ms")
+
+            print("\nQuery plan halaman pertama:")
+            for sort_by in ('created_at', 'likes', 'hot'):
+                print(f"  {sort_by:<12}{explain(sort_by)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# benchmarks/bench_intent_classifier.py
+"""
+Benchmark akurasi dan latensi intent classifier TF-IDF vs deteksi keyword NLPEngine.
+
+Akurasi diukur dengan stratified k-fold pada chatbot/data/intents.json (model dilatih
+ulang per fold, keyword tidak perlu dilatih). Latensi diukur pada pesan chat asli
+dari folder sessions/, per pesan (classify) dan per batch (classify_many).
+
+Jalankan dari direktori backend:
+    python benchmarks/bench_intent_classifier.py [--folds 5] [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sklearn.model_selection import StratifiedKFold
+
+from bench_nlp_engine import SESSIONS_DIR, load_corpus
+from chatbot.intent_classifier import IntentClassifier, load_intent_examples
+from chatbot.nlp_engine import NLPEngine
+
+
+def cross_validate(texts, labels, folds, engine):
+    model_correct = keyword_correct = 0
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=7)
+    for train_index, test_index in splitter.split(texts, labels):
+        classifier = IntentClassifier(model_path=None).train(
+            [texts[i] for i in train_index], [labels[i] for i in train_index]
+        )
+        test_texts = [texts[i] for i in test_index]
+        predictions = classifier.classify_many(
+            [engine._clean_text(text) for text in test_texts], fallback=engine._detect_intent
+        )
+        for i, (intent, _) in zip(test_index, predictions):
+            model_correct += intent == labels[i]
+        for i, intent in zip(test_index, engine.detect_intents(test_texts)):
+            keyword_correct += intent == labels[i]
+    return model_correct / len(texts), keyword_correct / len(texts)
+
+
+def per_message(fn, corpus, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message in corpus:
+            fn(message)
+    return (time.perf_counter() - start) / (repeat * len(corpus))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--sessions', default=SESSIONS_DIR)
+    args = parser.parse_args()
+
+    texts, labels = load_intent_examples()
+    keyword_engine = NLPEngine()
+    model_accuracy, keyword_accuracy = cross_validate(texts, labels, args.folds, keyword_engine)
+    print(f"{len(texts)} contoh berlabel, {len(set(labels))} intent, {args.folds}-fold\n")
+    print(f"{'akurasi':<24}{'TF-IDF + fallback':>20}{model_accuracy:>10.1%}")
+    print(f"{'':<24}{'keyword':>20}{keyword_accuracy:>10.1%}\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'intent_model.joblib')
+        start = time.perf_counter()
+        IntentClassifier(model_path=model_path).ensure_loaded()
+        train_time = time.perf_counter() - start
+        classifier = IntentClassifier(model_path=model_path)
+        start = time.perf_counter()
+        classifier.ensure_loaded()
+        load_time = time.perf_counter() - start
+    print(f"{'latih + simpan':<24}{train_time * 1000:>28.1f}ms")
+    print(f"{'muat artefak':<24}{load_time * 1000:>28.1f}ms\n")
+
+    # Intent hanya dideteksi untuk pesan user; balasan bot (panjang) sebagai kasus terburuk
+    corpora = [
+        ('pesan user', load_corpus(args.sessions, user_only=True)),
+        ('semua pesan', load_corpus(args.sessions)),
+    ]
+    print(f"{'latensi per pesan':<32}{'classify':>12}{'classify_many':>16}{'keyword':>12}")
+    for name, corpus in corpora:
+        corpus = [keyword_engine._clean_text(m) for m in corpus]
+        average_length = sum(len(m) for m in corpus) / len(corpus)
+        single = per_message(classifier.classify, corpus, args.repeat)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            classifier.classify_many(corpus)
+        batch = (time.perf_counter() - start) / (args.repeat * len(corpus))
+        keyword = per_message(keyword_engine._detect_intent, corpus, args.repeat)
+        label = f"{name} ({len(corpus)}, ~{average_length:.0f} kar.)"
+        print(f"{label:<32}{single * 1e6:>10.1f}µs{batch * 1e6:>14.1f}µs{keyword * 1e6:>10.1f}µs")
+
+if __name__ == '__main__':
+    main()
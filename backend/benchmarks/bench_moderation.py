@@ -0,0 +1,97 @@
+# benchmarks/bench_moderation.py
+"""
+Benchmark pemeriksaan kata terlarang: cara lama (regex per kata) vs satu regex
+alternation vs automaton Aho-Corasick, pada daftar 10k kata.
+
+Jalankan dari direktori backend:
+    python benchmarks/bench_moderation.py [--words 10000] [--comments 5000]
+"""
+import argparse
+import os
+import random
+import re
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.aho_corasick import AhoCorasick
+
+VOCABULARY = (
+    "saya ibu hamil trimester pertama sering mual muntah apakah aman makan telur ikan salmon "
+    "bayam brokoli kacang susu dokter bilang harus cukup zat besi asam folat kalsium jangan lupa "
+    "minum air putih olahraga ringan jalan pagi yoga prenatal tidur cukup terima kasih infonya bunda"
+).split()
+
+
+def random_words(rng, total):
+    words = set()
+    while len(words) < total:
+        words.add(''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10))))
+    return sorted(words)
+
+
+def random_comments(rng, total, forbidden):
+    comments = []
+    for _ in range(total):
+        words = [rng.choice(VOCABULARY) for _ in range(rng.randint(10, 60))]
+        if rng.random() < 0.05:
+            words.insert(rng.randrange(len(words)), rng.choice(forbidden))
+        comments.append(' '.join(words))
+    return comments
+
+
+def legacy_check(content, forbidden):
+    """Cara lama: satu regex per kata untuk setiap pemeriksaan."""
+    content_lower = content.lower()
+    for word in forbidden:
+        if word and re.search(r'\b' + re.escape(word) + r'\b', content_lower):
+            return True
+    return False
+
+
+def timed(fn, items):
+    start = time.perf_counter()
+    hits = sum(1 for item in items if fn(item))
+    return time.perf_counter() - start, hits
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--words', type=int, default=10000)
+    parser.add_argument('--comments', type=int, default=5000)
+    parser.add_argument('--legacy-sample', type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    forbidden = random_words(rng, args.words)
+    comments = random_comments(rng, args.comments, forbidden)
+    print(f"{len(forbidden)} kata terlarang, {len(comments)} komentar\n")
+
+    start = time.perf_counter()
+    automaton = AhoCorasick(forbidden)
+    build_ac = time.perf_counter() - start
+
+    start = time.perf_counter()
+    alternation = re.compile(r'\b(?:' + '|'.join(map(re.escape, forbidden)) + r')\b')
+    build_re = time.perf_counter() - start
+
+    sample = comments[:args.legacy_sample]
+    legacy_time, _ = timed(lambda c: legacy_check(c, forbidden), sample)
+    legacy_per = legacy_time / len(sample)
+
+    re_time, re_hits = timed(lambda c: alternation.search(c.lower()) is not None, comments)
+    ac_time, ac_hits = timed(lambda c: automaton.search(c.lower(), whole_words=True) is not None, comments)
+    assert re_hits == ac_hits
+
+    print(f"{'metode':<28}{'build':>10}{'per komentar':>16}{'total':>12}")
+    print(f"{'regex per kata (lama)':<28}{'-':>10}{legacy_per * 1e6:>13.1f}µs"
+          f"{legacy_per * len(comments):>11.2f}s  (diekstrapolasi dari {len(sample)} komentar)")
+    print(f"{'satu regex alternation':<28}{build_re * 1000:>8.1f}ms{re_time / len(comments) * 1e6:>13.1f}µs{re_time:>11.2f}s")
+    print(f"{'Aho-Corasick':<28}{build_ac * 1000:>8.1f}ms{ac_time / len(comments) * 1e6:>13.1f}µs{ac_time:>11.2f}s")
+    print(f"\nKomentar yang ditandai: {ac_hits}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# benchmarks/bench_nlp_engine.py
+"""
+Benchmark deteksi intent/entitas NLPEngine: loop substring per keyword (cara lama)
+vs satu automaton Aho-Corasick, pada pesan chat asli dari folder sessions/.
+
+Tabel keyword diperbesar dengan keyword sintetis (--extra-keywords) untuk melihat
+bagaimana biaya per pesan tumbuh seiring jumlah keyword.
+
+Jalankan dari direktori backend:
+    python benchmarks/bench_nlp_engine.py [--extra-keywords 0 500 5000] [--repeat 200]
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from chatbot.nlp_engine import NLPEngine
+
+SESSIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'sessions')
+
+
+def load_corpus(directory, user_only=False):
+    """Pesan dari file sesi .json lama dan .jsonl (user dan bot, atau hanya user)."""
+    messages = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+        if path.endswith('.context.json'):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            messages.extend(json.load(f).get('messages', []))
+    for path in sorted(glob.glob(os.path.join(directory, '*.jsonl'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    messages.append(json.loads(line))
+                except ValueError:
+                    continue
+    return [m.get('content') for m in messages
+            if m.get('content') and (m.get('is_user') or not user_only)]
+
+
+def legacy_analyze(engine, message):
+    """Cara lama: `keyword in message` untuk setiap keyword setiap intent dan entitas."""
+    cleaned = engine._clean_text(message)
+    intent_scores = {intent: sum(1 for keyword in keywords if keyword in cleaned)
+                     for intent, keywords in engine.intent_keywords.items()}
+    entities = {}
+    for entity_type, keywords in engine.entity_keywords.items():
+        for keyword in keywords:
+            if keyword in cleaned:
+                if entity_type.startswith('trimester_'):
+                    entities['trimester'] = entity_type.split('_')[1]
+                else:
+                    entities['food_item'] = entity_type
+    return intent_scores, entities
+
+
+def grow_keywords(engine, extra, rng):
+    """Menambah keyword sintetis (tidak muncul di korpus) ke tabel intent dan entitas."""
+    for i in range(extra):
+        keyword = ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 12)))
+        if i % 2:
+            engine.intent_keywords.setdefault(f'intent_sintetis_{i % 20}', []).append(keyword)
+        else:
+            engine.entity_keywords.setdefault(f'entitas_sintetis_{i % 50}', []).append(keyword)
+    engine._build_keyword_matcher()
+
+
+def timed(fn, corpus, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message in corpus:
+            fn(message)
+    return (time.perf_counter() - start) / (repeat * len(corpus))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sessions', default=SESSIONS_DIR)
+    parser.add_argument('--extra-keywords', type=int, nargs='+', default=[0, 500, 5000])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.sessions)
+    if not corpus:
+        sys.exit(f"Tidak ada pesan di {args.sessions}")
+    average_length = sum(len(m) for m in corpus) / len(corpus)
+    print(f"{len(corpus)} pesan dari {args.sessions}, rata-rata {average_length:.0f} karakter\n")
+
+    print(f"{'keyword':>8}{'substring loop':>18}{'Aho-Corasick':>16}{'process_message':>18}{'intent beda':>14}")
+    for extra in args.extra_keywords:
+        engine = NLPEngine()
+        grow_keywords(engine, extra, random.Random(7))
+        keyword_count = sum(len(k) for k in engine.intent_keywords.values()) + \
+            sum(len(k) for k in engine.entity_keywords.values())
+
+        legacy_per = timed(lambda m: legacy_analyze(engine, m), corpus, args.repeat)
+        matcher_per = timed(lambda m: engine._match_keywords(engine._clean_text(m)), corpus, args.repeat)
+        process_per = timed(engine.process_message, corpus, args.repeat)
+
+        # Perbedaan hanya berasal dari keyword pendek yang kini harus berupa kata utuh
+        differing = 0
+        for message in corpus:
+            scores, _ = legacy_analyze(engine, message)
+            legacy_intent = max(scores.items(), key=lambda x: x[1])[0] if any(scores.values()) else 'general_query'
+            differing += legacy_intent != engine.process_message(message)['intent']
+
+        print(f"{keyword_count:>8}{legacy_per * 1e6:>16.1f}µs{matcher_per * 1e6:>14.1f}µs"
+              f"{process_per * 1e6:>16.1f}µs{differing:>14}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/bench_response_cache.py
+"""
+Benchmark ResponseCache pada cache penuh: cara lama (dict + min() atas timestamp
+setiap kali cache penuh, O(n) per set) vs LRU berbasis OrderedDict (O(1)).
+
+Cache diisi sampai --entries lalu diukur latensi set (selalu memicu eviction)
+dan get (hit), per operasi.
+
+Jalankan dari direktori backend:
+    python benchmarks/bench_response_cache.py [--entries 100000] [--ops 500]
+"""
+import argparse
+import hashlib
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from chatbot.response_cache import ResponseCache
+
+
+class DictCache:
+    """Salinan ResponseCache lama: eviction mencari entri tertua dengan min()."""
+    def __init__(self, max_size, ttl=3600):
+        self.cache = {}
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self.cache:
+                timestamp, response = self.cache[key]
+                if time.time() - timestamp <= self.ttl:
+                    return response
+                del self.cache[key]
+            return None
+
+    def set(self, key, response):
+        with self._lock:
+            self.cache[key] = (time.time(), response)
+            if len(self.cache) > self.max_size:
+                oldest_key = min(self.cache.keys(), key=lambda k: self.cache[k][0])
+                del self.cache[oldest_key]
+
+
+def make_key(i):
+    return hashlib.sha256(str(i).encode()).hexdigest()
+
+
+def measure(cache, entries, ops):
+    response = 'Jawaban contoh tentang gizi ibu hamil. ' * 20
+    for i in range(entries):
+        cache.set(make_key(i), response)
+
+    started = time.perf_counter()
+    for i in range(entries, entries + ops):
+        cache.set(make_key(i), response)
+    set_time = (time.perf_counter() - started) / ops
+
+    keys = [make_key(i) for i in range(entries, entries + ops)]
+    started = time.perf_counter()
+    for key in keys:
+        assert cache.get(key) is not None
+    get_time = (time.perf_counter() - started) / ops
+    return set_time, get_time
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entries', type=int, default=100000)
+    parser.add_argument('--ops', type=int, default=500)
+    args = parser.parse_args()
+
+    caches = {
+        'dict + min()': DictCache(max_size=args.entries),
+        # Batas byte dibuat longgar agar yang diukur hanya eviction berdasarkan jumlah entri
+        'OrderedDict LRU': ResponseCache(max_size=args.entries, max_bytes=1 << 40),
+    }
+    print(f"{'cache':<18}{'set (µs)':>12}{'get (µs)':>12}   ({args.entries} entri, {args.ops} operasi)")
+    for name, cache in caches.items():
+        set_time, get_time = measure(cache, args.entries, args.ops)
+        print(f"{name:<18}{set_time * 1e6:>12.1f}{get_time * 1e6:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/bench_startup.py
+"""
+Benchmark waktu startup modul chat: lama import routes.chat_routes, warm-up
+komponen chatbot, dan latensi request /api/chat pertama vs berikutnya.
+
+Setiap skenario dijalankan di proses Python baru agar import benar-benar dingin:
+- lazy: komponen dibuat oleh request pertama
+- warm: warm_up_chatbot() dipanggil sebelum request pertama (seperti CHATBOT_WARM_UP=true)
+
+Jalankan dari direktori backend:
+    python benchmarks/bench_startup.py [--runs 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def child(mode):
+    started = time.perf_counter()
+    sys.path.insert(0, BACKEND_DIR)
+    from routes.chat_routes import chat_bp, warm_up_chatbot
+    import_time = time.perf_counter() - started
+
+    from flask import Flask
+    from models import db
+
+    app = Flask(__name__)
+    app.config.update(TESTING=True, SQLALCHEMY_DATABASE_URI='sqlite://', SQLALCHEMY_TRACK_MODIFICATIONS=False)
+    db.init_app(app)
+    app.register_blueprint(chat_bp, url_prefix='/api')
+    with app.app_context():
+        db.create_all()
+
+    warm_up_time = 0.0
+    if mode == 'warm':
+        started = time.perf_counter()
+        warm_up_chatbot()
+        warm_up_time = time.perf_counter() - started
+
+    client = app.test_client()
+    latencies = []
+    for message in ('Apa makanan yang baik untuk trimester pertama?', 'Bagaimana mencegah stunting?'):
+        started = time.perf_counter()
+        response = client.post('/api/chat', json={'message': message, 'user_id': 'bench'})
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    print(json.dumps({'import': import_time, 'warm_up': warm_up_time,
+                      'first': latencies[0], 'second': latencies[1]}))
+
+
+def run(mode):
+    # Log dan file sesi dari proses anak ditulis ke direktori sementara
+    with tempfile.TemporaryDirectory() as tmp:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', mode],
+            cwd=tmp, capture_output=True, text=True, check=True,
+            env=dict(os.environ, PYTHONPATH=BACKEND_DIR)
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--child')
+    args = parser.parse_args()
+    if args.child:
+        child(args.child)
+        return
+
+    print(f"{'skenario':<10}{'import':>12}{'warm-up':>12}{'request 1':>12}{'request 2':>12}   (median {args.runs} run)")
+    for mode in ('lazy', 'warm'):
+        runs = [run(mode) for _ in range(args.runs)]
+        median = {key: sorted(r[key] for r in runs)[len(runs) // 2] for key in runs[0]}
+        print(f"{mode:<10}" + ''.join(f"{median[key] * 1000:>10.1f}ms" for key in ('import', 'warm_up', 'first', 'second')))
+
+
+if __name__ == '__main__':
+    main()
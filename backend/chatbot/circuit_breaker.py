@@ -0,0 +1,73 @@
+"""
+Circuit breaker untuk panggilan ke API eksternal (Gemini).
+
+Setelah ``failure_threshold`` kegagalan berturut-turut, circuit terbuka dan
+panggilan ditolak tanpa menunggu API selama ``reset_timeout`` detik, sehingga
+request langsung memakai generator lokal. Setelah itu satu panggilan percobaan
+diizinkan (half-open): berhasil menutup circuit, gagal membukanya lagi.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Circuit breaker sederhana yang aman dipakai dari banyak thread."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow(self) -> bool:
+        """True jika panggilan boleh dilakukan; dipanggil sekali per request"""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            # Saat half-open, percobaan yang tidak pernah melapor dianggap hilang setelah reset_timeout
+            if self._clock() - self._opened_at >= self.reset_timeout:
+                self._state = HALF_OPEN
+                self._opened_at = self._clock()
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._state = OPEN
+                self._opened_at = self._clock()
+                self._failures = 0
+                self.times_opened += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout": self.reset_timeout,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
@@ -8,6 +8,12 @@ from typing import Dict, Any, Optional, List, Tuple, Union
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, TimeoutError
 
+from chatbot.response_cache import (  # noqa: F401
+    DEFAULT_MAX_BYTES, ResponseCache, build_cache_key, kb_fingerprint, normalize_message
+)
+from chatbot.circuit_breaker import OPEN, CircuitBreaker
+from chatbot.single_flight import SingleFlight
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -18,6 +24,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger("GeminiIntegration")
 
+
+class GeminiUnavailableError(Exception):
+    """Gemini tidak bisa menjawab (circuit terbuka atau semua percobaan gagal); pakai generator lokal."""
+    pass
+
+
 class ModelConfig:
     """Konfigurasi model yang dapat disesuaikan"""
     def __init__(
@@ -47,38 +59,6 @@ class ModelConfig:
             "stop_sequences": self.stop_sequences
         }
 
-class ResponseCache:
-    """Cache untuk menyimpan respons dari API Gemini"""
-    def __init__(self, max_size: int = 100, ttl: int = 3600):
-        self.cache = {}
-        self.max_size = max_size
-        self.ttl = ttl  
-    
-    def _generate_key(self, prompt: str) -> str:
-        """Generate unique key for prompt"""
-        return hashlib.md5(prompt.encode()).hexdigest()
-    
-    def get(self, prompt: str) -> Optional[str]:
-        """Get response from cache if exists and not expired"""
-        key = self._generate_key(prompt)
-        if key in self.cache:
-            timestamp, response = self.cache[key]
-            if time.time() - timestamp <= self.ttl:
-                logger.info(f"Cache hit for prompt: {prompt[:50]}...")
-                return response
-            else:
-                del self.cache[key]
-        return None
-    
-    def set(self, prompt: str, response: str) -> None:
-        """Set response in cache"""
-        key = self._generate_key(prompt)
-        self.cache[key] = (time.time(), response)
-
-        if len(self.cache) > self.max_size:
-            oldest_key = min(self.cache.keys(), key=lambda k: self.cache[k][0])
-            del self.cache[oldest_key]
-
 class GeminiIntegration:
     """Integrasi dengan Gemini API untuk generasi respons"""
     
@@ -94,11 +74,15 @@ class GeminiIntegration:
         model_name: str = 'gemini-2.0-flash',
         fallback_model: str = 'gemini-1.5-flash',
         enable_cache: bool = True,
-        cache_size: int = 100,
+        cache_size: Optional[int] = None,
         cache_ttl: int = 3600,
+        cache_max_bytes: int = DEFAULT_MAX_BYTES,
+        cache: Optional[Any] = None,
         timeout: int = 30,
-        max_retries: int = 3,
-        retry_delay: int = 2
+        request_budget: float = 20,
+        max_concurrency: int = 8,
+        circuit_failure_threshold: int = 5,
+        circuit_reset_timeout: float = 30
     ):
         # Validasi model
         if model_name not in self.AVAILABLE_MODELS:
@@ -115,15 +99,23 @@ class GeminiIntegration:
         self.model_name = model_name
         self.fallback_model = fallback_model
         self.timeout = timeout
-        self.max_retries = max_retries
-        self.retry_delay = retry_delay
+        # Batas waktu total satu request (model utama dan model fallback)
+        self.request_budget = request_budget
         self.last_request_time = 0
         self.request_count = 0
+        self._inflight = SingleFlight()
+        # Satu executor untuk semua panggilan API. Panggilan yang timeout tidak ditunggu;
+        # jumlah thread dibatasi max_concurrency sehingga panggilan yang macet tidak menumpuk thread
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='gemini')
+        self.circuit_breaker = CircuitBreaker(circuit_failure_threshold, circuit_reset_timeout)
         
         # Inisialisasi cache jika diaktifkan
         self.enable_cache = enable_cache
         if enable_cache:
-            self.cache = ResponseCache(max_size=cache_size, ttl=cache_ttl)
+            # Cache bersama (mis. TieredResponseCache dari create_response_cache) bisa dioper dari luar
+            self.cache = cache if cache is not None else ResponseCache(
+                max_size=cache_size, ttl=cache_ttl, max_bytes=cache_max_bytes
+            )
         
         try:
             # Konfigurasi Gemini API
@@ -153,6 +145,41 @@ class GeminiIntegration:
     ) -> str:
         """Generate response using Gemini API with advanced error handling and retries"""
         
+        # Gunakan konfigurasi default jika tidak disediakan
+        if not model_config:
+            model_config = ModelConfig()
+        
+        # Cek cache sebelum membangun prompt; key tidak memuat bagian prompt yang berubah-ubah
+        cache_key = build_cache_key(user_message, nlp_result, kb_data, self.model_name, model_config)
+        if self.enable_cache:
+            cached_response = self.cache.get(cache_key)
+            if cached_response:
+                return cached_response
+        
+        # Permintaan dengan key yang sama yang datang selama panggilan API berjalan
+        # menunggu hasil panggilan itu, bukan memanggil API lagi
+        return self._inflight.do(
+            cache_key, self._generate_uncached, user_message, nlp_result, kb_data, model_config, cache_key
+        )
+    
+    def _generate_uncached(
+        self,
+        user_message: str,
+        nlp_result: Dict[str, Any],
+        kb_data: Dict[str, Any],
+        model_config: ModelConfig,
+        cache_key: str
+    ) -> str:
+        """
+        Membangun prompt dan memanggil API (model utama lalu model fallback, tanpa retry), lalu menyimpan hasil ke cache.
+
+        Raises:
+            GeminiUnavailableError: Jika circuit terbuka atau semua percobaan gagal dalam request_budget
+        """
+        if not self.circuit_breaker.allow():
+            raise GeminiUnavailableError("Circuit breaker Gemini terbuka")
+        deadline = time.monotonic() + self.request_budget
+        
         # Format knowledge base data for prompt
         kb_context = self._format_kb_data(kb_data)
         
@@ -162,16 +189,6 @@ class GeminiIntegration:
         # Log prompt untuk debugging (hanya sebagian untuk menghindari log yang terlalu panjang)
         logger.debug(f"Prompt untuk Gemini (truncated): {prompt[:200]}...")
         
-        # Cek cache jika diaktifkan
-        if self.enable_cache:
-            cached_response = self.cache.get(prompt)
-            if cached_response:
-                return cached_response
-        
-        # Gunakan konfigurasi default jika tidak disediakan
-        if not model_config:
-            model_config = ModelConfig()
-        
         # Catat waktu permintaan untuk rate limiting
         current_time = time.time()
         time_since_last_request = current_time - self.last_request_time
@@ -181,58 +198,66 @@ class GeminiIntegration:
         # Log statistik permintaan
         logger.info(f"Request #{self.request_count}, time since last request: {time_since_last_request:.2f}s")
         
-        # Coba generate response dengan model utama dan retries
-        for attempt in range(1, self.max_retries + 1):
-            try:
-                # Gunakan ThreadPoolExecutor untuk menerapkan timeout
-                with ThreadPoolExecutor(max_workers=1) as executor:
-                    future = executor.submit(
-                        self._call_gemini_api,
-                        prompt=prompt,
-                        model=self.model,
-                        model_name=self.model_name,
-                        config=model_config
-                    )
-                    
-                    # Tunggu hasil dengan timeout
-                    response_text = future.result(timeout=self.timeout)
-                    
-                    # Simpan ke cache jika berhasil dan cache diaktifkan
-                    if self.enable_cache:
-                        self.cache.set(prompt, response_text)
-                    
-                    return response_text
-                    
-            except TimeoutError:
-                logger.warning(f"Timeout pada percobaan {attempt}/{self.max_retries} untuk model {self.model_name}")
-                
-            except Exception as e:
-                logger.error(f"Error pada percobaan {attempt}/{self.max_retries} untuk model {self.model_name}: {str(e)}")
-                
-            # Jika masih ada percobaan tersisa, tunggu sebelum mencoba lagi
-            if attempt < self.max_retries:
-                delay = self.retry_delay * attempt  # Exponential backoff
-                logger.info(f"Menunggu {delay} detik sebelum percobaan berikutnya...")
-                time.sleep(delay)
+        # Satu percobaan per model tanpa retry/backoff di dalam request, agar thread request tidak
+        # tertahan menunggu API yang sedang gagal. Kegagalan beruntun membuka circuit breaker, dan
+        # selama terbuka request langsung memakai generator lokal
+        response_text = self._attempt(prompt, self.model, self.model_name, model_config, deadline)
         
-        # Jika semua percobaan gagal dan ada model fallback, coba gunakan model fallback
-        if self.fallback_model_instance:
+        # Jika model utama gagal dan ada model fallback, langsung coba model fallback
+        if response_text is None and self.fallback_model_instance and self.circuit_breaker.state != OPEN:
             logger.info(f"Mencoba menggunakan model fallback: {self.fallback_model}")
-            try:
-                response_text = self._call_gemini_api(
-                    prompt=prompt,
-                    model=self.fallback_model_instance,
-                    model_name=self.fallback_model,
-                    config=model_config
-                )
-                return response_text
-            except Exception as e:
-                logger.error(f"Error saat menggunakan model fallback: {str(e)}")
+            response_text = self._attempt(
+                prompt, self.fallback_model_instance, self.fallback_model, model_config, deadline
+            )
+        
+        if response_text is not None:
+            # Simpan ke cache jika berhasil dan cache diaktifkan
+            if self.enable_cache:
+                self.cache.set(cache_key, response_text)
+            return response_text
         
-        # Jika semua upaya gagal, kembalikan pesan error
-        error_message = f"Maaf, terjadi kesalahan saat memproses pertanyaan Anda. Semua upaya untuk menggunakan Gemini API gagal setelah {self.max_retries} percobaan."
+        # Jika semua upaya gagal, route memakai generator lokal
+        error_message = f"Semua upaya untuk menggunakan Gemini API gagal (batas {self.request_budget} detik)"
         logger.error(error_message)
-        return error_message
+        raise GeminiUnavailableError(error_message)
+    
+    def _attempt(
+        self,
+        prompt: str,
+        model: Any,
+        model_name: str,
+        config: ModelConfig,
+        deadline: float
+    ) -> Optional[str]:
+        """Satu panggilan API lewat executor bersama; None jika gagal atau timeout"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        future = self._executor.submit(
+            self._call_gemini_api,
+            prompt=prompt,
+            model=model,
+            model_name=model_name,
+            config=config
+        )
+        try:
+            # Waktu antre di executor ikut dihitung dalam timeout
+            response_text = future.result(timeout=min(self.timeout, remaining))
+        except TimeoutError:
+            # Belum berjalan: dibatalkan; sudah berjalan: dibiarkan selesai di background
+            future.cancel()
+            logger.warning(f"Timeout setelah {min(self.timeout, remaining):.1f} detik untuk model {model_name}")
+        except Exception as e:
+            logger.error(f"Error saat memanggil model {model_name}: {str(e)}")
+        else:
+            self.circuit_breaker.record_success()
+            return response_text
+        self.circuit_breaker.record_failure()
+        return None
+    
+    def close(self) -> None:
+        """Menghentikan executor tanpa menunggu panggilan yang masih berjalan"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
     
     def _call_gemini_api(
         self, 
@@ -419,7 +444,10 @@ Jika ada informasi yang tidak lengkap, sampaikan dengan jujur dan berikan altern
             "primary_model": self.model_name,
             "fallback_model": self.fallback_model,
             "cache_enabled": self.enable_cache,
-            "max_retries": self.max_retries,
             "timeout": self.timeout,
-            "available_models": self.AVAILABLE_MODELS
+            "available_models": self.AVAILABLE_MODELS,
+            "request_budget": self.request_budget,
+            "cache": self.cache.stats() if self.enable_cache else None,
+            "inflight": self._inflight.stats(),
+            "circuit_breaker": self.circuit_breaker.stats()
         }
@@ -0,0 +1,226 @@
+"""
+Intent classifier TF-IDF + regresi logistik, dilatih dari chatbot/data/intents.json.
+
+Model disimpan ke disk (joblib) dan dimuat saat pertama kali dipakai; jika artefak
+tidak ada atau data latihnya sudah berubah, model dilatih ulang secara otomatis.
+Prediksi dengan confidence di bawah ``min_confidence`` diserahkan ke fallback
+(deteksi keyword NLPEngine).
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import Counter
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import sklearn
+from scipy.sparse import hstack
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DEFAULT_INTENTS_FILE = os.path.join(DATA_DIR, 'intents.json')
+DEFAULT_MODEL_FILE = os.path.join(DATA_DIR, 'intent_model.joblib')
+
+# Di bawah nilai ini prediksi model dianggap tidak meyakinkan
+DEFAULT_MIN_CONFIDENCE = 0.45
+
+FALLBACK_INTENT = 'general_query'
+
+
+def load_intent_examples(path: str = DEFAULT_INTENTS_FILE) -> Tuple[List[str], List[str]]:
+    """Membaca contoh berlabel: (daftar teks, daftar intent)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    texts, labels = [], []
+    for entry in data.get('intents', []):
+        for example in entry.get('examples', []):
+            texts.append(example)
+            labels.append(entry['intent'])
+    return texts, labels
+
+
+def _build_vectorizers() -> List[TfidfVectorizer]:
+    # n-gram karakter menangkap imbuhan dan salah ketik ('kehamilannya', 'telor'),
+    # unigram/bigram kata menangkap frasa ('trimester pertama')
+    return [
+        TfidfVectorizer(analyzer='word', ngram_range=(1, 2), sublinear_tf=True),
+        TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 5), sublinear_tf=True),
+    ]
+
+
+class IntentClassifier:
+    """
+    Classifier intent yang dimuat lazy dan aman dipakai dari banyak thread.
+
+    Contoh:
+        classifier = IntentClassifier()
+        classifier.classify('apa kandungan gizi telur?')  # ('detail_nutrisi', 0.71)
+    """
+
+    def __init__(self, intents_file: str = DEFAULT_INTENTS_FILE, model_path: Optional[str] = DEFAULT_MODEL_FILE,
+                 min_confidence: float = DEFAULT_MIN_CONFIDENCE):
+        self.intents_file = intents_file
+        self.model_path = model_path
+        self.min_confidence = min_confidence
+        self._lock = threading.Lock()
+        self._vectorizers = None
+        self._coef = None
+        self._intercept = None
+        self.labels: List[str] = []
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._coef is not None
+
+    def _fingerprint(self) -> str:
+        """Artefak hanya dipakai jika data latih dan versi scikit-learn sama."""
+        with open(self.intents_file, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        return f'{digest}:{sklearn.__version__}'
+
+    def train(self, texts: Optional[List[str]] = None, labels: Optional[List[str]] = None) -> 'IntentClassifier':
+        """Melatih model dari contoh yang diberikan, atau dari intents_file."""
+        if texts is None:
+            texts, labels = load_intent_examples(self.intents_file)
+        texts = [text.lower() for text in texts]
+        vectorizers = _build_vectorizers()
+        features = hstack([vectorizer.fit_transform(texts) for vectorizer in vectorizers]).tocsr()
+        model = LogisticRegression(C=10.0, max_iter=1000)
+        model.fit(features, labels)
+        coef, intercept = model.coef_, model.intercept_
+        if len(model.classes_) == 2:
+            # Model biner hanya punya bobot kelas positif; sigmoid(z) = softmax([0, z])
+            coef = np.vstack([np.zeros_like(coef), coef])
+            intercept = np.concatenate([[0.0], intercept])
+        self._set_model(vectorizers, coef, intercept, list(model.classes_))
+        return self
+
+    def _set_model(self, vectorizers, coef, intercept, labels) -> None:
+        # Bobot disimpan sebagai array biasa dan dipotong per vectorizer, sehingga inferensi
+        # cukup perkalian sparse x dense tanpa overhead pipeline scikit-learn
+        coef = np.asarray(coef, dtype=np.float64)
+        self._vectorizers = vectorizers
+        self._coef_blocks = []
+        # (analyzer, vocabulary, idf, bobot) untuk jalur cepat satu pesan
+        self._single_blocks = []
+        offset = 0
+        for vectorizer in vectorizers:
+            size = len(vectorizer.vocabulary_)
+            block = np.ascontiguousarray(coef[:, offset:offset + size].T)
+            self._coef_blocks.append(block)
+            self._single_blocks.append((vectorizer.build_analyzer(), vectorizer.vocabulary_, vectorizer.idf_, block))
+            offset += size
+        self._intercept = np.asarray(intercept, dtype=np.float64)
+        self.labels = labels
+        self._coef = coef
+
+    def save(self, path: Optional[str] = None) -> None:
+        path = path or self.model_path
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        joblib.dump({
+            'fingerprint': self._fingerprint(),
+            'vectorizers': self._vectorizers,
+            'coef': self._coef,
+            'intercept': self._intercept,
+            'labels': self.labels,
+        }, tmp_path)
+        os.replace(tmp_path, path)
+
+    def _load_artifact(self) -> bool:
+        if not self.model_path or not os.path.exists(self.model_path):
+            return False
+        try:
+            artifact = joblib.load(self.model_path)
+            if artifact.get('fingerprint') != self._fingerprint():
+                return False
+            self._set_model(artifact['vectorizers'], artifact['coef'], artifact['intercept'], artifact['labels'])
+            return True
+        except Exception:
+            logger.warning("Artefak intent classifier %s tidak bisa dimuat, melatih ulang", self.model_path,
+                           exc_info=True)
+            return False
+
+    def ensure_loaded(self) -> 'IntentClassifier':
+        """Memuat artefak dari disk, atau melatih (dan menyimpan) model jika belum ada."""
+        if self.is_loaded:
+            return self
+        with self._lock:
+            if self.is_loaded or self._load_artifact():
+                return self
+            self.train()
+            if self.model_path:
+                try:
+                    self.save()
+                except OSError:
+                    logger.warning("Gagal menyimpan artefak intent classifier ke %s", self.model_path,
+                                   exc_info=True)
+        return self
+
+    def _single_scores(self, message: str) -> np.ndarray:
+        """
+        Skor satu pesan tanpa TfidfVectorizer.transform: TF-IDF (sublinear tf, norma L2)
+        dihitung langsung dari n-gram yang ada di vocabulary. Hasilnya sama dengan
+        jalur batch, tetapi tanpa overhead validasi dan matriks sparse scikit-learn.
+        """
+        scores = self._intercept.copy()
+        for analyzer, vocabulary, idf, coef in self._single_blocks:
+            counts = Counter(vocabulary[term] for term in analyzer(message) if term in vocabulary)
+            if not counts:
+                continue
+            indices = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+            values = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+            values *= idf[indices]
+            values /= np.sqrt(values @ values)
+            scores += values @ coef[indices]
+        return scores[np.newaxis, :]
+
+    def predict_proba(self, messages: List[str]) -> np.ndarray:
+        """Probabilitas per intent (kolom mengikuti ``labels``) untuk sekumpulan pesan."""
+        self.ensure_loaded()
+        messages = [message.lower() for message in messages]
+        if len(messages) == 1:
+            scores = self._single_scores(messages[0])
+        else:
+            scores = np.tile(self._intercept, (len(messages), 1))
+            for vectorizer, coef in zip(self._vectorizers, self._coef_blocks):
+                scores += vectorizer.transform(messages) @ coef
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+    def classify_many(self, messages: Iterable[str],
+                      fallback: Optional[Callable[[str], str]] = None) -> List[Tuple[str, float]]:
+        """
+        Mengklasifikasikan banyak pesan dalam satu operasi matriks.
+
+        Args:
+            messages: Pesan yang akan diklasifikasikan
+            fallback: Fungsi pesan -> intent untuk prediksi di bawah min_confidence;
+                      tanpa fallback intent tersebut menjadi 'general_query'
+
+        Returns:
+            list: (intent, confidence) untuk setiap pesan
+        """
+        messages = list(messages)
+        if not messages:
+            return []
+        probabilities = self.predict_proba(messages)
+        best = probabilities.argmax(axis=1)
+        results = []
+        for message, index, row in zip(messages, best, probabilities):
+            confidence = float(row[index])
+            if confidence >= self.min_confidence:
+                results.append((self.labels[index], confidence))
+            else:
+                results.append((fallback(message) if fallback else FALLBACK_INTENT, confidence))
+        return results
+
+    def classify(self, message: str, fallback: Optional[Callable[[str], str]] = None) -> Tuple[str, float]:
+        return self.classify_many([message], fallback)[0]
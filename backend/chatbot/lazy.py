@@ -0,0 +1,88 @@
+"""
+Singleton yang dibuat saat pertama kali dipakai.
+
+Komponen chatbot yang mahal dibuat (NLTK, SDK Gemini/OpenAI, file knowledge base)
+tidak lagi dibangun saat modul route di-import, sehingga boot worker dan test
+tidak menanggung biayanya. ``warm_up()`` membangun semuanya lebih awal bila
+diinginkan (mis. sebelum worker menerima request).
+
+Komponen yang membaca ``current_app.config`` didaftarkan dengan ``per_app=True``:
+instance-nya disimpan di ``app.extensions`` sehingga beberapa aplikasi dalam
+satu proses (create_app dengan config berbeda) tidak saling memakai instance.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from flask import current_app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+_registry: Dict[str, 'LazySingleton'] = {}
+
+
+class LazySingleton:
+    """Membungkus factory; ``get()`` memanggil factory sekali lalu mengembalikan hasil yang sama."""
+
+    _UNSET = object()
+
+    def __init__(self, name: str, factory: Callable[[], Any], per_app: bool = False):
+        self.name = name
+        self.factory = factory
+        self.per_app = per_app
+        self._values: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        _registry[name] = self
+
+    def _slots(self) -> Dict[str, Any]:
+        """Tempat instance disimpan: app.extensions aplikasi aktif (per_app) atau milik proses"""
+        if self.per_app and has_app_context():
+            return current_app.extensions.setdefault('lazy_singletons', {})
+        return self._values
+
+    @property
+    def initialized(self) -> bool:
+        return self.name in self._slots()
+
+    def get(self) -> Any:
+        slots = self._slots()
+        value = slots.get(self.name, self._UNSET)
+        if value is self._UNSET:
+            with self._lock:
+                value = slots.get(self.name, self._UNSET)
+                if value is self._UNSET:
+                    started = time.perf_counter()
+                    value = self.factory()
+                    slots[self.name] = value
+                    logger.info("%s diinisialisasi dalam %.1f ms", self.name, (time.perf_counter() - started) * 1000)
+        return value
+
+    def reset(self) -> None:
+        """Membuang instance (milik aplikasi aktif bila per_app) sehingga ``get()`` berikutnya membuat ulang."""
+        with self._lock:
+            self._slots().pop(self.name, None)
+
+
+def warm_up(names: Optional[Iterable[str]] = None) -> Dict[str, float]:
+    """
+    Menginisialisasi singleton terdaftar (semua, atau yang disebut di ``names``).
+
+    Returns:
+        dict: Nama -> waktu inisialisasi (detik); 0 untuk yang sudah siap
+    """
+    timings = {}
+    for name in (names if names is not None else list(_registry)):
+        singleton = _registry[name]
+        started = time.perf_counter()
+        try:
+            singleton.get()
+        except Exception:
+            logger.exception("Warm-up %s gagal", name)
+            continue
+        timings[name] = time.perf_counter() - started
+    return timings
+
+
+def registered() -> Dict[str, LazySingleton]:
+    return dict(_registry)
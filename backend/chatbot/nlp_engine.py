@@ -1,17 +1,56 @@
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
-from nltk.corpus import stopwords
 import re
-from typing import Dict, List, Tuple, Any
+import logging
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Dict, List, Set, Tuple, Any
 
-class NLPEngine:
-    def __init__(self):
-        self.lemmatizer = WordNetLemmatizer()
+from utils.aho_corasick import AhoCorasick, on_word_boundary
+
+# Keywords shorter than this ('hi', 'hai') must match a whole word so they do not fire
+# inside other words ('sehingga', 'hindari'); longer keywords still match as substrings
+# so affixed forms ('kehamilannya', 'makanan') are detected.
+MIN_SUBSTRING_KEYWORD_LENGTH = 4
+
+# Extra keywords used by _analyze_context ('makan' also matches inside 'makanan')
+CONTEXT_KEYWORDS = ('makan',)
+
+
+@lru_cache(maxsize=1)
+def load_stop_words() -> frozenset:
+    """Load the NLTK stopword set once (Indonesian, falling back to English, empty if the corpus is missing)"""
+    # NLTK is imported here rather than at module level: importing it costs ~1s at startup
+    from nltk.corpus import stopwords
+    for language in ('indonesian', 'english'):
         try:
-            self.stop_words = set(stopwords.words('indonesian'))
-        except:
-            self.stop_words = set(stopwords.words('english'))
+            return frozenset(stopwords.words(language))
+        except (LookupError, OSError):
+            continue
+    logging.getLogger(__name__).warning("NLTK stopwords corpus not found, continuing without stopwords")
+    return frozenset()
+
+
+INTENT_MODES = ('keyword', 'classifier')
+
+
+class NLPEngine:
+    def __init__(self, intent_mode: str = 'keyword', intent_classifier=None):
+        """
+        Args:
+            intent_mode: 'keyword' (keyword counting) or 'classifier' (trained TF-IDF model,
+                         falling back to keywords when the model is not confident)
+            intent_classifier: IntentClassifier to use in classifier mode (default: lazily
+                               loaded from chatbot/data)
+        """
+        if intent_mode not in INTENT_MODES:
+            raise ValueError(f"Unknown intent mode: {intent_mode}")
+        self.intent_mode = intent_mode
+        if intent_mode == 'classifier' and intent_classifier is None:
+            from chatbot.intent_classifier import IntentClassifier
+            intent_classifier = IntentClassifier()
+        self.intent_classifier = intent_classifier
+        
+        self._lemmatizer = None
+        self.stop_words = set(load_stop_words())
         
         # Keywords for intent detection
         self.intent_keywords = {
@@ -34,21 +73,67 @@ class NLPEngine:
             'brokoli': ['brokoli'],
             'kacang': ['kacang', 'kacang-kacangan']
         }
+        
+        self._build_keyword_matcher()
+    
+    @property
+    def lemmatizer(self):
+        """WordNet lemmatizer, created on first use"""
+        if self._lemmatizer is None:
+            from nltk.stem import WordNetLemmatizer
+            self._lemmatizer = WordNetLemmatizer()
+        return self._lemmatizer
+    
+    def _build_keyword_matcher(self) -> None:
+        """Compile all intent and entity keywords into one Aho-Corasick automaton"""
+        keywords = [keyword for table in (self.intent_keywords, self.entity_keywords)
+                    for keywords in table.values() for keyword in keywords]
+        keywords.extend(CONTEXT_KEYWORDS)
+        self._keyword_matcher = AhoCorasick(keywords)
+        
+        # keyword -> intents / entity types it belongs to, so scoring only visits the hits
+        self._keyword_intents = defaultdict(list)
+        for intent, intent_keywords in self.intent_keywords.items():
+            for keyword in dict.fromkeys(intent_keywords):
+                self._keyword_intents[keyword].append(intent)
+        self._keyword_entities = defaultdict(list)
+        for entity_type, entity_keywords in self.entity_keywords.items():
+            for keyword in dict.fromkeys(entity_keywords):
+                self._keyword_entities[keyword].append(entity_type)
+        self._intent_order = {intent: index for index, intent in enumerate(self.intent_keywords)}
+        self._entity_order = {entity_type: index for index, entity_type in enumerate(self.entity_keywords)}
+        self._whole_word_keywords = frozenset(
+            keyword for keyword in keywords if len(keyword) < MIN_SUBSTRING_KEYWORD_LENGTH
+        )
+    
+    def _match_keywords(self, message: str) -> Set[str]:
+        """All keywords found in the (cleaned) message, in a single pass"""
+        hits = set()
+        for start, end, keyword in self._keyword_matcher.iter_matches(message):
+            if keyword in self._whole_word_keywords and not on_word_boundary(message, start, end):
+                continue
+            hits.add(keyword)
+        return hits
     
     def process_message(self, message: str) -> Dict[str, Any]:
         """Process user message to extract intent, entities, and context"""
-        # Clean and tokenize message
+        # Clean message and find every intent/entity keyword in one pass
         cleaned_message = self._clean_text(message)
-        tokens = word_tokenize(cleaned_message)
+        keyword_hits = self._match_keywords(cleaned_message)
         
         # Detect intent
-        intent = self._detect_intent(cleaned_message)
+        if self.intent_mode == 'classifier':
+            intent, _ = self.intent_classifier.classify(
+                cleaned_message, fallback=lambda text: self._detect_intent(text, keyword_hits)
+            )
+        else:
+            intent = self._detect_intent(cleaned_message, keyword_hits)
         
         # Recognize entities
-        entities = self._recognize_entities(cleaned_message)
+        entities = self._recognize_entities(cleaned_message, keyword_hits)
         
         # Analyze context
-        context = self._analyze_context(cleaned_message, intent, entities)
+        context = self._analyze_context(cleaned_message, intent, entities, keyword_hits)
         
         # Calculate confidence
         confidence = self._calculate_confidence(intent, entities, context)
@@ -60,46 +145,58 @@ class NLPEngine:
             'confidence': confidence
         }
     
+    def detect_intents(self, messages: List[str]) -> List[str]:
+        """Detect the intent of many messages at once (one matrix operation in classifier mode)"""
+        cleaned = [self._clean_text(message) for message in messages]
+        if self.intent_mode == 'classifier':
+            return [intent for intent, _ in self.intent_classifier.classify_many(cleaned, fallback=self._detect_intent)]
+        return [self._detect_intent(message) for message in cleaned]
+    
     def _clean_text(self, text: str) -> str:
         """Clean text by removing special characters and converting to lowercase"""
         text = text.lower()
         text = re.sub(r'[^\w\s]', ' ', text)
         return text
     
-    def _detect_intent(self, message: str) -> str:
+    def _detect_intent(self, message: str, keyword_hits: Set[str] = None) -> str:
         """Detect the intent of the message"""
+        if keyword_hits is None:
+            keyword_hits = self._match_keywords(message)
+        
         # Count keyword matches for each intent
-        intent_scores = {}
-        for intent, keywords in self.intent_keywords.items():
-            score = sum(1 for keyword in keywords if keyword in message)
-            intent_scores[intent] = score
+        intent_scores = Counter(
+            intent for keyword in keyword_hits for intent in self._keyword_intents.get(keyword, ())
+        )
         
-        # Get intent with highest score
-        if any(intent_scores.values()):
-            max_intent = max(intent_scores.items(), key=lambda x: x[1])
-            if max_intent[1] > 0:
-                return max_intent[0]
+        # Get intent with highest score (ties go to the intent listed first)
+        if intent_scores:
+            return min(intent_scores, key=lambda intent: (-intent_scores[intent], self._intent_order[intent]))
         
         # Default to general query
         return 'general_query'
     
-    def _recognize_entities(self, message: str) -> Dict[str, str]:
+    def _recognize_entities(self, message: str, keyword_hits: Set[str] = None) -> Dict[str, str]:
         """Extract entities from the message"""
+        if keyword_hits is None:
+            keyword_hits = self._match_keywords(message)
         entities = {}
         
-        # Check for trimester entities
-        for entity_type, keywords in self.entity_keywords.items():
-            for keyword in keywords:
-                if keyword in message:
-                    if entity_type.startswith('trimester_'):
-                        entities['trimester'] = entity_type.split('_')[1]
-                    else:
-                        entities['food_item'] = entity_type
+        # Matched entity types in table order; a later type overrides an earlier one
+        entity_types = {entity_type for keyword in keyword_hits
+                        for entity_type in self._keyword_entities.get(keyword, ())}
+        for entity_type in sorted(entity_types, key=self._entity_order.get):
+            if entity_type.startswith('trimester_'):
+                entities['trimester'] = entity_type.split('_')[1]
+            else:
+                entities['food_item'] = entity_type
         
         return entities
     
-    def _analyze_context(self, message: str, intent: str, entities: Dict[str, str]) -> List[str]:
+    def _analyze_context(self, message: str, intent: str, entities: Dict[str, str],
+                         keyword_hits: Set[str] = None) -> List[str]:
         """Analyze the context of the conversation"""
+        if keyword_hits is None:
+            keyword_hits = self._match_keywords(message)
         context = []
         
         if intent == 'nutrisi_kehamilan':
@@ -111,7 +208,7 @@ class NLPEngine:
         if intent == 'detail_nutrisi' and 'food_item' in entities:
             context.append('detail_makanan')
         
-        if 'makanan' in message or 'makan' in message:
+        if 'makan' in keyword_hits:
             context.append('rekomendasi_makanan')
         
         return context
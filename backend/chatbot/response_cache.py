@@ -0,0 +1,406 @@
+"""
+Cache respons LLM (Gemini dan OpenAI).
+
+Dua tingkat:
+
+- ResponseCache: LRU di memori per proses dengan TTL dan batas memori dalam byte.
+  Semua operasi O(1) (amortized): urutan LRU dan urutan kedaluwarsa masing-masing
+  disimpan dalam OrderedDict, sehingga korban eviction selalu ada di depan tanpa
+  memindai seluruh key. Aman dipakai dari banyak thread (dev server, worker gthread).
+- DiskResponseCache: file SQLite (WAL) yang dibagi semua worker gunicorn di host
+  yang sama dan bertahan setelah restart.
+
+TieredResponseCache menggabungkan keduanya; create_response_cache membuatnya dari config.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+DEFAULT_DISK_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_DISK_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache', 'llm_responses.sqlite3'
+)
+
+
+def normalize_message(message: str) -> str:
+    """Huruf kecil, tanda baca dibuang, spasi dirapikan: 'Apa  gizi TELUR?' -> 'apa gizi telur'"""
+    return ' '.join(re.sub(r'[^\w\s]', ' ', message.lower()).split())
+
+
+def kb_fingerprint(kb_data: Dict[str, Any]) -> str:
+    """Hash isi data knowledge base; berubah jika data yang dikirim ke prompt berubah."""
+    payload = json.dumps(kb_data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def build_cache_key(
+    user_message: str,
+    nlp_result: Dict[str, Any],
+    kb_data: Dict[str, Any],
+    model_name: str = '',
+    model_config: Any = None
+) -> str:
+    """
+    Key cache dari input yang menentukan jawaban: pesan yang dinormalisasi, intent,
+    entities, fingerprint data KB, model, dan konfigurasi generasi.
+
+    ``model_config`` boleh berupa ModelConfig (Gemini) atau dict parameter (OpenAI).
+    Bagian prompt yang berubah-ubah (waktu saat ini, confidence) sengaja tidak ikut,
+    sehingga pertanyaan yang sama menghasilkan key yang sama.
+    """
+    if hasattr(model_config, 'to_dict'):
+        model_config = model_config.to_dict()
+    parts = {
+        'message': normalize_message(user_message),
+        'intent': nlp_result.get('intent', 'general_query'),
+        'entities': nlp_result.get('entities', {}),
+        'kb': kb_fingerprint(kb_data),
+        'model': model_name,
+        'config': model_config or None,
+    }
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def entry_size(key: str, response: str) -> int:
+    """Perkiraan memori satu entri: objek key dan respons (termasuk header objek str)."""
+    return sys.getsizeof(key) + sys.getsizeof(response)
+
+
+class ResponseCache:
+    """
+    Cache key -> respons dengan eviction LRU.
+
+    Entri dibuang jika:
+    - umurnya melewati ``ttl`` detik (dibersihkan setiap get/set, bukan hanya saat dibaca)
+    - total ukuran melewati ``max_bytes``, atau jumlah entri melewati ``max_size``;
+      yang paling lama tidak dipakai dibuang lebih dulu
+    """
+
+    def __init__(self, max_size: Optional[int] = None, ttl: float = 3600, max_bytes: int = DEFAULT_MAX_BYTES,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (respons, ukuran); urutan = LRU (paling lama dipakai di depan)
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        # key -> waktu kedaluwarsa; urutan = waktu set (TTL sama untuk semua entri)
+        self._expiry: 'OrderedDict[str, float]' = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            self._expire(self._clock())
+            return key in self._entries
+
+    def _remove(self, key: str) -> None:
+        _, size = self._entries.pop(key)
+        del self._expiry[key]
+        self.bytes -= size
+
+    def _expire(self, now: float) -> None:
+        while self._expiry:
+            key, expires_at = next(iter(self._expiry.items()))
+            if expires_at > now:
+                break
+            self._remove(key)
+            self.expirations += 1
+
+    def get(self, key: str) -> Optional[str]:
+        """Respons untuk key, atau None jika tidak ada/kedaluwarsa"""
+        with self._lock:
+            self._expire(self._clock())
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        logger.debug("Cache hit for key: %s", key[:12])
+        return entry[0]
+
+    def set(self, key: str, response: str) -> None:
+        """Menyimpan respons; entri yang lebih besar dari max_bytes tidak disimpan"""
+        size = entry_size(key, response)
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (response, size)
+            self._expiry[key] = now + self.ttl
+            self.bytes += size
+            while self.bytes > self.max_bytes or (self.max_size is not None and len(self._entries) > self.max_size):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._expiry.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Ukuran cache dan jumlah hit/miss/eviction sejak cache dibuat"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+# Total ukuran disimpan di tabel meta dan dijaga trigger, sehingga pengecekan batas
+# byte tidak perlu SUM() atas seluruh tabel dan tetap benar walau ditulis banyak proses.
+_DISK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_responses_expires_at ON responses (expires_at);
+CREATE INDEX IF NOT EXISTS ix_responses_accessed_at ON responses (accessed_at);
+CREATE TABLE IF NOT EXISTS cache_meta (id INTEGER PRIMARY KEY CHECK (id = 1), total_bytes INTEGER NOT NULL);
+INSERT OR IGNORE INTO cache_meta (id, total_bytes) VALUES (1, 0);
+CREATE TRIGGER IF NOT EXISTS responses_size_insert AFTER INSERT ON responses
+BEGIN UPDATE cache_meta SET total_bytes = total_bytes + new.size WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS responses_size_delete AFTER DELETE ON responses
+BEGIN UPDATE cache_meta SET total_bytes = total_bytes - old.size WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS responses_size_update AFTER UPDATE OF size ON responses
+BEGIN UPDATE cache_meta SET total_bytes = total_bytes + new.size - old.size WHERE id = 1; END;
+"""
+
+# Jumlah entri yang dibuang per DELETE saat total ukuran melewati batas
+_EVICTION_BATCH = 32
+
+
+class DiskResponseCache:
+    """
+    Cache key -> respons dalam file SQLite, dibagi antar proses di host yang sama.
+
+    - Mode WAL: pembaca tidak menunggu penulis; penulisan memakai BEGIN IMMEDIATE
+      dan menunggu lock maksimal ``busy_timeout`` detik.
+    - Entri kedaluwarsa (``ttl``) dihapus setiap kali set; total ukuran dibatasi
+      ``max_bytes`` dengan membuang entri yang paling lama tidak dibaca.
+    - Waktu akses diperbarui paling sering sekali per ``touch_interval`` detik per
+      entri, agar cache hit tidak selalu menjadi penulisan.
+    - Error SQLite (mis. lock terlalu lama) dicatat dan diperlakukan sebagai miss:
+      cache tidak boleh membuat chat gagal.
+
+    Koneksi dibuat per thread dan dibuat ulang setelah fork.
+    """
+
+    def __init__(self, path: str = DEFAULT_DISK_CACHE_PATH, ttl: float = 3600,
+                 max_bytes: int = DEFAULT_DISK_MAX_BYTES, busy_timeout: float = 5.0,
+                 touch_interval: float = 60, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.busy_timeout = busy_timeout
+        self.touch_interval = touch_interval
+        # Waktu dinding, bukan monotonic: nilainya dibandingkan lintas proses dan restart
+        self._clock = clock
+        self._local = threading.local()
+        self._counter_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.errors = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(_DISK_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            # isolation_level=None: transaksi diatur sendiri lewat BEGIN IMMEDIATE
+            local.conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            local.conn.execute('PRAGMA synchronous=NORMAL')
+            local.pid = os.getpid()
+        return local.conn
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._counter_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def get(self, key: str) -> Optional[str]:
+        """Respons untuk key, atau None jika tidak ada/kedaluwarsa/SQLite gagal"""
+        now = self._clock()
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                'SELECT response, expires_at, accessed_at FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                self._count('misses')
+                return None
+            if now - row[2] >= self.touch_interval:
+                conn.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key))
+        except sqlite3.Error as e:
+            logger.warning("Disk cache get gagal: %s", e)
+            self._count('errors')
+            self._count('misses')
+            return None
+        self._count('hits')
+        return row[0]
+
+    def set(self, key: str, response: str) -> None:
+        """Menyimpan respons, lalu membuang entri kedaluwarsa dan entri LRU di atas batas byte"""
+        size = len(key) + len(response.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        now = self._clock()
+        try:
+            conn = self._connection()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute(
+                    'INSERT INTO responses (key, response, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?) '
+                    'ON CONFLICT (key) DO UPDATE SET response = excluded.response, size = excluded.size, '
+                    'expires_at = excluded.expires_at, accessed_at = excluded.accessed_at',
+                    (key, response, size, now + self.ttl, now)
+                )
+                expired = conn.execute('DELETE FROM responses WHERE expires_at <= ?', (now,)).rowcount
+                evicted = 0
+                while self._total_bytes(conn) > self.max_bytes:
+                    deleted = conn.execute(
+                        'DELETE FROM responses WHERE key IN '
+                        '(SELECT key FROM responses WHERE key != ? ORDER BY accessed_at LIMIT ?)',
+                        (key, _EVICTION_BATCH)
+                    ).rowcount
+                    if not deleted:
+                        break
+                    evicted += deleted
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            logger.warning("Disk cache set gagal: %s", e)
+            self._count('errors')
+            return
+        if expired:
+            self._count('expirations', expired)
+        if evicted:
+            self._count('evictions', evicted)
+
+    @staticmethod
+    def _total_bytes(conn: sqlite3.Connection) -> int:
+        return conn.execute('SELECT total_bytes FROM cache_meta WHERE id = 1').fetchone()[0]
+
+    def clear(self) -> None:
+        conn = self._connection()
+        conn.execute('DELETE FROM responses')
+
+    def stats(self) -> Dict[str, Any]:
+        """Isi file cache (semua proses) dan hit/miss milik proses ini"""
+        try:
+            conn = self._connection()
+            size = conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+            total_bytes = self._total_bytes(conn)
+        except sqlite3.Error:
+            size = total_bytes = None
+        with self._counter_lock:
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "size": size,
+                "bytes": total_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "errors": self.errors,
+            }
+
+
+class TieredResponseCache:
+    """
+    LRU memori di depan cache disk: hit di disk disalin ke memori, set ditulis ke keduanya.
+
+    Entri yang disalin dari disk mendapat TTL memori penuh, jadi bisa bertahan paling
+    lama satu TTL memori setelah entri disk-nya kedaluwarsa.
+    """
+
+    def __init__(self, memory: ResponseCache, disk: DiskResponseCache):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> Optional[str]:
+        response = self.memory.get(key)
+        if response is None:
+            response = self.disk.get(key)
+            if response is not None:
+                self.memory.set(key, response)
+        return response
+
+    def set(self, key: str, response: str) -> None:
+        self.memory.set(key, response)
+        self.disk.set(key, response)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        self.disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistik tingkat memori, dengan statistik disk di key ``disk``"""
+        return dict(self.memory.stats(), disk=self.disk.stats())
+
+
+def create_response_cache(config):
+    """
+    Cache respons LLM dari config aplikasi (LLM_CACHE_*): LRU memori, ditambah file
+    SQLite bersama jika LLM_CACHE_DISK aktif. Jika file cache tidak bisa dibuka,
+    hanya tingkat memori yang dipakai.
+    """
+    ttl = config.get('LLM_CACHE_TTL', 3600)
+    memory = ResponseCache(ttl=ttl, max_bytes=config.get('LLM_CACHE_MEMORY_BYTES', DEFAULT_MAX_BYTES))
+    if not config.get('LLM_CACHE_DISK', True):
+        return memory
+    path = config.get('LLM_CACHE_PATH') or DEFAULT_DISK_CACHE_PATH
+    try:
+        disk = DiskResponseCache(path, ttl=ttl, max_bytes=config.get('LLM_CACHE_DISK_MAX_BYTES', DEFAULT_DISK_MAX_BYTES))
+    except (OSError, sqlite3.Error) as e:
+        logger.warning("Cache disk %s tidak dapat dibuka, hanya memakai cache memori: %s", path, e)
+        return memory
+    return TieredResponseCache(memory, disk)
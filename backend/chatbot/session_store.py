@@ -0,0 +1,554 @@
+"""
+Penyimpanan sesi chat.
+
+Riwayat pesan disimpan append-only, sehingga menyimpan satu giliran chat
+berbiaya O(pesan baru), bukan O(seluruh riwayat). Konteks sesi (last_intent,
+last_entities, ...) disimpan terpisah.
+
+Backend default adalah database aplikasi (SqlSessionStore) agar semua worker
+gunicorn melihat sesi yang sama; JsonlSessionStore hanya cocok untuk satu host.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import import_string
+
+from models import db
+from models.chat_session import ChatMessageLog, ChatSessionState
+
+try:
+    import fcntl
+except ImportError:  # Windows: append tetap atomik lewat O_APPEND, tanpa lock antar proses
+    fcntl = None
+
+DEFAULT_SESSIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sessions')
+
+_SAFE_NAME_RE = re.compile(r'[A-Za-z0-9_-][A-Za-z0-9_.-]{0,127}')
+
+# Ukuran blok saat membaca riwayat JSONL dari belakang
+_TAIL_CHUNK_SIZE = 8192
+
+
+# Batas tunggu lock sesi dan lama lease sebelum lock dianggap ditinggalkan (detik)
+DEFAULT_LOCK_TIMEOUT = 30
+DEFAULT_LOCK_TTL = 120
+_LOCK_POLL_INTERVAL = 0.05
+
+
+class InvalidPositionError(ValueError):
+    """Posisi ``before`` tidak menunjuk ke awal pesan dalam riwayat."""
+    pass
+
+
+class SessionLockTimeout(Exception):
+    """Lock sesi masih dipegang request lain setelah batas waktu tunggu."""
+    pass
+
+
+class SessionStore:
+    """
+    Interface penyimpanan sesi chat.
+
+    Pesan berupa dict hasil Message.to_dict(); konteks berupa dict bebas.
+    Backend lain (mis. Redis) cukup mengimplementasikan method di bawah, termasuk
+    ``lock``, lalu dipasang lewat CHAT_SESSION_BACKEND = 'paket.modul:Kelas'.
+    """
+
+    @classmethod
+    def from_config(cls, config) -> 'SessionStore':
+        """Membuat store dari config aplikasi; dipanggil di dalam app context."""
+        return cls()
+
+    @contextmanager
+    def lock(self, user_id: str, timeout: Optional[float] = None):
+        """
+        Lock eksklusif satu sesi, berlaku lintas worker.
+
+        Raises:
+            SessionLockTimeout: Jika lock tidak didapat dalam ``timeout`` detik
+        """
+        raise NotImplementedError
+        yield
+
+    def get_context(self, user_id: str) -> Dict[str, Any]:
+        """Konteks sesi user, dict kosong jika sesi belum ada."""
+        raise NotImplementedError
+
+    def update_context(self, user_id: str, context: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def append_messages(self, user_id: str, messages: List[Dict[str, Any]]) -> None:
+        """Menambahkan pesan ke akhir riwayat secara atomik."""
+        raise NotImplementedError
+
+    def read_messages(self, user_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Seluruh riwayat pesan, None jika sesi belum ada."""
+        raise NotImplementedError
+
+    def read_messages_page(self, user_id: str, before: Optional[int] = None,
+                           limit: int = 20) -> Optional[Tuple[List[Dict[str, Any]], Optional[int]]]:
+        """
+        Maksimal ``limit`` pesan terakhir sebelum posisi ``before`` (urut kronologis).
+
+        Returns:
+            tuple: (pesan, posisi untuk halaman sebelumnya atau None jika sudah di awal),
+                   None jika sesi belum ada
+        """
+        messages = self.read_messages(user_id)
+        if messages is None:
+            return None
+        end = len(messages) if before is None else before
+        if not 0 <= end <= len(messages):
+            raise InvalidPositionError('Posisi riwayat tidak valid')
+        start = max(end - limit, 0)
+        return messages[start:end], (start or None)
+
+
+class _LRUCache:
+    """Cache LRU kecil yang aman dipakai dari banyak thread."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def discard(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+def safe_session_name(user_id: str) -> str:
+    """Nama file yang aman untuk user_id (user_id berasal dari request)."""
+    user_id = str(user_id)
+    if _SAFE_NAME_RE.fullmatch(user_id):
+        return user_id
+    return 'u_' + hashlib.sha256(user_id.encode('utf-8')).hexdigest()[:32]
+
+
+@contextmanager
+def _file_lock(fd: int, exclusive: bool = True):
+    if fcntl is None:
+        yield
+        return
+    fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+    try:
+        yield
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    """Menulis file lewat file sementara + rename sehingga pembaca tidak melihat file setengah jadi."""
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _encode_lines(messages: List[Dict[str, Any]]) -> bytes:
+    return ''.join(json.dumps(message, ensure_ascii=False) + '\n' for message in messages).encode('utf-8')
+
+
+class JsonlSessionStore(SessionStore):
+    """
+    Sesi chat dalam file per user:
+
+    - ``<user>.jsonl``: riwayat pesan, hanya ditambah (O_APPEND + flock)
+    - ``<user>.context.json``: konteks sesi, ditulis ulang secara atomik (kecil)
+
+    File lama ``<user>.json`` dimigrasikan otomatis saat sesi pertama kali diakses.
+    """
+
+    def __init__(self, directory: str = DEFAULT_SESSIONS_DIR, cache_size: int = 256,
+                 lock_timeout: float = DEFAULT_LOCK_TIMEOUT):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.lock_timeout = lock_timeout
+        self._contexts = _LRUCache(cache_size)
+        self._migrate_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config) -> 'JsonlSessionStore':
+        return cls(
+            directory=config.get('CHAT_SESSIONS_DIR') or DEFAULT_SESSIONS_DIR,
+            cache_size=config.get('CHAT_SESSION_CACHE_SIZE', 256),
+            lock_timeout=config.get('CHAT_SESSION_LOCK_TIMEOUT', DEFAULT_LOCK_TIMEOUT)
+        )
+
+    def _path(self, user_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, safe_session_name(user_id) + suffix)
+
+    def messages_path(self, user_id: str) -> str:
+        return self._path(user_id, '.jsonl')
+
+    def _migrate_legacy(self, user_id: str) -> None:
+        """Mengubah file sesi lama (satu dokumen JSON) menjadi JSONL + file konteks."""
+        messages_path = self.messages_path(user_id)
+        legacy_path = self._path(user_id, '.json')
+        if os.path.exists(messages_path) or not os.path.exists(legacy_path):
+            return
+
+        with self._migrate_lock:
+            if os.path.exists(messages_path):
+                return
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+            _write_atomic(self._path(user_id, '.context.json'),
+                          json.dumps(legacy.get('context') or {}, ensure_ascii=False).encode('utf-8'))
+            # File JSONL ditulis terakhir karena keberadaannya menandai migrasi selesai
+            _write_atomic(messages_path, _encode_lines(legacy.get('messages') or []))
+
+    @contextmanager
+    def lock(self, user_id: str, timeout: Optional[float] = None):
+        """flock pada ``<user>.lock``; hanya berlaku antar proses di host yang sama."""
+        if fcntl is None:
+            raise NotImplementedError('JsonlSessionStore.lock membutuhkan fcntl')
+        timeout = self.lock_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        fd = os.open(self._path(user_id, '.lock'), os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        raise SessionLockTimeout(f'Sesi {user_id} sedang dipakai request lain')
+                    time.sleep(_LOCK_POLL_INTERVAL)
+            try:
+                # Konteks bisa diubah proses lain selama lock dilepas
+                self._contexts.discard(user_id)
+                yield
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def get_context(self, user_id: str) -> Dict[str, Any]:
+        cached = self._contexts.get(user_id)
+        if cached is not None:
+            return dict(cached)
+
+        self._migrate_legacy(user_id)
+        try:
+            with open(self._path(user_id, '.context.json'), 'r', encoding='utf-8') as f:
+                context = json.load(f)
+        except (OSError, ValueError):
+            context = {}
+        self._contexts.set(user_id, context)
+        return dict(context)
+
+    def update_context(self, user_id: str, context: Dict[str, Any]) -> None:
+        self._migrate_legacy(user_id)
+        _write_atomic(self._path(user_id, '.context.json'), json.dumps(context, ensure_ascii=False).encode('utf-8'))
+        self._contexts.set(user_id, dict(context))
+
+    def append_messages(self, user_id: str, messages: List[Dict[str, Any]]) -> None:
+        if not messages:
+            return
+        self._migrate_legacy(user_id)
+        data = _encode_lines(messages)
+        fd = os.open(self.messages_path(user_id), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            with _file_lock(fd):
+                written = 0
+                while written < len(data):
+                    written += os.write(fd, data[written:])
+        finally:
+            os.close(fd)
+
+    def read_messages(self, user_id: str) -> Optional[List[Dict[str, Any]]]:
+        self._migrate_legacy(user_id)
+        try:
+            f = open(self.messages_path(user_id), 'rb')
+        except FileNotFoundError:
+            return None
+        messages = []
+        with f:
+            with _file_lock(f.fileno(), exclusive=False):
+                for line in f:
+                    try:
+                        messages.append(json.loads(line))
+                    except ValueError:
+                        # Baris terakhir yang terpotong (mis. proses mati saat menulis) dilewati
+                        continue
+        return messages
+
+    def read_messages_page(self, user_id: str, before: Optional[int] = None,
+                           limit: int = 20) -> Optional[Tuple[List[Dict[str, Any]], Optional[int]]]:
+        """
+        Membaca riwayat dari akhir file per blok sehingga biayanya sebanding dengan
+        ``limit``, bukan panjang riwayat. Posisi berupa offset byte awal baris.
+        """
+        self._migrate_legacy(user_id)
+        try:
+            f = open(self.messages_path(user_id), 'rb')
+        except FileNotFoundError:
+            return None
+        with f:
+            with _file_lock(f.fileno(), exclusive=False):
+                size = os.fstat(f.fileno()).st_size
+                end = size if before is None else before
+                if not 0 <= end <= size:
+                    raise InvalidPositionError('Posisi riwayat tidak valid')
+                if end > 0 and end < size:
+                    f.seek(end - 1)
+                    if f.read(1) != b'\n':
+                        raise InvalidPositionError('Posisi riwayat tidak valid')
+                messages, start = self._read_tail(f, end, limit)
+        messages.reverse()
+        return messages, (start or None)
+
+    @staticmethod
+    def _read_tail(f, end: int, limit: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Pesan (terbaru lebih dulu) sebelum offset ``end`` dan offset baris tertua yang dibaca."""
+        messages = []
+        pos = start = end
+        # Byte [pos, start) yang sudah dibaca tetapi belum dipecah menjadi baris
+        pending = b''
+        while len(messages) < limit and (pos > 0 or pending):
+            if pos > 0:
+                size = min(_TAIL_CHUNK_SIZE, pos)
+                pos -= size
+                f.seek(pos)
+                pending = f.read(size) + pending
+
+            while pending and len(messages) < limit:
+                newline = pending.rfind(b'\n', 0, len(pending) - 1)
+                if newline == -1 and pos > 0:
+                    break  # awal baris belum terbaca
+                line_start = newline + 1
+                line = pending[line_start:]
+                pending = pending[:line_start]
+                start = pos + line_start
+                try:
+                    messages.append(json.loads(line))
+                except ValueError:
+                    continue
+        return messages, start
+
+
+class SqlSessionStore(SessionStore):
+    """
+    Sesi chat di database aplikasi (tabel chat_sessions dan chat_messages).
+
+    Memakai koneksi engine sendiri, terpisah dari db.session milik request.
+    Lock sesi berupa lease pada baris chat_sessions: lock yang tidak dilepas
+    (worker mati) otomatis kedaluwarsa setelah ``lock_ttl`` detik.
+    """
+
+    def __init__(self, engine, lock_timeout: float = DEFAULT_LOCK_TIMEOUT, lock_ttl: float = DEFAULT_LOCK_TTL):
+        self.engine = engine
+        self.lock_timeout = lock_timeout
+        self.lock_ttl = lock_ttl
+        self._sessions = ChatSessionState.__table__
+        self._messages = ChatMessageLog.__table__
+
+    @classmethod
+    def from_config(cls, config) -> 'SqlSessionStore':
+        return cls(
+            db.engine,
+            lock_timeout=config.get('CHAT_SESSION_LOCK_TIMEOUT', DEFAULT_LOCK_TIMEOUT),
+            lock_ttl=config.get('CHAT_SESSION_LOCK_TTL', DEFAULT_LOCK_TTL)
+        )
+
+    def _ensure_session(self, key: str) -> None:
+        """Membuat baris sesi jika belum ada, dalam transaksi sendiri."""
+        with self.engine.connect() as conn:
+            if self._session_exists(conn, key):
+                return
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(self._sessions.insert().values(user_key=key, context='{}', updated_at=datetime.utcnow()))
+        except IntegrityError:
+            pass  # dibuat bersamaan oleh worker lain
+
+    @contextmanager
+    def lock(self, user_id: str, timeout: Optional[float] = None):
+        key = safe_session_name(user_id)
+        token = uuid.uuid4().hex
+        timeout = self.lock_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        sessions = self._sessions
+
+        self._ensure_session(key)
+        while True:
+            now = datetime.utcnow()
+            with self.engine.begin() as conn:
+                acquired = conn.execute(
+                    sessions.update()
+                    .where(sessions.c.user_key == key,
+                           or_(sessions.c.lock_token.is_(None), sessions.c.lock_expires_at < now))
+                    .values(lock_token=token, lock_expires_at=now + timedelta(seconds=self.lock_ttl))
+                ).rowcount == 1
+            if acquired:
+                break
+            if time.monotonic() >= deadline:
+                raise SessionLockTimeout(f'Sesi {user_id} sedang dipakai request lain')
+            time.sleep(_LOCK_POLL_INTERVAL)
+
+        try:
+            yield
+        finally:
+            # Hanya melepas lease milik sendiri (bisa sudah diambil alih jika kedaluwarsa)
+            with self.engine.begin() as conn:
+                conn.execute(
+                    sessions.update()
+                    .where(sessions.c.user_key == key, sessions.c.lock_token == token)
+                    .values(lock_token=None, lock_expires_at=None)
+                )
+
+    def get_context(self, user_id: str) -> Dict[str, Any]:
+        with self.engine.connect() as conn:
+            context = conn.execute(
+                select(self._sessions.c.context).where(self._sessions.c.user_key == safe_session_name(user_id))
+            ).scalar()
+        try:
+            return json.loads(context) if context else {}
+        except ValueError:
+            return {}
+
+    def update_context(self, user_id: str, context: Dict[str, Any]) -> None:
+        key = safe_session_name(user_id)
+        self._ensure_session(key)
+        with self.engine.begin() as conn:
+            conn.execute(self._sessions.update().where(self._sessions.c.user_key == key).values(
+                context=json.dumps(context, ensure_ascii=False), updated_at=datetime.utcnow()
+            ))
+
+    def append_messages(self, user_id: str, messages: List[Dict[str, Any]]) -> None:
+        if not messages:
+            return
+        key = safe_session_name(user_id)
+        now = datetime.utcnow()
+        self._ensure_session(key)
+        with self.engine.begin() as conn:
+            conn.execute(self._messages.insert(), [
+                {'user_key': key, 'payload': json.dumps(message, ensure_ascii=False), 'created_at': now}
+                for message in messages
+            ])
+
+    def _session_exists(self, conn, key: str) -> bool:
+        return conn.execute(
+            select(self._sessions.c.user_key).where(self._sessions.c.user_key == key)
+        ).first() is not None
+
+    def read_messages(self, user_id: str) -> Optional[List[Dict[str, Any]]]:
+        key = safe_session_name(user_id)
+        with self.engine.connect() as conn:
+            if not self._session_exists(conn, key):
+                return None
+            payloads = conn.execute(
+                select(self._messages.c.payload).where(self._messages.c.user_key == key).order_by(self._messages.c.id)
+            ).scalars().all()
+        return [json.loads(payload) for payload in payloads]
+
+    def read_messages_page(self, user_id: str, before: Optional[int] = None,
+                           limit: int = 20) -> Optional[Tuple[List[Dict[str, Any]], Optional[int]]]:
+        """Posisi berupa id pesan tertua pada halaman; memakai index (user_key, id)."""
+        if before is not None and before <= 0:
+            raise InvalidPositionError('Posisi riwayat tidak valid')
+        key = safe_session_name(user_id)
+        messages = self._messages
+        query = select(messages.c.id, messages.c.payload).where(messages.c.user_key == key)
+        if before is not None:
+            query = query.where(messages.c.id < before)
+        with self.engine.connect() as conn:
+            if not self._session_exists(conn, key):
+                return None
+            rows = conn.execute(query.order_by(messages.c.id.desc()).limit(limit + 1)).all()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        rows.reverse()
+        return [json.loads(row.payload) for row in rows], (rows[0].id if has_more else None)
+
+
+def import_sessions(directory: str, store: SessionStore) -> int:
+    """
+    Memindahkan sesi berbasis file (``<user>.json`` lama atau ``<user>.jsonl``) ke store lain.
+    Sesi yang sudah ada di store tujuan dilewati.
+
+    Returns:
+        int: Jumlah sesi yang diimpor
+    """
+    source = JsonlSessionStore(directory)
+    names = set()
+    for filename in os.listdir(directory):
+        for suffix in ('.jsonl', '.json'):
+            if filename.endswith(suffix) and not filename.endswith('.context.json'):
+                names.add(filename[:-len(suffix)])
+                break
+
+    imported = 0
+    for name in sorted(names):
+        if store.read_messages(name) is not None:
+            continue
+        store.append_messages(name, source.read_messages(name) or [])
+        store.update_context(name, source.get_context(name))
+        imported += 1
+    return imported
+
+
+SESSION_BACKENDS = {
+    'sql': SqlSessionStore,
+    'jsonl': JsonlSessionStore,
+}
+
+_store_lock = threading.Lock()
+
+
+def create_session_store(config) -> SessionStore:
+    """
+    Membuat store sesi sesuai config CHAT_SESSION_BACKEND: 'sql' (default),
+    'jsonl', import string kelas SessionStore, kelas, atau instance store.
+    """
+    backend = config.get('CHAT_SESSION_BACKEND') or 'sql'
+    if isinstance(backend, str):
+        backend = SESSION_BACKENDS.get(backend) or import_string(backend)
+    if isinstance(backend, type):
+        backend = backend.from_config(config)
+    return backend
+
+
+def get_session_store() -> SessionStore:
+    """Store sesi milik aplikasi saat ini, dibuat sekali saat pertama dipakai."""
+    store = current_app.extensions.get('chat_session_store')
+    if store is None:
+        with _store_lock:
+            store = current_app.extensions.get('chat_session_store')
+            if store is None:
+                store = create_session_store(current_app.config)
+                current_app.extensions['chat_session_store'] = store
+    return store
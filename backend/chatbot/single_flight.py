@@ -0,0 +1,57 @@
+"""
+Single-flight: pemanggilan yang sama (key sama) yang sedang berjalan tidak diulang.
+
+Pemanggil pertama untuk sebuah key menjalankan fungsi; pemanggil lain yang datang
+selama fungsi itu berjalan menunggu Future yang sama dan mendapat hasil (atau
+exception) yang sama. Setelah selesai key dilepas, sehingga pemanggilan berikutnya
+berjalan lagi (biasanya sudah terlayani cache).
+"""
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict
+
+
+class SingleFlight:
+    """Deduplikasi pemanggilan yang sedang berjalan per key, dalam satu proses."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Menjalankan ``fn(*args, **kwargs)``, atau menunggu hasil pemanggilan yang sedang berjalan untuk ``key``"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self) -> Dict[str, int]:
+        """Jumlah pemanggilan yang dijalankan, yang digabung, dan yang sedang berjalan"""
+        with self._lock:
+            return {
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
@@ -3,32 +3,147 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _mysql_uri(user, password, host, name):
+    # PyMySQL adalah satu-satunya driver MySQL aplikasi (tanpa mysqlclient/flask_mysqldb)
+    return 'mysql+pymysql://{}:{}@{}/{}?charset=utf8mb4'.format(user, password, host, name)
+
+
+def _database_uri(default):
+    uri = os.getenv('DATABASE_URI', default)
+    if uri.startswith('mysql://'):
+        uri = 'mysql+pymysql://' + uri[len('mysql://'):]
+    return uri
+
+
+def engine_options(database_uri, pool_size, max_overflow, pool_recycle=280, pool_timeout=30,
+                   pool_pre_ping=True):
+    """Opsi pool SQLAlchemy; SQLite memakai pool bawaan Flask-SQLAlchemy tanpa opsi ukuran."""
+    if database_uri.startswith('sqlite'):
+        return {}
+    from utils.db_pool import TimedQueuePool
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        # Di bawah wait_timeout MySQL, agar koneksi idle tidak diputus server saat dipakai
+        'pool_recycle': pool_recycle,
+        'pool_timeout': pool_timeout,
+        'pool_pre_ping': pool_pre_ping,
+    }
+
+
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'default_secret_key')
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'default_jwt_secret')
     JWT_ACCESS_TOKEN_EXPIRES = 3600  # Token berlaku selama 1 jam
 
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Ukuran pool per proses; create_app menyusun SQLALCHEMY_ENGINE_OPTIONS dari nilai ini
+    # sesuai URI akhir (total koneksi = workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW))
+    DB_POOL_SIZE = 5
+    DB_MAX_OVERFLOW = 5
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 280))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
+    DB_POOL_PRE_PING = _env_bool('DB_POOL_PRE_PING', True)
+    # Skema dikelola Flask-Migrate (`flask db upgrade`); create_all hanya untuk test
+    AUTO_CREATE_TABLES = False
+
+    UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static/uploads')
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024
+
+    # Worker gunicorn (dibaca gunicorn.conf.py)
+    GUNICORN_WORKERS = int(os.getenv('WEB_CONCURRENCY', 1))
+    GUNICORN_THREADS = int(os.getenv('GUNICORN_THREADS', 16))
+
+    # Notifikasi: penulisan di background dan backend pub/sub untuk SSE
+    NOTIFICATION_ASYNC = True
+    NOTIFICATION_QUEUE_SIZE = 1000
+    NOTIFICATION_BATCH_SIZE = 100
+    NOTIFICATION_BATCH_WINDOW = 0.2
+    # Reaksi (like/dislike/batal) aktor yang sama pada satu forum digabung dalam jendela ini
+    NOTIFICATION_COALESCE_WINDOW = 5.0
+    NOTIFICATION_PUBSUB_BACKEND = os.getenv('NOTIFICATION_PUBSUB_BACKEND')
+    # Stream SSE: setiap stream memegang satu thread gthread sampai SSE_MAX_STREAM_SECONDS.
+    # Tanpa backend pub/sub bersama, notifikasi dari worker lain sampai lewat query
+    # catch-up database setiap SSE_HEARTBEAT_SECONDS
+    SSE_HEARTBEAT_SECONDS = 15
+    SSE_MAX_STREAM_SECONDS = 300
+    SSE_DB_CATCH_UP = True
+    # Stream per worker dibatasi agar thread tersisa untuk request biasa; stream
+    # berikutnya mendapat 503 dengan Retry-After
+    SSE_MAX_STREAMS = int(os.getenv('SSE_MAX_STREAMS', max(GUNICORN_THREADS // 2, 1)))
+    SSE_RETRY_AFTER_SECONDS = 10
+
+    # Chatbot: backend sesi, mode intent, dan warm-up komponen saat boot
+    CHAT_SESSION_BACKEND = os.getenv('CHAT_SESSION_BACKEND', 'sql')
+    CHATBOT_INTENT_MODE = os.getenv('CHATBOT_INTENT_MODE', 'keyword')
+    CHATBOT_WARM_UP = _env_bool('CHATBOT_WARM_UP', False)
+    # Cache respons LLM: LRU memori per proses + file SQLite yang dibagi semua worker di host
+    # (LLM_CACHE_PATH kosong = backend/cache/llm_responses.sqlite3)
+    LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', 3600))
+    LLM_CACHE_MEMORY_BYTES = int(os.getenv('LLM_CACHE_MEMORY_BYTES', 8 * 1024 * 1024))
+    LLM_CACHE_DISK = _env_bool('LLM_CACHE_DISK', True)
+    LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH')
+    LLM_CACHE_DISK_MAX_BYTES = int(os.getenv('LLM_CACHE_DISK_MAX_BYTES', 256 * 1024 * 1024))
+    # Gemini: batas waktu total per request chat (di bawah timeout worker gunicorn 30 detik),
+    # jumlah panggilan API bersamaan per proses, dan circuit breaker ke generator lokal
+    GEMINI_REQUEST_BUDGET = float(os.getenv('GEMINI_REQUEST_BUDGET', 20))
+    GEMINI_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', 8))
+    GEMINI_CIRCUIT_FAILURES = int(os.getenv('GEMINI_CIRCUIT_FAILURES', 5))
+    GEMINI_CIRCUIT_RESET = float(os.getenv('GEMINI_CIRCUIT_RESET', 30))
+
+    # Hapus forum sinkron dalam satu transaksi; isi angka untuk hapus per chunk
+    FORUM_DELETE_CHUNK_SIZE = None
+
+
 class DevelopmentConfig(Config):
     DEBUG = True
-    SQLALCHEMY_DATABASE_URI = 'mysql://{}:{}@{}/{}'.format(
+    SQLALCHEMY_DATABASE_URI = _database_uri(_mysql_uri(
         os.getenv('DB_USER', 'root'),
         os.getenv('DB_PASSWORD', 'admin'),
         os.getenv('DB_HOST', 'localhost'),
-        os.getenv('DB_NAME', 'chatbot_db')
-    )
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
+        os.getenv('DB_NAME', 'forum_db')
+    ))
+
 
 class ProductionConfig(Config):
     DEBUG = False
-    SQLALCHEMY_DATABASE_URI = 'mysql://{}:{}@{}/{}'.format(
+    SQLALCHEMY_DATABASE_URI = _database_uri(_mysql_uri(
         os.getenv('DB_USER'),
         os.getenv('DB_PASSWORD'),
         os.getenv('DB_HOST'),
         os.getenv('DB_NAME')
-    )
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    ))
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    GUNICORN_WORKERS = int(os.getenv('WEB_CONCURRENCY', 4))
+    CHATBOT_WARM_UP = _env_bool('CHATBOT_WARM_UP', True)
+
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    AUTO_CREATE_TABLES = True
+    JWT_SECRET_KEY = 'test-secret'
+    # Notifikasi ditulis langsung agar test deterministik
+    NOTIFICATION_ASYNC = False
+    NOTIFICATION_PUBSUB_BACKEND = None
+    CHAT_SESSION_BACKEND = 'sql'
+    CHATBOT_INTENT_MODE = 'keyword'
+    CHATBOT_WARM_UP = False
+    LLM_CACHE_DISK = False
+
 
 config_by_name = {
     'development': DevelopmentConfig,
-    'production': ProductionConfig
+    'production': ProductionConfig,
+    'testing': TestingConfig
 }
@@ -0,0 +1,12 @@
+# gunicorn.conf.py
+# Jumlah worker dan thread diambil dari kelas config yang sama dengan aplikasi (FLASK_CONFIG)
+import os
+
+from config import config_by_name
+
+_config = config_by_name[os.getenv('FLASK_CONFIG', 'production')]
+
+wsgi_app = 'app:create_app()'
+worker_class = 'gthread'
+workers = _config.GUNICORN_WORKERS
+threads = _config.GUNICORN_THREADS
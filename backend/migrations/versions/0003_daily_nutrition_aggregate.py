@@ -0,0 +1,94 @@
+"""daily nutrition aggregate
+
+daily_nutrition_log menjadi satu baris per (user_id, date) dengan primary key
+komposit, ditambah secara atomik (upsert). Baris per makan dipindah ke tabel
+meal_logs yang hanya ditambah. Baris lama dijumlahkan per hari saat upgrade.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 21:05:42.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+MEAL_NUTRIENTS = ('calories', 'protein', 'fat', 'carbs', 'folic_acid', 'iron', 'calcium', 'zinc')
+DAILY_COLUMNS = tuple(f'daily_{nutrient}' for nutrient in MEAL_NUTRIENTS) + ('daily_water', 'daily_sleep')
+
+
+def _daily_columns():
+    return [
+        sa.Column(column, sa.Integer() if column == 'daily_water' else sa.Float(), nullable=False)
+        for column in DAILY_COLUMNS
+    ]
+
+
+def upgrade():
+    op.create_table('meal_logs',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    *[sa.Column(nutrient, sa.Float(), nullable=False) for nutrient in MEAL_NUTRIENTS],
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_meal_logs_user_id_date_id', 'meal_logs', ['user_id', 'date', 'id'], unique=False)
+
+    # Baris yang berisi nutrien makanan menjadi satu entri makan; baris yang hanya
+    # berisi air/tidur tidak punya padanan di meal_logs
+    nutrient_columns = ', '.join(MEAL_NUTRIENTS)
+    daily_nutrient_columns = ', '.join(f'daily_{nutrient}' for nutrient in MEAL_NUTRIENTS)
+    has_food = ' OR '.join(f'daily_{nutrient} <> 0' for nutrient in MEAL_NUTRIENTS)
+    op.execute(
+        f"INSERT INTO meal_logs (user_id, date, {nutrient_columns}) "
+        f"SELECT user_id, date, {daily_nutrient_columns} FROM daily_nutrition_log "
+        f"WHERE {has_food} ORDER BY id"
+    )
+
+    op.create_table('daily_nutrition_log_new',
+    sa.Column('user_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    *_daily_columns(),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'date')
+    )
+    sums = ', '.join(f'SUM({column})' for column in DAILY_COLUMNS)
+    op.execute(
+        f"INSERT INTO daily_nutrition_log_new (user_id, date, {', '.join(DAILY_COLUMNS)}) "
+        f"SELECT user_id, date, {sums} FROM daily_nutrition_log GROUP BY user_id, date"
+    )
+
+    # Index lama ikut terhapus bersama tabelnya (MySQL menolak drop index yang
+    # menopang foreign key secara terpisah)
+    op.drop_table('daily_nutrition_log')
+    op.rename_table('daily_nutrition_log_new', 'daily_nutrition_log')
+
+
+def downgrade():
+    op.create_table('daily_nutrition_log_old',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    *_daily_columns(),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Total harian menjadi satu baris per hari; rincian per makan tidak dikembalikan
+    columns = ', '.join(DAILY_COLUMNS)
+    op.execute(
+        f"INSERT INTO daily_nutrition_log_old (user_id, date, {columns}) "
+        f"SELECT user_id, date, {columns} FROM daily_nutrition_log ORDER BY date, user_id"
+    )
+    op.drop_table('daily_nutrition_log')
+    op.rename_table('daily_nutrition_log_old', 'daily_nutrition_log')
+    op.create_index('ix_daily_nutrition_log_user_id_date', 'daily_nutrition_log', ['user_id', 'date'], unique=False)
+
+    op.drop_table('meal_logs')
@@ -0,0 +1,150 @@
+"""counters, search index and chat sessions
+
+Kolom counter like/dislike/komentar dan hot_score pada forums, counter
+notifikasi belum dibaca pada users, tabel indeks pencarian, tabel sesi chat,
+dan index urutan daftar forum. Counter diisi dari tabel likes, comments, dan
+notifications saat upgrade. Indeks pencarian dibuat kosong; isi dengan
+`flask forum rebuild-search-index` setelah upgrade.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 09:12:37.402219
+
+"""
+import math
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+FORUM_INDEXES = {
+    'ix_forums_created_at_id': ['created_at', 'id'],
+    'ix_forums_hot_score_id': ['hot_score', 'id'],
+    'ix_forums_like_count_id': ['like_count', 'id'],
+}
+# Collation biner di MySQL agar term yang hanya beda aksen tidak bentrok di primary key
+TERM_TYPE = sa.String(length=64).with_variant(
+    mysql.VARCHAR(length=64, charset='utf8mb4', collation='utf8mb4_bin'), 'mysql')
+
+
+
+def _hot_score(like_count, dislike_count, created_at):
+    """Salinan beku rumus models.forum.compute_hot_score saat revisi ini dibuat."""
+    net = (like_count or 0) - (dislike_count or 0)
+    order = math.log10(max(abs(net), 1))
+    sign = 1 if net > 0 else -1 if net < 0 else 0
+    seconds = ((created_at or datetime.utcnow()) - datetime(2024, 1, 1)).total_seconds()
+    return round(sign * order + seconds / 45000, 7)
+
+
+def _backfill_counters():
+    op.execute(
+        "UPDATE forums SET "
+        "like_count = (SELECT COUNT(*) FROM likes WHERE likes.forum_id = forums.id AND likes.is_like = 1), "
+        "dislike_count = (SELECT COUNT(*) FROM likes WHERE likes.forum_id = forums.id AND likes.is_like = 0), "
+        "comment_count = (SELECT COUNT(*) FROM comments WHERE comments.forum_id = forums.id)"
+    )
+    op.execute(
+        "UPDATE users SET unread_notification_count = ("
+        "SELECT COUNT(*) FROM notifications "
+        "WHERE notifications.user_id = users.id AND (notifications.is_read = 0 OR notifications.is_read IS NULL))"
+    )
+
+    # hot_score dihitung per batch, satu UPDATE executemany untuk setiap batch
+    bind = op.get_bind()
+    forums = sa.table('forums', sa.column('id', sa.Integer), sa.column('like_count', sa.Integer),
+                      sa.column('dislike_count', sa.Integer), sa.column('created_at', sa.DateTime),
+                      sa.column('hot_score', sa.Float(precision=53)))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(forums.c.id, forums.c.like_count, forums.c.dislike_count, forums.c.created_at)
+            .where(forums.c.id > last_id).order_by(forums.c.id).limit(1000)
+        ).fetchall()
+        if not rows:
+            break
+        bind.execute(
+            forums.update().where(forums.c.id == sa.bindparam('forum_id'))
+            .values(hot_score=sa.bindparam('score')),
+            [{'forum_id': forum_id, 'score': _hot_score(like_count, dislike_count, created_at)}
+             for forum_id, like_count, dislike_count, created_at in rows]
+        )
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    with op.batch_alter_table('forums') as batch_op:
+        batch_op.add_column(sa.Column('like_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('dislike_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('hot_score', sa.Float(precision=53), server_default='0', nullable=False))
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('unread_notification_count', sa.Integer(), server_default='0', nullable=False))
+    _backfill_counters()
+    for name, columns in FORUM_INDEXES.items():
+        op.create_index(name, 'forums', columns, unique=False)
+
+    op.create_table('search_documents',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('doc_type', sa.String(length=16), nullable=False),
+    sa.Column('doc_id', sa.Integer(), nullable=False),
+    sa.Column('forum_id', sa.Integer(), nullable=False),
+    sa.Column('length', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('doc_type', 'doc_id', name='uq_search_documents_doc')
+    )
+    op.create_index('ix_search_documents_forum_id', 'search_documents', ['forum_id'], unique=False)
+    op.create_table('search_postings',
+    sa.Column('term', TERM_TYPE, nullable=False),
+    sa.Column('document_id', sa.Integer(), nullable=False),
+    sa.Column('tf', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['document_id'], ['search_documents.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('term', 'document_id')
+    )
+    op.create_index('ix_search_postings_document_id', 'search_postings', ['document_id'], unique=False)
+
+    op.create_table('chat_sessions',
+    sa.Column('user_key', sa.String(length=128), nullable=False),
+    sa.Column('context', sa.Text(), nullable=False),
+    sa.Column('lock_token', sa.String(length=32), nullable=True),
+    sa.Column('lock_expires_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('user_key')
+    )
+    op.create_table('chat_messages',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_key', sa.String(length=128), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_key'], ['chat_sessions.user_key'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_chat_messages_user_key_id', 'chat_messages', ['user_key', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_chat_messages_user_key_id', table_name='chat_messages')
+    op.drop_table('chat_messages')
+    op.drop_table('chat_sessions')
+    op.drop_index('ix_search_postings_document_id', table_name='search_postings')
+    op.drop_table('search_postings')
+    op.drop_index('ix_search_documents_forum_id', table_name='search_documents')
+    op.drop_table('search_documents')
+
+    for name in FORUM_INDEXES:
+        op.drop_index(name, table_name='forums')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('unread_notification_count')
+    with op.batch_alter_table('forums') as batch_op:
+        batch_op.drop_column('hot_score')
+        batch_op.drop_column('comment_count')
+        batch_op.drop_column('dislike_count')
+        batch_op.drop_column('like_count')
@@ -0,0 +1,29 @@
+from datetime import datetime
+from models import db
+
+
+class ChatSessionState(db.Model):
+    """Konteks sesi chatbot per user, dibagi oleh semua worker aplikasi."""
+    __tablename__ = 'chat_sessions'
+
+    user_key = db.Column(db.String(128), primary_key=True)
+    context = db.Column(db.Text, nullable=False, default='{}')
+    # Lease lock per sesi: pemegang lock dan batas waktu lease-nya
+    lock_token = db.Column(db.String(32), nullable=True)
+    lock_expires_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ChatMessageLog(db.Model):
+    """Riwayat pesan chatbot, satu baris per pesan (hanya ditambah)."""
+    __tablename__ = 'chat_messages'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_key = db.Column(db.String(128), db.ForeignKey('chat_sessions.user_key', ondelete='CASCADE'), nullable=False)
+    # Message.to_dict() dalam bentuk JSON
+    payload = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_chat_messages_user_key_id', 'user_key', 'id'),
+    )
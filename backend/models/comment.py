@@ -11,6 +11,11 @@ class Comment(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     forum_id = db.Column(db.Integer, db.ForeignKey('forums.id'), nullable=False)
     user = db.relationship('User', back_populates='comments')
+
+    # Komentar satu forum diurutkan berdasarkan waktu
+    __table_args__ = (
+        db.Index('ix_comments_forum_id_created_at_id', 'forum_id', 'created_at', 'id'),
+    )
     # Tambahkan relasi untuk cascade delete
     notifications = db.relationship(
         'Notification', 
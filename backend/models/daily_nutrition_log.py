@@ -1,13 +1,25 @@
 from datetime import date
 from models import db
 
+# Kolom total harian yang ditambah setiap kali makan, minum, atau tidur dicatat
+DAILY_TOTAL_COLUMNS = (
+    'daily_calories', 'daily_protein', 'daily_fat', 'daily_carbs',
+    'daily_folic_acid', 'daily_iron', 'daily_calcium', 'daily_zinc',
+    'daily_water', 'daily_sleep',
+)
+
+
 class DailyNutritionLog(db.Model):
+    """
+    Total nutrisi, air, dan tidur satu user pada satu tanggal (satu baris per hari).
+
+    Baris dibuat/ditambah secara atomik oleh services.nutrition_service.add_to_daily_log;
+    rincian per makan disimpan di MealLog.
+    """
     __tablename__ = 'daily_nutrition_log'
 
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    
-    date = db.Column(db.Date, nullable=False, default=date.today)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True, autoincrement=False)
+    date = db.Column(db.Date, primary_key=True, default=date.today)
 
     daily_calories = db.Column(db.Float, nullable=False, default=0)
     daily_protein = db.Column(db.Float, nullable=False, default=0)
@@ -20,10 +32,14 @@ class DailyNutritionLog(db.Model):
     daily_water = db.Column(db.Integer, nullable=False, default=0) 
     daily_sleep = db.Column(db.Float, nullable=False, default=0)
 
+    @classmethod
+    def empty(cls, user_id, day):
+        """Log bernilai nol (tidak disimpan) untuk hari yang belum punya catatan."""
+        return cls(user_id=user_id, date=day, **{column: 0 for column in DAILY_TOTAL_COLUMNS})
+
     def to_dict(self):
         """Mengonversi objek menjadi dictionary untuk respons API."""
         return {
-            'id': self.id,
             'user_id': self.user_id,
             'date': self.date.isoformat(),
             'daily_calories': self.daily_calories,
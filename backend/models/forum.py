@@ -1,6 +1,29 @@
+import math
 from datetime import datetime
 from models import db
 
+# Titik nol skor "hot"; forum yang lebih baru otomatis mendapat skor dasar lebih tinggi
+HOT_EPOCH = datetime(2024, 1, 1)
+# Setiap 45000 detik (12,5 jam) bernilai sama dengan kenaikan like bersih 10x lipat
+HOT_DECAY_SECONDS = 45000
+# Selisih hot_score di bawah ini dianggap sama (sisa pembulatan floating point)
+HOT_SCORE_TOLERANCE = 1e-9
+
+
+def compute_hot_score(like_count, dislike_count, created_at):
+    """Skor hot bergaya Reddit: log10 dari like bersih ditambah bobot waktu pembuatan."""
+    net = (like_count or 0) - (dislike_count or 0)
+    order = math.log10(max(abs(net), 1))
+    sign = 1 if net > 0 else -1 if net < 0 else 0
+    seconds = ((created_at or datetime.utcnow()) - HOT_EPOCH).total_seconds()
+    return round(sign * order + seconds / HOT_DECAY_SECONDS, 7)
+
+
+def _initial_hot_score(context):
+    params = context.get_current_parameters()
+    return compute_hot_score(0, 0, params.get('created_at'))
+
+
 class Forum(db.Model):
     __tablename__ = 'forums'
     
@@ -12,6 +35,23 @@ class Forum(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
+    # Counter denormalisasi, dijaga oleh services.forum_service.adjust_forum_counters
+    like_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    dislike_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Skor ranking "hot", diperbarui setiap kali counter like/dislike berubah.
+    # Presisi ganda (DOUBLE di MySQL) agar nilai tersimpan sama dengan hasil compute_hot_score
+    hot_score = db.Column(db.Float(precision=53), nullable=False, default=_initial_hot_score, server_default='0')
+    
+    # Index untuk setiap urutan daftar forum (terbaru, popularitas, hot) tanpa filesort
+    __table_args__ = (
+        db.Index('ix_forums_created_at_id', 'created_at', 'id'),
+        db.Index('ix_forums_like_count_id', 'like_count', 'id'),
+        db.Index('ix_forums_hot_score_id', 'hot_score', 'id'),
+        # Daftar forum milik satu user (/api/forums/me, ?user_id=)
+        db.Index('ix_forums_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+    )
+    
     # Relationships
     comments = db.relationship('Comment', backref='forum', lazy=True, cascade='all, delete-orphan')
     likes = db.relationship('Like', backref='forum', lazy=True, cascade='all, delete-orphan')
@@ -25,7 +65,7 @@ class Forum(db.Model):
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
             'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S'),
             'user_id': self.user_id,
-            'like_count': len([like for like in self.likes if like.is_like]),
-            'dislike_count': len([like for like in self.likes if not like.is_like]),
-            'comment_count': len(self.comments)
+            'like_count': self.like_count or 0,
+            'dislike_count': self.dislike_count or 0,
+            'comment_count': self.comment_count or 0
         }
@@ -0,0 +1,39 @@
+from datetime import date, datetime
+from models import db
+
+# Nutrien satu kali makan; masing-masing menambah kolom daily_<nama> di DailyNutritionLog
+MEAL_NUTRIENTS = ('calories', 'protein', 'fat', 'carbs', 'folic_acid', 'iron', 'calcium', 'zinc')
+
+
+class MealLog(db.Model):
+    """Catatan satu kali makan (hanya ditambah, tidak pernah diubah)."""
+    __tablename__ = 'meal_logs'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False, default=date.today)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    calories = db.Column(db.Float, nullable=False, default=0)
+    protein = db.Column(db.Float, nullable=False, default=0)
+    fat = db.Column(db.Float, nullable=False, default=0)
+    carbs = db.Column(db.Float, nullable=False, default=0)
+    folic_acid = db.Column(db.Float, nullable=False, default=0)
+    iron = db.Column(db.Float, nullable=False, default=0)
+    calcium = db.Column(db.Float, nullable=False, default=0)
+    zinc = db.Column(db.Float, nullable=False, default=0)
+
+    # Riwayat makan satu user per tanggal
+    __table_args__ = (
+        db.Index('ix_meal_logs_user_id_date_id', 'user_id', 'date', 'id'),
+    )
+
+    def to_dict(self):
+        data = {
+            'id': self.id,
+            'user_id': self.user_id,
+            'date': self.date.isoformat(),
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+        data.update({nutrient: getattr(self, nutrient) for nutrient in MEAL_NUTRIENTS})
+        return data
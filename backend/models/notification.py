@@ -11,6 +11,11 @@ class Notification(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     forum_id = db.Column(db.Integer, db.ForeignKey('forums.id'), nullable=True)
     comment_id = db.Column(db.Integer, db.ForeignKey('comments.id', ondelete='CASCADE'))
+
+    # Notifikasi satu user: belum dibaca lebih dulu, lalu terbaru
+    __table_args__ = (
+        db.Index('ix_notifications_user_id_is_read_created_at', 'user_id', 'is_read', 'created_at'),
+    )
     
     def to_dict(self):
         return {
@@ -0,0 +1,37 @@
+from sqlalchemy.dialects import mysql
+
+from models import db
+
+# Term disimpan apa adanya; collation *_ci MySQL menganggap 'resep' dan 'resép'
+# sama sehingga primary key (term, document_id) bentrok
+TERM_TYPE = db.String(64).with_variant(mysql.VARCHAR(64, charset='utf8mb4', collation='utf8mb4_bin'), 'mysql')
+
+
+class SearchDocument(db.Model):
+    """Satu dokumen yang diindeks untuk pencarian (forum atau komentar)."""
+    __tablename__ = 'search_documents'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    doc_type = db.Column(db.String(16), nullable=False)  # 'forum' atau 'comment'
+    doc_id = db.Column(db.Integer, nullable=False)
+    forum_id = db.Column(db.Integer, nullable=False)
+    # Panjang dokumen (jumlah token berbobot) untuk normalisasi BM25
+    length = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('doc_type', 'doc_id', name='uq_search_documents_doc'),
+        db.Index('ix_search_documents_forum_id', 'forum_id'),
+    )
+
+
+class SearchPosting(db.Model):
+    """Posting list inverted index: frekuensi satu term pada satu dokumen."""
+    __tablename__ = 'search_postings'
+
+    term = db.Column(TERM_TYPE, primary_key=True)
+    document_id = db.Column(db.Integer, db.ForeignKey('search_documents.id', ondelete='CASCADE'), primary_key=True)
+    tf = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_search_postings_document_id', 'document_id'),
+    )
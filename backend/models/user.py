@@ -18,6 +18,8 @@ class User(db.Model):
     # Kolom untuk personalisasi asesmen
     preferences = db.Column(db.JSON)
     health_profile = db.Column(db.JSON)
+    # Counter notifikasi belum dibaca, dijaga oleh services.notification_service
+    unread_notification_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     # Relationships berdasarkan sequence diagram dan struktur folder
     forums = db.relationship('Forum', backref='author', lazy=True, cascade='all, delete-orphan', overlaps='author' )
     comments = db.relationship('Comment', backref='author', lazy=True, cascade='all, delete-orphan')
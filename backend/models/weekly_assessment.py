@@ -16,6 +16,11 @@ class WeeklyAssessment(db.Model):
     created_at = db.Column(db.DateTime, server_default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime, server_default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
 
+    # Cek assessment minggu ini / riwayat assessment selesai milik satu user
+    __table_args__ = (
+        db.Index('ix_weekly_assessments_user_id_week_start_date_status', 'user_id', 'week_start_date', 'status'),
+    )
+
 
     def to_dict(self):
         """Mengonversi objek model menjadi dictionary."""
@@ -1,2 +1,3 @@
 import nltk
-nltk.download('punkt')
\ No newline at end of file
+nltk.download('punkt')
+nltk.download('stopwords')
@@ -1,7 +1,14 @@
-from app import app
+from flask_migrate import upgrade
+from sqlalchemy import text
+
+from app import create_app
 from models import db
 
+app = create_app()
+
 with app.app_context():
     db.drop_all()
-    db.create_all()
-    print("✅ All tables dropped and recreated.")
+    with db.engine.begin() as conn:
+        conn.execute(text('DROP TABLE IF EXISTS alembic_version'))
+    upgrade()
+    print("✅ All tables dropped and recreated from migrations.")
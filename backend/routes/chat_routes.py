@@ -1,44 +1,102 @@
-from flask import Blueprint, request, jsonify
-from chatbot.nlp_engine import NLPEngine
+from flask import Blueprint, Response, current_app, has_app_context, request, jsonify
 from chatbot.knowledge_base import KnowledgeBase
+from chatbot.lazy import LazySingleton, warm_up
+from chatbot.response_cache import build_cache_key, create_response_cache
 from chatbot.response_generator import ResponseGenerator
-from chatbot.gemini_integration import GeminiIntegration
-from models.chat_models import Message, ChatSession
+from chatbot.session_store import (
+    DEFAULT_SESSIONS_DIR, InvalidPositionError, SessionLockTimeout, get_session_store, import_sessions
+)
+from models.chat_models import Message
+from utils.pagination import MAX_CURSOR_LIMIT, InvalidCursorError, decode_cursor, encode_cursor
 from datetime import datetime
 import json
 import os
+import time
 from typing import Dict, List, Any
-import openai
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Initialize OpenAI API key if available
 openai_api_key = os.getenv("OPENAI_API_KEY")
-if openai_api_key:
-    openai.api_key = openai_api_key
-
-# Initialize Gemini integration if API key is available
-gemini_integration = None
 gemini_api_key = os.getenv("GOOGLE_API_KEY")
-if gemini_api_key:
+
+# Initialize blueprint
+chat_bp = Blueprint('chat', __name__)
+
+# Penanda cursor riwayat chat (posisi dari session store)
+HISTORY_CURSOR_SCOPE = 'chat_history'
+
+# Parameter OpenAI; ikut menjadi bagian key cache respons
+OPENAI_MODEL = "gpt-3.5-turbo"
+OPENAI_PARAMS = {"max_tokens": 500, "temperature": 0.7}
+
+
+def _create_nlp_engine():
+    from chatbot.nlp_engine import NLPEngine
+    # CHATBOT_INTENT_MODE=classifier memakai model TF-IDF (chatbot/data/intents.json)
+    intent_mode = current_app.config.get('CHATBOT_INTENT_MODE') if has_app_context() else None
+    return NLPEngine(intent_mode=intent_mode or os.getenv('CHATBOT_INTENT_MODE', 'keyword'))
+
+
+def _create_response_cache():
+    """Cache respons LLM yang dipakai bersama oleh Gemini dan OpenAI (lihat LLM_CACHE_* di config)"""
+    return create_response_cache(current_app.config if has_app_context() else {})
+
+
+def _create_gemini_integration():
+    """Gemini integration jika API key tersedia, None jika tidak ada atau gagal"""
+    if not gemini_api_key:
+        return None
     try:
-        gemini_integration = GeminiIntegration()
+        from chatbot.gemini_integration import GeminiIntegration
+        config = current_app.config if has_app_context() else {}
+        integration = GeminiIntegration(
+            cache=response_cache.get(),
+            request_budget=config.get('GEMINI_REQUEST_BUDGET', 20),
+            max_concurrency=config.get('GEMINI_MAX_CONCURRENCY', 8),
+            circuit_failure_threshold=config.get('GEMINI_CIRCUIT_FAILURES', 5),
+            circuit_reset_timeout=config.get('GEMINI_CIRCUIT_RESET', 30)
+        )
         print("Gemini API initialized successfully")
+        return integration
     except Exception as e:
         print(f"Failed to initialize Gemini API: {e}")
+        return None
 
-# Initialize blueprint
-chat_bp = Blueprint('chat', __name__)
 
-# Initialize chatbot components
-nlp_engine = NLPEngine()
-knowledge_base = KnowledgeBase()
-response_generator = ResponseGenerator()
+def _create_openai_client():
+    import openai
+    openai.api_key = openai_api_key
+    return openai
+
+
+# Komponen chatbot dibuat saat pertama dipakai (atau lewat warm_up), bukan saat import.
+# Komponen yang membaca config aplikasi disimpan per aplikasi (app.extensions)
+nlp_engine = LazySingleton('nlp_engine', _create_nlp_engine, per_app=True)
+knowledge_base = LazySingleton('knowledge_base', KnowledgeBase)
+response_generator = LazySingleton('response_generator', ResponseGenerator)
+response_cache = LazySingleton('response_cache', _create_response_cache, per_app=True)
+gemini_integration = LazySingleton('gemini_integration', _create_gemini_integration, per_app=True)
+openai_client = LazySingleton('openai_client', _create_openai_client)
+
 
-# In-memory storage for chat sessions
-chat_sessions = {}
+def warm_up_chatbot():
+    """Menginisialisasi semua komponen chatbot sebelum request pertama"""
+    names = ['nlp_engine', 'knowledge_base', 'response_generator']
+    if gemini_api_key or openai_api_key:
+        names.append('response_cache')
+    if gemini_api_key:
+        names.append('gemini_integration')
+    if openai_api_key:
+        names.append('openai_client')
+    timings = warm_up(names)
+    classifier = nlp_engine.get().intent_classifier
+    if classifier is not None:
+        started = time.perf_counter()
+        classifier.ensure_loaded()
+        timings['intent_classifier'] = time.perf_counter() - started
+    return timings
 
 @chat_bp.route('/chat', methods=['POST'])
 def chat():
@@ -51,55 +109,89 @@ def chat():
     user_message = data.get('message', '')
     user_id = data.get('user_id', 'anonymous')
     use_openai = data.get('use_openai', False) and openai_api_key is not None
-    use_gemini = data.get('use_gemini', False) and gemini_integration is not None
+    use_gemini = data.get('use_gemini', False) and gemini_api_key is not None and gemini_integration.get() is not None
     
     print(f"Request: message='{user_message}', user_id='{user_id}', use_openai={use_openai}, use_gemini={use_gemini}")
     
     if not user_message:
         return jsonify({"error": "No message provided"}), 400
     
-    # Get or create chat session
-    if user_id not in chat_sessions:
-        chat_sessions[user_id] = ChatSession(user_id=user_id)
+    user_msg = Message(content=user_message, is_user=True)
+    nlp_result, response_text, response_source, suggestions = _generate_turn(
+        user_id, user_message, use_openai, use_gemini
+    )
+    bot_msg = Message(content=response_text, is_user=False)
     
-    session = chat_sessions[user_id]
+    # Lock sesi hanya dipegang untuk menulis giliran ini, tidak selama panggilan LLM
+    # (bisa sampai GEMINI_REQUEST_BUDGET detik), agar request lain user ini tidak menunggu
+    session_store = get_session_store()
+    try:
+        with session_store.lock(user_id):
+            # Konteks dibaca di dalam lock: giliran lain bisa selesai selama LLM berjalan
+            session_context = session_store.get_context(user_id)
+            session_context.update({
+                'last_intent': nlp_result['intent'],
+                'last_entities': nlp_result['entities'],
+                'last_context': nlp_result['context']
+            })
+            # Pesan giliran ini ditambahkan ke akhir riwayat, bukan menulis ulang seluruh sesi
+            session_store.append_messages(user_id, [user_msg.to_dict(), bot_msg.to_dict()])
+            session_store.update_context(user_id, session_context)
+    except SessionLockTimeout:
+        return jsonify({"error": "Session is busy, please retry"}), 409
     
-    # Add user message to session
-    user_msg = Message(content=user_message, is_user=True)
-    session.add_message(user_msg)
+    return jsonify({
+        "response": response_text,
+        "suggestions": suggestions,
+        "nlp_result": nlp_result,
+        "response_source": response_source
+    })
+
+
+def _generate_turn(user_id: str, user_message: str, use_openai: bool, use_gemini: bool):
+    """
+    Menghasilkan jawaban untuk satu pesan tanpa menyentuh session store.
+
+    Returns:
+        tuple: (nlp_result, teks jawaban, sumber jawaban, saran pertanyaan)
+    """
+    nlp = nlp_engine.get()
+    kb = knowledge_base.get()
+    responder = response_generator.get()
     
     # Process message with NLP engine
-    nlp_result = nlp_engine.process_message(user_message)
+    nlp_result = nlp.process_message(user_message)
     print(f"NLP Result: {nlp_result}")
     
     # Get relevant data from knowledge base
-    kb_data = knowledge_base.get_relevant_data(
+    kb_data = kb.get_relevant_data(
         nlp_result['intent'],
         nlp_result['entities'],
         nlp_result['context']
     )
     
     # Get user preferences
-    user_preferences = knowledge_base.get_user_preferences(user_id)
+    user_preferences = kb.get_user_preferences(user_id)
     
     # Generate response
     response_text = ""
     response_source = "local"
     
-    if use_gemini and gemini_integration and nlp_result['confidence'] >= 0.6:
+    if use_gemini and nlp_result['confidence'] >= 0.6:
         try:
             # Use Gemini for response generation
             print("Using Gemini API for response generation")
-            response_text = gemini_integration.generate_response(
+            response_text = gemini_integration.get().generate_response(
                 user_message,
                 nlp_result,
                 kb_data
             )
             response_source = "gemini"
         except Exception as e:
+            # Termasuk GeminiUnavailableError saat circuit breaker terbuka: langsung ke generator lokal
             print(f"Error using Gemini API: {e}")
             # Fall back to local response generator
-            response_text = response_generator.generate_response(
+            response_text = responder.generate_response(
                 nlp_result,
                 kb_data,
                 user_preferences
@@ -117,7 +209,7 @@ def chat():
         except Exception as e:
             print(f"Error using OpenAI API: {e}")
             # Fall back to local response generator
-            response_text = response_generator.generate_response(
+            response_text = responder.generate_response(
                 nlp_result,
                 kb_data,
                 user_preferences
@@ -125,39 +217,20 @@ def chat():
     else:
         # Use local response generator
         print("Using local response generator")
-        response_text = response_generator.generate_response(
+        response_text = responder.generate_response(
             nlp_result,
             kb_data,
             user_preferences
         )
     
     # Generate suggestions
-    suggestions = response_generator.generate_suggestions(
+    suggestions = responder.generate_suggestions(
         nlp_result['intent'],
         nlp_result['entities'],
         nlp_result['context']
     )
     
-    # Add bot message to session
-    bot_msg = Message(content=response_text, is_user=False)
-    session.add_message(bot_msg)
-    
-    # Update session context
-    session.context.update({
-        'last_intent': nlp_result['intent'],
-        'last_entities': nlp_result['entities'],
-        'last_context': nlp_result['context']
-    })
-    
-    # Save session to file (optional)
-    _save_session(session)
-    
-    return jsonify({
-        "response": response_text,
-        "suggestions": suggestions,
-        "nlp_result": nlp_result,
-        "response_source": response_source
-    })
+    return nlp_result, response_text, response_source, suggestions
 
 @chat_bp.route('/preferences', methods=['POST'])
 def update_preferences():
@@ -174,60 +247,47 @@ def update_preferences():
         return jsonify({"error": "No user_id provided"}), 400
     
     # Update preferences in knowledge base
-    knowledge_base.update_user_preferences(user_id, preferences)
+    knowledge_base.get().update_user_preferences(user_id, preferences)
     
     return jsonify({"status": "success", "message": "Preferences updated successfully"})
 
 @chat_bp.route('/history/<user_id>', methods=['GET'])
 def get_history(user_id):
-    """Endpoint untuk mendapatkan riwayat chat HANYA dari file penyimpanan."""
-    
-    try:
-        # --- SOLUSI PALING STABIL DENGAN DEBUGGING LENGKAP ---
-        
-        # 1. Dapatkan path absolut dari file ini (misal: C:\...\backend\routes\chat.py)
-        # os.path.realpath akan mengatasi masalah symbolic links
-        current_file_path = os.path.realpath(__file__)
-        print(f"[DEBUG] Path file route ini: {current_file_path}")
-
-        # 2. Dapatkan direktori dari file ini (misal: C:\...\backend\routes)
-        current_directory = os.path.dirname(current_file_path)
-        print(f"[DEBUG] Direktori route ini: {current_directory}")
-
-        # 3. Bangun path ke folder sessions
-        sessions_dir = os.path.join(current_directory, '..', 'sessions')
-        # os.path.normpath akan membersihkan path (mengganti / dengan \ di Windows, dll.)
-        sessions_dir = os.path.normpath(sessions_dir)
-        print(f"[DEBUG] Path folder sessions yang diasumsikan: {sessions_dir}")
-        
-        # 4. Bangun path lengkap ke file JSON
-        file_path = os.path.join(sessions_dir, f"{user_id}.json")
-        
-        # INI ADALAH PRINT PALING PENTING
-        print(f"Mencari file riwayat di path absolut: {file_path}")
-
-        if os.path.exists(file_path):
-            print(f"File riwayat DITEMUKAN untuk user {user_id}. Membaca dari file.")
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data_from_file = json.load(f)
-                messages_from_file = data_from_file.get('messages')
-
-                if isinstance(messages_from_file, list):
-                    return jsonify({
-                        "user_id": user_id,
-                        "messages": messages_from_file 
-                    })
-                else:
-                    print(f"Error: Key 'messages' tidak ditemukan atau bukan array di file {file_path}.")
-                    return jsonify({"error": "Invalid history file format: 'messages' key missing or not an array"}), 500
-        else:
-            # Jika file tidak ada, berarti memang tidak ada riwayat.
-            print(f"File riwayat TIDAK DITEMUKAN di path: {file_path}")
-            return jsonify({"error": f"No history file found for user {user_id}"}), 404
+    """
+    Endpoint untuk mendapatkan riwayat chat, terbaru dulu per halaman.
 
+    Query params:
+        limit: Jumlah pesan per halaman (default 20, maks MAX_CURSOR_LIMIT)
+        before: next_cursor dari halaman sebelumnya untuk memuat pesan yang lebih lama
+    """
+    limit = max(1, min(request.args.get('limit', 20, type=int), MAX_CURSOR_LIMIT))
+    try:
+        before = request.args.get('before')
+        if before:
+            before = decode_cursor(before, HISTORY_CURSOR_SCOPE)[0]
+            if not isinstance(before, int):
+                raise InvalidCursorError('Cursor tidak valid')
+        page = get_session_store().read_messages_page(user_id, before=before or None, limit=limit)
+    except (InvalidCursorError, InvalidPositionError) as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error kritis dalam get_history: {e}")
         return jsonify({"error": "An internal server error occurred"}), 500
+    
+    if page is None:
+        return jsonify({"error": f"No history file found for user {user_id}"}), 404
+    
+    messages, next_position = page
+    next_cursor = encode_cursor([next_position], HISTORY_CURSOR_SCOPE) if next_position else None
+    
+    def generate():
+        # Pesan diserialisasi satu per satu, tanpa membangun seluruh dokumen JSON di memori
+        yield '{"user_id": %s, "messages": [' % json.dumps(user_id)
+        for index, message in enumerate(messages):
+            yield (',' if index else '') + json.dumps(message, ensure_ascii=False)
+        yield '], "next_cursor": %s, "has_more": %s}' % (json.dumps(next_cursor), json.dumps(next_cursor is not None))
+    
+    return Response(generate(), mimetype='application/json')
 
 
 @chat_bp.route('/init-data', methods=['POST'])
@@ -235,14 +295,20 @@ def initialize_data():
     """Endpoint to initialize sample data"""
     try:
         # Reinitialize knowledge base to create default data
-        global knowledge_base
-        knowledge_base = KnowledgeBase()
+        knowledge_base.reset()
+        knowledge_base.get()
         return jsonify({"status": "success", "message": "Sample data initialized successfully"})
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 def generate_openai_response(user_message: str, nlp_result: Dict[str, Any], kb_data: Dict[str, Any]) -> str:
     """Generate response using OpenAI API"""
+    # Cache yang sama dengan Gemini; model dan parameter ikut di key sehingga tidak tertukar
+    cache_key = build_cache_key(user_message, nlp_result, kb_data, f"openai:{OPENAI_MODEL}", OPENAI_PARAMS)
+    cached_response = response_cache.get().get(cache_key)
+    if cached_response:
+        return cached_response
+
     try:
         # Format knowledge base data for prompt
         kb_context = _format_kb_data_for_prompt(kb_data)
@@ -269,18 +335,20 @@ def generate_openai_response(user_message: str, nlp_result: Dict[str, Any], kb_d
         """
         
         # Call OpenAI API
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
+        response = openai_client.get().ChatCompletion.create(
+            model=OPENAI_MODEL,
             messages=[
                 {"role": "system", "content": system_message},
                 {"role": "user", "content": user_prompt}
             ],
-            max_tokens=500,
-            temperature=0.7
+            **OPENAI_PARAMS
         )
         
-        # Extract and return response text
-        return response.choices[0].message['content'].strip()
+        # Extract and return response text; pesan error di bawah tidak di-cache
+        response_text = response.choices[0].message['content'].strip()
+        if response_text:
+            response_cache.get().set(cache_key, response_text)
+        return response_text
     except Exception as e:
         print(f"Error calling OpenAI API: {e}")
         # Fallback to local response generator
@@ -343,11 +411,29 @@ def _format_kb_data_for_prompt(kb_data: Dict[str, Any]) -> str:
     
     return formatted_text
 
-def _save_session(session: ChatSession) -> None:
-    """Save chat session to file (optional)"""
-    # Create directory if it doesn't exist
-    os.makedirs('sessions', exist_ok=True)
-    
-    # Save to file
-    with open(f'sessions/{session.user_id}.json', 'w', encoding='utf-8') as f:
-        json.dump(session.to_dict(), f, ensure_ascii=False, indent=2)
+
+# Perintah CLI: flask chat import-sessions
+@chat_bp.cli.command('import-sessions')
+def import_sessions_command():
+    """Memindahkan sesi chat berbasis file (folder sessions/) ke CHAT_SESSION_BACKEND"""
+    directory = current_app.config.get('CHAT_SESSIONS_DIR') or DEFAULT_SESSIONS_DIR
+    imported = import_sessions(directory, get_session_store())
+    print(f"✅ {imported} sesi chat diimpor dari {directory}")
+
+
+# Perintah CLI: flask chat train-intents
+@chat_bp.cli.command('train-intents')
+def train_intents_command():
+    """Melatih ulang intent classifier dari chatbot/data/intents.json dan menyimpan artefaknya"""
+    from chatbot.intent_classifier import IntentClassifier
+    classifier = IntentClassifier().train()
+    classifier.save()
+    print(f"✅ Intent classifier ({len(classifier.labels)} intent) disimpan ke {classifier.model_path}")
+
+
+# Perintah CLI: flask chat warm-up
+@chat_bp.cli.command('warm-up')
+def warm_up_command():
+    """Menginisialisasi komponen chatbot dan menampilkan waktunya"""
+    for name, seconds in warm_up_chatbot().items():
+        print(f"✅ {name}: {seconds * 1000:.1f} ms")
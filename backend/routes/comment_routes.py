@@ -4,6 +4,10 @@ from models import db
 from models.comment import Comment
 from models.notification import Notification
 from utils.validation import validate_comment_data
+from utils.moderation import check_content
+from services.forum_service import adjust_forum_counters
+from services.notification_service import discard_notifications
+from services.search_service import index_comment, remove_comment_from_index
 from datetime import datetime
 
 comment_bp = Blueprint('comment', __name__, url_prefix='/api/comments')
@@ -29,10 +33,13 @@ def update_comment(comment_id):
     error = validate_comment_data(data.get('content'))
     if error:
         return jsonify({'message': error}), 400
+    if check_content(data.get('content')):
+        return jsonify({'message': 'Konten mengandung kata yang tidak pantas'}), 400
     
     try:
         comment.content = data.get('content')
         comment.updated_at = datetime.utcnow()
+        index_comment(comment)
         db.session.commit()
         
         return jsonify({
@@ -72,9 +79,11 @@ def delete_comment(comment_id):
     
     try:
         # Hapus notifikasi terkait komentar
-        Notification.query.filter_by(comment_id=comment_id).delete()
+        discard_notifications(Notification.comment_id == comment_id)
         
         db.session.delete(comment)
+        adjust_forum_counters(comment.forum_id, comments=-1)
+        remove_comment_from_index(comment_id)
         db.session.commit()
         
         return jsonify({'message': 'Komentar berhasil dihapus'}), 200
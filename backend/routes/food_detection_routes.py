@@ -1,8 +1,10 @@
 from flask import Flask, Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models.daily_nutrition_log import DailyNutritionLog  
+from models.meal_log import MEAL_NUTRIENTS
 from models.user import User
-from services.nutrition_service import calculate_nutrition_goals
+from services.nutrition_service import (
+    calculate_nutrition_goals, add_to_daily_log, get_daily_log, record_meal
+)
 from models import db
 import os
 import datetime
@@ -26,15 +28,6 @@ UPLOAD_FOLDER = 'uploads'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 
-def find_or_create_log(user_id, session):
-    """Finds today's log for a user or creates a new one if it doesn't exist."""
-    today = date.today()
-    log = DailyNutritionLog.query.filter_by(user_id=user_id, date=today).first()
-    if not log:
-        log = DailyNutritionLog(user_id=user_id, date=today)
-        session.add(log)
-    return log
-
 @food_detection_bp.route('/detect_food', methods=['POST'])
 def detect_food():
     if 'file' not in request.files:
@@ -102,14 +95,8 @@ def get_nutritional_info():
 @food_detection_bp.route('/store_nutritional_info', methods=['POST'])
 @jwt_required()
 def store_nutritional_info(): 
-    from models import db  
-    from models.daily_nutrition_log import DailyNutritionLog
-    from models.user import User
-    from datetime import date 
-
-    print("Store nutritional info route hit")
-    data = request.get_json()
-    print("→ payload:", data)
+    """Saves one meal and adds it to today's totals."""
+    data = request.get_json() or {}
 
     raw_id = get_jwt_identity()
     try:
@@ -117,36 +104,20 @@ def store_nutritional_info():
     except (TypeError, ValueError):
         return jsonify({'error': 'Invalid user_id format'}), 400
 
-    calories = data.get('calories')
-    protein = data.get('protein')
-    fat = data.get('fat')
-    carbs = data.get('carbs') 
-    folic_acid = data.get('folic_acid', 0)
-    iron = data.get('iron', 0)            
-    calcium = data.get('calcium', 0)      
-    zinc = data.get('zinc', 0)  
-
-    if not user_id:
-        return jsonify({'error': 'Missing user_id'}), 400
+    nutrients = {}
+    for nutrient in MEAL_NUTRIENTS:
+        try:
+            nutrients[nutrient] = float(data.get(nutrient) or 0)
+        except (TypeError, ValueError):
+            return jsonify({'error': f'Invalid value for {nutrient}'}), 400
 
     user = User.query.get(user_id)
     if not user:
         return jsonify({'error': 'User not found'}), 404
 
-    nutrition_entry = DailyNutritionLog(
-        user_id=user_id,
-        daily_calories=calories,
-        daily_protein=protein,
-        daily_fat=fat,
-        daily_carbs=carbs,
-        daily_folic_acid=folic_acid, 
-        daily_iron=iron,             
-        daily_calcium=calcium,       
-        daily_zinc=zinc,  
-        date=date.today()
-    )
-    db.session.add(nutrition_entry)
     try:
+        # Meal row and daily total are written in the same transaction
+        record_meal(user_id, nutrients)
         db.session.commit()
         return jsonify({'message': 'Nutrition info saved successfully'})
     except Exception as e:
@@ -243,7 +214,7 @@ def get_nutrition_goal():
 @jwt_required()
 def get_today_log():
     user_id = int(get_jwt_identity())
-    log = find_or_create_log(user_id, db.session)
+    log = get_daily_log(user_id, date.today())
 
     return jsonify(log.to_dict()), 200
 
@@ -254,12 +225,13 @@ def log_water():
     user_id = int(get_jwt_identity())
     
     try:
-        log = find_or_create_log(user_id, db.session)
-        log.daily_water += 250  # Add 250ml for one glass of water
+        today = date.today()
+        add_to_daily_log(user_id, today, daily_water=250)  # Add 250ml for one glass of water
+        new_total = get_daily_log(user_id, today).daily_water
         db.session.commit()
         return jsonify({
             'message': 'Water logged successfully.',
-            'new_total_water': log.daily_water
+            'new_total_water': new_total
         }), 200
     except Exception as e:
         db.session.rollback()
@@ -277,12 +249,13 @@ def log_sleep():
         return jsonify({'error': 'Invalid "hours" value provided.'}), 400
 
     try:
-        log = find_or_create_log(user_id, db.session)
-        log.daily_sleep += hours_to_add
+        today = date.today()
+        add_to_daily_log(user_id, today, daily_sleep=hours_to_add)
+        new_total = get_daily_log(user_id, today).daily_sleep
         db.session.commit()
         return jsonify({
             'message': 'Sleep logged successfully.',
-            'new_total_sleep': log.daily_sleep
+            'new_total_sleep': new_total
         }), 200
     except Exception as e:
         db.session.rollback()
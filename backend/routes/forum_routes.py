@@ -1,19 +1,32 @@
+import click
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db
 from models.forum import Forum
 from models.comment import Comment
 from models.like import Like
-from models.notification import Notification
-from utils.file_handler import save_image, delete_image
+from utils.file_handler import save_image
 from utils.validation import validate_forum_data, validate_comment_data
 from utils.auth_middleware import admin_required
+from utils.moderation import check_content
+from services.forum_service import (
+    get_forum_page, get_forum_cursor_page, get_forum_with_stats, serialize_forum_row,
+    adjust_forum_counters, reconcile_forum_counters, delete_forum_cascade, delete_forum_task,
+    search_forum_content
+)
+from services.search_service import index_forum, index_comment, rebuild_search_index
+from services.notification_dispatcher import notification_dispatcher
+from utils.pagination import InvalidCursorError, cursor_args, keyset_paginate
+from sqlalchemy.orm import joinedload
 from datetime import datetime
 import os
+import threading
 from datetime import date
 
 forum_bp = Blueprint('forum', __name__, url_prefix='/api/forums')
 
+MODERATION_MESSAGE = 'Konten mengandung kata yang tidak pantas'
+
 # Mendapatkan semua forum
 @forum_bp.route('', methods=['GET'])
 def get_all_forums():
@@ -22,43 +35,35 @@ def get_all_forums():
     
     # Filter by user_id jika ada
     user_id = request.args.get('user_id', type=int)
-    query = Forum.query
-    
-    if user_id:
-        query = query.filter_by(user_id=user_id)
     
     # Sorting
     sort_by = request.args.get('sort_by', 'created_at')
     order = request.args.get('order', 'desc')
     
-    if sort_by == 'likes':
-        # Ini perlu query yang lebih kompleks untuk sorting berdasarkan jumlah like
-        # Implementasi sederhana untuk demo
-        if order == 'asc':
-            query = query.order_by(Forum.id.asc())
-        else:
-            query = query.order_by(Forum.id.desc())
-    else:
-        # Default sorting by created_at
-        if order == 'asc':
-            query = query.order_by(Forum.created_at.asc())
-        else:
-            query = query.order_by(Forum.created_at.desc())
-    
-    # Pagination
-    forums_page = query.paginate(page=page, per_page=per_page, error_out=False)
-    forums = forums_page.items
-    
-    # Get user info for each forum
-    from models.user import User
-    
-    result = []
-    for forum in forums:
-        forum_dict = forum.to_dict()
-        user = User.query.get(forum.user_id)
-        if user:
-            forum_dict['username'] = user.username
-        result.append(forum_dict)
+    # Mode cursor (keyset) jika parameter cursor dikirim, tanpa OFFSET
+    cursor, with_total = cursor_args(request.args)
+    if cursor is not None:
+        try:
+            forums_page = get_forum_cursor_page(
+                cursor=cursor,
+                limit=per_page,
+                user_id=user_id,
+                sort_by=sort_by,
+                order=order,
+                with_total=with_total
+            )
+        except InvalidCursorError as e:
+            return jsonify({'message': str(e)}), 400
+        return jsonify(forums_page.to_dict('forums', serialize_forum_row)), 200
+    
+    # Pagination, username dan statistik forum diambil dalam satu query
+    result, forums_page = get_forum_page(
+        page=page,
+        per_page=per_page,
+        user_id=user_id,
+        sort_by=sort_by,
+        order=order
+    )
     
     return jsonify({
         'forums': result,
@@ -70,30 +75,18 @@ def get_all_forums():
 # Mendapatkan detail forum
 @forum_bp.route('/<int:forum_id>', methods=['GET'])
 def get_forum(forum_id):
-    forum = Forum.query.get(forum_id)
+    # Get forum info beserta username dan statistiknya
+    forum_dict = get_forum_with_stats(forum_id)
     
-    if not forum:
+    if not forum_dict:
         return jsonify({'message': 'Forum tidak ditemukan'}), 404
     
-    # Get forum info
-    forum_dict = forum.to_dict()
-    
-    # Get user info
-    from models.user import User
-    user = User.query.get(forum.user_id)
-    if user:
-        forum_dict['username'] = user.username
-    
-    # Get comments
-    comments = Comment.query.filter_by(forum_id=forum_id).order_by(Comment.created_at.desc()).all()
-    comments_list = []
-    
-    for comment in comments:
-        comment_dict = comment.to_dict()
-        comment_user = User.query.get(comment.user_id)
-        if comment_user:
-            comment_dict['username'] = comment_user.username
-        comments_list.append(comment_dict)
+    # Get comments, user dimuat sekaligus lewat JOIN
+    comments = Comment.query.options(joinedload(Comment.user)) \
+                      .filter_by(forum_id=forum_id) \
+                      .order_by(Comment.created_at.desc()) \
+                      .all()
+    comments_list = [comment.to_dict() for comment in comments]
     
     forum_dict['comments'] = comments_list
     
@@ -113,6 +106,29 @@ def get_forum(forum_id):
     
     return jsonify(forum_dict), 200
 
+# Mencari forum dan komentar (BM25 pada inverted index lokal)
+@forum_bp.route('/search', methods=['GET'])
+def search_forums():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'message': 'Parameter q wajib diisi'}), 400
+    
+    search_type = request.args.get('type', 'all')
+    doc_types = {'all': ('forum', 'comment'), 'forum': ('forum',), 'comment': ('comment',)}.get(search_type)
+    if doc_types is None:
+        return jsonify({'message': 'Parameter type harus all, forum, atau comment'}), 400
+    
+    limit = max(1, min(request.args.get('limit', 20, type=int), 50))
+    offset = max(0, min(request.args.get('offset', 0, type=int), 500))
+    
+    results, total = search_forum_content(query, doc_types, limit=limit, offset=offset)
+    return jsonify({
+        'query': query,
+        'results': results,
+        'total': total,
+        'has_more': offset + len(results) < total
+    }), 200
+
 # Membuat forum baru
 @forum_bp.route('', methods=['POST'])
 @jwt_required()
@@ -129,6 +145,8 @@ def create_forum():
         error = validate_forum_data(title, description)
         if error:
             return jsonify({'message': error}), 400
+        if check_content(title) or check_content(description):
+            return jsonify({'message': MODERATION_MESSAGE}), 400
         
         # Save image if provided
         image_path = None
@@ -143,6 +161,8 @@ def create_forum():
         error = validate_forum_data(data.get('title'), data.get('description'))
         if error:
             return jsonify({'message': error}), 400
+        if check_content(data.get('title')) or check_content(data.get('description')):
+            return jsonify({'message': MODERATION_MESSAGE}), 400
         
         title = data.get('title')
         description = data.get('description')
@@ -158,6 +178,8 @@ def create_forum():
     
     try:
         db.session.add(new_forum)
+        db.session.flush()
+        index_forum(new_forum)
         db.session.commit()
         
         # Return forum data
@@ -186,9 +208,6 @@ def update_forum(forum_id):
     if not forum:
         return jsonify({'message': 'Forum tidak ditemukan'}), 404
 
-    # Debugging: log id user dan owner forum
-    print(f"[DEBUG] current_user_id: {current_user_id}, forum.user_id: {forum.user_id}")
-
     # Gunakan type casting untuk memastikan tipe data sama
     try:
         if int(forum.user_id) != int(current_user_id):
@@ -200,6 +219,8 @@ def update_forum(forum_id):
     data = request.get_json()
     if not data:
         return jsonify({'message': 'Data tidak ditemukan'}), 400
+    if check_content(data.get('title')) or check_content(data.get('description')):
+        return jsonify({'message': MODERATION_MESSAGE}), 400
 
     if 'title' in data:
         forum.title = data['title']
@@ -208,6 +229,7 @@ def update_forum(forum_id):
 
     try:
         forum.updated_at = datetime.utcnow()
+        index_forum(forum)
         db.session.commit()
         return jsonify({'message': 'Forum berhasil diperbarui', 'forum': forum.to_dict()}), 200
     except Exception as e:
@@ -229,18 +251,21 @@ def delete_forum(forum_id):
     if int(forum.user_id) != int(current_user_id):
         return jsonify({'message': 'Akses ditolak'}), 403
 
-    try:
-        # Hapus notifikasi terkait komentar
-        Notification.query.filter(
-            Notification.forum_id == forum_id
-        ).delete(synchronize_session=False)
-        
-        # Hapus komentar
-        Comment.query.filter_by(forum_id=forum_id).delete()
+    # Mode background: penghapusan berjalan per chunk di thread terpisah
+    if request.args.get('background', 'false').lower() in ('1', 'true', 'yes'):
+        app = current_app._get_current_object()
+        thread = threading.Thread(
+            target=delete_forum_task,
+            args=(app, forum_id, current_app.config.get('FORUM_DELETE_CHUNK_SIZE') or 1000)
+        )
+        thread.daemon = True
+        thread.start()
         
-        # Hapus forum
-        db.session.delete(forum)
-        db.session.commit()
+        return jsonify({'message': 'Forum sedang dihapus', 'status': 'processing'}), 202
+
+    try:
+        # Notifikasi, like, komentar, lalu forum dihapus dengan bulk DELETE
+        delete_forum_cascade(forum_id, chunk_size=current_app.config.get('FORUM_DELETE_CHUNK_SIZE'))
         
         return jsonify({'message': 'Forum berhasil dihapus'}), 200
     except Exception as e:
@@ -264,6 +289,8 @@ def add_comment(forum_id):
     error = validate_comment_data(data.get('content'))
     if error:
         return jsonify({'message': error}), 400
+    if check_content(data.get('content')):
+        return jsonify({'message': MODERATION_MESSAGE}), 400
     
     # Create new comment
     new_comment = Comment(
@@ -274,21 +301,13 @@ def add_comment(forum_id):
     
     try:
         db.session.add(new_comment)
+        adjust_forum_counters(forum_id, comments=1)
+        db.session.flush()
+        index_comment(new_comment)
         db.session.commit()
         
-        # Create notification for forum owner if commenter is not the owner
-        if forum.user_id != current_user_id:
-            from models.user import User
-            commenter = User.query.get(current_user_id)
-            
-            notification = Notification(
-                message=f"{commenter.username} mengomentari forum Anda '{forum.title}'",
-                user_id=forum.user_id,
-                forum_id=forum_id,
-                comment_id=new_comment.id
-            )
-            db.session.add(notification)
-            db.session.commit()
+        # Notifikasi untuk pemilik forum ditulis di background oleh dispatcher
+        notification_dispatcher.notify_comment(forum, current_user_id, new_comment.id)
         
         # Return comment data with username
         comment_dict = new_comment.to_dict()
@@ -318,22 +337,30 @@ def get_forum_comments(forum_id):
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
     
-    comments_page = Comment.query.filter_by(forum_id=forum_id) \
-                         .order_by(Comment.created_at.desc()) \
-                         .paginate(page=page, per_page=per_page, error_out=False)
-    
-    comments = comments_page.items
+    query = Comment.query.options(joinedload(Comment.user)).filter_by(forum_id=forum_id)
+    
+    # Mode cursor (keyset) pada (created_at, id)
+    cursor, with_total = cursor_args(request.args)
+    if cursor is not None:
+        try:
+            comments_page = keyset_paginate(
+                query,
+                columns=[Comment.created_at, Comment.id],
+                key=lambda comment: [comment.created_at, comment.id],
+                cursor=cursor,
+                limit=per_page,
+                with_total=with_total,
+                scope=f'comments:{forum_id}'
+            )
+        except InvalidCursorError as e:
+            return jsonify({'message': str(e)}), 400
+        return jsonify(comments_page.to_dict('comments', lambda comment: comment.to_dict())), 200
     
-    # Get user info for each comment
-    from models.user import User
+    comments_page = query.order_by(Comment.created_at.desc()) \
+                         .paginate(page=page, per_page=per_page, error_out=False)
     
-    result = []
-    for comment in comments:
-        comment_dict = comment.to_dict()
-        user = User.query.get(comment.user_id)
-        if user:
-            comment_dict['username'] = user.username
-        result.append(comment_dict)
+    # Username sudah dimuat lewat JOIN sehingga tidak ada query tambahan per komentar
+    result = [comment.to_dict() for comment in comments_page.items]
     
     return jsonify({
         'comments': result,
@@ -360,16 +387,23 @@ def toggle_like(forum_id):
     existing_like = Like.query.filter_by(user_id=current_user_id, forum_id=forum_id).first()
     
     try:
+        # Perubahan counter like/dislike forum sesuai aksi
+        delta = 1 if is_like else -1
         if existing_like:
             # If same action (like->like or dislike->dislike), remove the like/dislike
             if existing_like.is_like == is_like:
                 db.session.delete(existing_like)
                 action = 'dihapus'
+                if is_like:
+                    adjust_forum_counters(forum_id, likes=-1)
+                else:
+                    adjust_forum_counters(forum_id, dislikes=-1)
             else:
                 # If different action (like->dislike or dislike->like), update it
                 existing_like.is_like = is_like
                 existing_like.updated_at = datetime.utcnow()
                 action = 'diubah'
+                adjust_forum_counters(forum_id, likes=delta, dislikes=-delta)
         else:
             # Create new like
             new_like = Like(
@@ -379,31 +413,22 @@ def toggle_like(forum_id):
             )
             db.session.add(new_like)
             action = 'ditambahkan'
+            if is_like:
+                adjust_forum_counters(forum_id, likes=1)
+            else:
+                adjust_forum_counters(forum_id, dislikes=1)
         
         db.session.commit()
         
-        # Create notification for forum owner if liker is not the owner
-        if forum.user_id != current_user_id:
-            from models.user import User
-            liker = User.query.get(current_user_id)
-            
-            like_action = "menyukai" if is_like else "tidak menyukai"
-            notification = Notification(
-                message=f"{liker.username} {like_action} forum Anda '{forum.title}'",
-                user_id=forum.user_id,
-                forum_id=forum_id
-            )
-            db.session.add(notification)
-            db.session.commit()
-        
-        # Get updated like counts
-        like_count = Like.query.filter_by(forum_id=forum_id, is_like=True).count()
-        dislike_count = Like.query.filter_by(forum_id=forum_id, is_like=False).count()
+        # Notifikasi untuk pemilik forum ditulis di background oleh dispatcher;
+        # like/unlike berulang pada forum yang sama digabung menjadi satu notifikasi
+        notification_dispatcher.notify_reaction(forum, current_user_id, is_like, removed=(action == 'dihapus'))
         
+        # Counter terbaru dibaca dari baris forum (di-refresh setelah commit)
         return jsonify({
             'message': f'{"Like" if is_like else "Dislike"} berhasil {action}',
-            'like_count': like_count,
-            'dislike_count': dislike_count
+            'like_count': forum.like_count,
+            'dislike_count': forum.dislike_count
         }), 200
     except Exception as e:
         db.session.rollback()
@@ -426,41 +451,48 @@ def get_my_forums():
     sort_by = request.args.get('sort_by', 'created_at')
     order = request.args.get('order', 'desc')
     
-    # Query dasar untuk forum milik pengguna saat ini
-    query = Forum.query.filter_by(user_id=current_user_id)
-    
-    # Logika sorting (sama seperti di get_all_forums)
-    if sort_by == 'likes':
-        # Ini memerlukan query yang lebih kompleks, untuk sekarang menggunakan placeholder
-        if order == 'asc':
-            query = query.order_by(Forum.id.asc())
-        else:
-            query = query.order_by(Forum.id.desc())
-    else:
-        # Default sorting by created_at
-        if order == 'asc':
-            query = query.order_by(Forum.created_at.asc())
-        else:
-            query = query.order_by(Forum.created_at.desc())
-
-    # Pagination
-    forums_page = query.paginate(page=page, per_page=per_page, error_out=False)
-    forums = forums_page.items
-    
-    # Format hasil dan tambahkan username
-    from models.user import User
-    user = User.query.get(current_user_id)
-    username = user.username if user else "Unknown User"
-    
-    result = []
-    for forum in forums:
-        forum_dict = forum.to_dict()
-        forum_dict['username'] = username  # Semua forum di sini dibuat oleh pengguna yang sama
-        result.append(forum_dict)
+    # Mode cursor (keyset), sama seperti get_all_forums
+    cursor, with_total = cursor_args(request.args)
+    if cursor is not None:
+        try:
+            forums_page = get_forum_cursor_page(
+                cursor=cursor,
+                limit=per_page,
+                user_id=current_user_id,
+                sort_by=sort_by,
+                order=order,
+                with_total=with_total
+            )
+        except InvalidCursorError as e:
+            return jsonify({'message': str(e)}), 400
+        return jsonify(forums_page.to_dict('forums', serialize_forum_row)), 200
+    
+    # Query forum milik pengguna saat ini, memakai jalur query yang sama dengan get_all_forums
+    result, forums_page = get_forum_page(
+        page=page,
+        per_page=per_page,
+        user_id=current_user_id,
+        sort_by=sort_by,
+        order=order
+    )
         
     return jsonify({
         'forums': result,
         'total': forums_page.total,
         'pages': forums_page.pages,
         'current_page': page
-    }), 200
\ No newline at end of file
+    }), 200
+
+
+@forum_bp.cli.command('reconcile-counters')
+def reconcile_counters_command():
+    """Menghitung ulang counter like/dislike/komentar semua forum dari tabel dasarnya."""
+    fixed = reconcile_forum_counters()
+    click.echo(f"✅ Counter forum direkonsiliasi, {fixed} forum diperbaiki")
+
+
+@forum_bp.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Membangun ulang indeks pencarian forum dan komentar dari database."""
+    indexed = rebuild_search_index()
+    click.echo(f"✅ Indeks pencarian dibangun ulang, {indexed} dokumen diindeks")
@@ -1,7 +1,18 @@
-from flask import Blueprint, jsonify
+import json
+import time
+
+import click
+from flask import Blueprint, Response, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import func
 from models import db
 from models.notification import Notification
+from services.notification_hub import notification_hub
+from services.notification_service import (
+    get_unread_count, mark_notification_read as mark_read, mark_all_notifications_read as mark_all_read,
+    reconcile_unread_counts
+)
+from utils.pagination import MAX_CURSOR_LIMIT, InvalidCursorError, cursor_args, keyset_paginate
 
 notification_bp = Blueprint('notification', __name__, url_prefix='/api/notifications')
 
@@ -11,19 +22,168 @@ notification_bp = Blueprint('notification', __name__, url_prefix='/api/notificat
 def get_user_notifications():
     current_user_id = get_jwt_identity()
     
-    # Get unread notifications count
-    unread_count = Notification.query.filter_by(user_id=current_user_id, is_read=False).count()
+    # Jumlah belum dibaca diambil dari counter user, bukan COUNT(*) tabel notifikasi
+    unread_count = get_unread_count(current_user_id)
+    
+    # Mode cursor (keyset) pada (is_read, created_at, id): urutan sama dengan mode page,
+    # belum dibaca lebih dulu lalu terbaru lebih dulu
+    cursor, with_total = cursor_args(request.args)
+    if cursor is not None:
+        try:
+            notifications_page = keyset_paginate(
+                Notification.query.filter_by(user_id=current_user_id),
+                columns=[Notification.is_read, Notification.created_at, Notification.id],
+                # is_read disimpan sebagai 0/1: SQLAlchemy menolak < / > terhadap True/False
+                key=lambda notif: [int(bool(notif.is_read)), notif.created_at, notif.id],
+                cursor=cursor,
+                limit=request.args.get('per_page', 20, type=int),
+                descending=[False, True, True],
+                with_total=with_total,
+                scope='notifications:unread_first'
+            )
+        except InvalidCursorError as e:
+            return jsonify({'message': str(e)}), 400
+        result = notifications_page.to_dict('notifications', lambda notif: notif.to_dict())
+        result['unread_count'] = unread_count
+        return jsonify(result), 200
+    
+    # Mode page/per_page, belum dibaca lebih dulu; dibatasi agar tidak memuat seluruh riwayat
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = max(1, min(request.args.get('per_page', 20, type=int), MAX_CURSOR_LIMIT))
     
-    # Get all notifications, with unread first
     notifications = Notification.query.filter_by(user_id=current_user_id) \
-                            .order_by(Notification.is_read, Notification.created_at.desc()) \
+                            .order_by(Notification.is_read, Notification.created_at.desc(), Notification.id.desc()) \
+                            .offset((page - 1) * per_page) \
+                            .limit(per_page + 1) \
                             .all()
     
     return jsonify({
-        'notifications': [notif.to_dict() for notif in notifications],
-        'unread_count': unread_count
+        'notifications': [notif.to_dict() for notif in notifications[:per_page]],
+        'unread_count': unread_count,
+        'current_page': page,
+        'has_more': len(notifications) > per_page
     }), 200
 
+# Jumlah notifikasi belum dibaca untuk badge
+@notification_bp.route('/unread-count', methods=['GET'])
+@jwt_required()
+def get_unread_notification_count():
+    current_user_id = get_jwt_identity()
+    return jsonify({'unread_count': get_unread_count(current_user_id)}), 200
+
+def _sse_event(event, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+# Stream notifikasi baru (Server-Sent Events), pengganti polling /api/notifications
+@notification_bp.route('/stream', methods=['GET'])
+@jwt_required()
+def stream_notifications():
+    """
+    Stream SSE notifikasi user.
+
+    Setiap stream memegang satu thread worker gthread selama hidupnya (maksimal
+    SSE_MAX_STREAM_SECONDS). Agar request biasa tidak kehabisan thread, stream
+    yang terbuka per worker dibatasi SSE_MAX_STREAMS; selebihnya mendapat 503
+    dengan header Retry-After.
+
+    Notifikasi datang dari backend pub/sub; selain itu setiap heartbeat tanpa pesan
+    menjalankan query catch-up ``id > terakhir dikirim`` (SSE_DB_CATCH_UP), sehingga
+    notifikasi yang ditulis worker lain tetap sampai walau backend hanya in-process.
+    """
+    current_user_id = get_jwt_identity()
+    app = current_app._get_current_object()
+    heartbeat = current_app.config.get('SSE_HEARTBEAT_SECONDS', 15)
+    max_duration = current_app.config.get('SSE_MAX_STREAM_SECONDS', 300)
+    replay_limit = current_app.config.get('SSE_REPLAY_LIMIT', 50)
+    db_catch_up = current_app.config.get('SSE_DB_CATCH_UP', True)
+    
+    release_slot = notification_hub.reserve_stream()
+    if release_slot is None:
+        response = jsonify({'message': 'Terlalu banyak stream notifikasi terbuka, coba lagi nanti'})
+        response.headers['Retry-After'] = str(current_app.config.get('SSE_RETRY_AFTER_SECONDS', 10))
+        return response, 503
+    
+    # Berlangganan sebelum membaca database agar tidak ada notifikasi yang terlewat
+    subscription = notification_hub.subscribe(current_user_id)
+    
+    def close():
+        subscription.close()
+        release_slot()
+    
+    try:
+        # Saat reconnect, kirim ulang notifikasi setelah Last-Event-ID yang terakhir diterima
+        last_event_id = request.headers.get('Last-Event-ID', type=int) or request.args.get('last_event_id', type=int)
+        missed = []
+        if last_event_id:
+            missed = [notif.to_dict() for notif in Notification.query
+                      .filter(Notification.user_id == current_user_id, Notification.id > last_event_id)
+                      .order_by(Notification.id)
+                      .limit(replay_limit)
+                      .all()]
+        unread_count = get_unread_count(current_user_id)
+        # Titik awal catch-up: notifikasi yang sudah ada sebelum stream dibuka tidak dikirim ulang
+        latest_id = 0 if last_event_id else db.session.query(func.max(Notification.id)) \
+            .filter(Notification.user_id == current_user_id).scalar() or 0
+    except Exception as e:
+        close()
+        return jsonify({'message': f'Gagal membuka stream notifikasi: {str(e)}'}), 500
+    finally:
+        # Koneksi database dilepas, stream tidak memakai session selama berjalan
+        db.session.remove()
+    
+    def catch_up(after_id):
+        """Notifikasi setelah ``after_id`` dari database (mis. ditulis worker lain)."""
+        with app.app_context():
+            try:
+                return [notif.to_dict() for notif in Notification.query
+                        .filter(Notification.user_id == current_user_id, Notification.id > after_id)
+                        .order_by(Notification.id)
+                        .limit(replay_limit)
+                        .all()]
+            finally:
+                db.session.remove()
+    
+    def generate():
+        # Dengan Last-Event-ID, catch-up melanjutkan replay yang terpotong SSE_REPLAY_LIMIT
+        last_sent = last_event_id or latest_id
+        try:
+            yield 'retry: 3000\n\n'
+            yield _sse_event('unread_count', {'unread_count': unread_count})
+            for payload in missed:
+                last_sent = payload['id']
+                yield _sse_event('notification', payload, payload['id'])
+            
+            deadline = time.monotonic() + max_duration
+            while time.monotonic() < deadline:
+                payload = subscription.get(timeout=min(heartbeat, max(deadline - time.monotonic(), 0)))
+                if payload is None:
+                    caught_up = catch_up(last_sent) if db_catch_up else []
+                    for missed_payload in caught_up:
+                        last_sent = missed_payload['id']
+                        yield _sse_event('notification', missed_payload, missed_payload['id'])
+                    if not caught_up:
+                        yield ': keep-alive\n\n'
+                    continue
+                if payload['id'] <= last_sent:
+                    continue
+                last_sent = payload['id']
+                yield _sse_event('notification', payload, payload['id'])
+        finally:
+            close()
+    
+    # Stream diakhiri setelah SSE_MAX_STREAM_SECONDS; klien EventSource otomatis reconnect
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    response.call_on_close(close)
+    return response
+
 # Menandai notifikasi sebagai telah dibaca
 @notification_bp.route('/<int:notification_id>/read', methods=['POST'])
 @jwt_required()
@@ -36,7 +196,7 @@ def mark_notification_read(notification_id):
         return jsonify({'message': 'Notifikasi tidak ditemukan'}), 404
     
     try:
-        notification.is_read = True
+        mark_read(notification)
         db.session.commit()
         
         return jsonify({'message': 'Notifikasi ditandai sebagai telah dibaca'}), 200
@@ -51,11 +211,18 @@ def mark_all_notifications_read():
     current_user_id = get_jwt_identity()
     
     try:
-        Notification.query.filter_by(user_id=current_user_id, is_read=False) \
-                   .update({Notification.is_read: True})
+        mark_all_read(current_user_id)
         db.session.commit()
         
         return jsonify({'message': 'Semua notifikasi ditandai sebagai telah dibaca'}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'Gagal memperbarui notifikasi: {str(e)}'}), 500
+
+
+# Perintah CLI: flask notification reconcile-unread
+@notification_bp.cli.command('reconcile-unread')
+def reconcile_unread_command():
+    """Menghitung ulang counter notifikasi belum dibaca semua user"""
+    fixed = reconcile_unread_counts()
+    click.echo(f"✅ Counter notifikasi direkonsiliasi, {fixed} user diperbaiki")
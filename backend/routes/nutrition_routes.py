@@ -1,13 +1,11 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from services.nutrition_service import calculate_nutrition_goals
+from services.nutrition_service import calculate_nutrition_goals, get_daily_log
 from models import db
 from models.daily_nutrition import DailyNutrition
 from models.user import User   
-from sqlalchemy import func 
 import datetime
 from datetime import date
-from models.daily_nutrition_log import DailyNutritionLog
 
 nutrition_bp = Blueprint('nutrition', __name__, url_prefix='/nutrition')
 
@@ -61,17 +59,7 @@ def get_today_log():
     except (TypeError, ValueError):
         return jsonify({'error': 'Invalid user identity'}), 400
 
-    today = date.today()
-    log = DailyNutritionLog.query.filter_by(user_id=user_id, date=today).first()
-    if not log:
-        return jsonify({
-            'date': today.isoformat(),
-            'daily_calories': 0,
-            'daily_protein':  0,
-            'daily_fat':      0,
-            'daily_carbs':    0,
-        }), 200
-
+    log = get_daily_log(user_id, date.today())
     return jsonify({
         'date':           log.date.isoformat(),
         'daily_calories': log.daily_calories,
@@ -102,7 +90,6 @@ def get_nutrition_goal():
 def get_nutrition_summary():
     """
     Mengembalikan total konsumsi hari ini + target harian.
-    SEKARANG MENJUMLAHKAN SEMUA LOG HARIAN.
     """
     try:
         user_id = int(get_jwt_identity())
@@ -133,33 +120,15 @@ def get_nutrition_summary():
         'carbs': goal.carbs, 'water_ml': 2000, 'sleep_hours': 8.0
     }
 
-    # --- PERBAIKAN UTAMA ADA DI SINI ---
-    # Alih-alih .first(), kita akan menjumlahkan semua log untuk hari ini
-    
-    # Query untuk menjumlahkan semua nutrisi
-    sum_query = db.session.query(
-        func.sum(DailyNutritionLog.daily_calories).label('total_calories'),
-        func.sum(DailyNutritionLog.daily_protein).label('total_protein'),
-        func.sum(DailyNutritionLog.daily_fat).label('total_fat'),
-        func.sum(DailyNutritionLog.daily_carbs).label('total_carbs')
-    ).filter(
-        DailyNutritionLog.user_id == user_id,
-        DailyNutritionLog.date == today
-    ).one()
-
-    # Query terpisah untuk mengambil log air dan tidur (karena ini tidak dijumlahkan)
-    water_sleep_log = DailyNutritionLog.query.filter(
-        DailyNutritionLog.user_id == user_id,
-        DailyNutritionLog.date == today
-    ).first()
-
+    # Satu baris total harian per (user_id, tanggal), dibaca lewat primary key
+    log = get_daily_log(user_id, today)
     consumed_data = {
-        'daily_calories': sum_query.total_calories or 0,
-        'daily_protein':  sum_query.total_protein or 0,
-        'daily_fat':      sum_query.total_fat or 0,
-        'daily_carbs':    sum_query.total_carbs or 0,
-        'daily_water':    water_sleep_log.daily_water if water_sleep_log else 0,
-        'daily_sleep':    water_sleep_log.daily_sleep if water_sleep_log else 0,
+        'daily_calories': log.daily_calories,
+        'daily_protein':  log.daily_protein,
+        'daily_fat':      log.daily_fat,
+        'daily_carbs':    log.daily_carbs,
+        'daily_water':    log.daily_water,
+        'daily_sleep':    log.daily_sleep,
     }
 
     return jsonify({
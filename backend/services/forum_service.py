@@ -0,0 +1,298 @@
+# services/forum_service.py
+
+import logging
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import joinedload
+
+from models import db
+from models.forum import HOT_SCORE_TOLERANCE, Forum, compute_hot_score
+from models.comment import Comment
+from models.like import Like
+from models.notification import Notification
+from models.user import User
+from services.notification_service import discard_notifications
+from services.search_service import remove_forum_from_index, search_documents
+from utils.pagination import keyset_paginate
+
+logger = logging.getLogger(__name__)
+
+
+def forum_listing_query():
+    """
+    Query dasar untuk daftar forum.
+
+    Setiap baris berisi (Forum, username). Jumlah like/dislike/komentar sudah
+    tersimpan sebagai kolom counter di tabel forums, sehingga satu halaman forum
+    cukup diambil dengan satu statement SQL.
+    """
+    return db.session.query(Forum, User.username) \
+        .outerjoin(User, User.id == Forum.user_id)
+
+
+# Kolom urutan untuk setiap nilai sort_by; semuanya didukung index (kolom, id)
+FORUM_SORT_COLUMNS = {
+    'created_at': Forum.created_at,
+    'likes': Forum.like_count,
+    'hot': Forum.hot_score,
+}
+
+
+def apply_forum_sort(query, sort_by='created_at', order='desc'):
+    """Menerapkan urutan pada query daftar forum, id dipakai sebagai tie-breaker."""
+    column = FORUM_SORT_COLUMNS.get(sort_by, Forum.created_at)
+
+    if order == 'asc':
+        return query.order_by(column.asc(), Forum.id.asc())
+    return query.order_by(column.desc(), Forum.id.desc())
+
+
+def serialize_forum_row(row):
+    """Mengubah satu baris hasil forum_listing_query menjadi dictionary untuk respons API."""
+    forum, username = row
+    forum_dict = forum.to_dict()
+    if username:
+        forum_dict['username'] = username
+    return forum_dict
+
+
+def get_forum_page(page=1, per_page=10, user_id=None, sort_by='created_at', order='desc'):
+    """
+    Mengambil satu halaman forum beserta statistiknya.
+
+    Returns:
+        tuple: (list of dict forum, objek Pagination)
+    """
+    query = forum_listing_query()
+    if user_id:
+        query = query.filter(Forum.user_id == user_id)
+    query = apply_forum_sort(query, sort_by, order)
+
+    forums_page = query.paginate(page=page, per_page=per_page, error_out=False)
+    return [serialize_forum_row(row) for row in forums_page.items], forums_page
+
+
+def get_forum_cursor_page(cursor='', limit=10, user_id=None, sort_by='created_at', order='desc',
+                          with_total=True):
+    """
+    Mengambil satu halaman forum dengan keyset pagination pada (kolom sort, id).
+
+    Raises:
+        InvalidCursorError: Jika cursor tidak valid untuk urutan yang diminta
+    """
+    if sort_by not in FORUM_SORT_COLUMNS:
+        sort_by = 'created_at'
+    descending = order != 'asc'
+    column = FORUM_SORT_COLUMNS[sort_by]
+
+    query = forum_listing_query()
+    if user_id:
+        query = query.filter(Forum.user_id == user_id)
+
+    return keyset_paginate(
+        query,
+        columns=[column, Forum.id],
+        key=lambda row: [getattr(row[0], column.key), row[0].id],
+        cursor=cursor,
+        limit=limit,
+        descending=descending,
+        with_total=with_total,
+        scope=f"forums:{sort_by}:{'desc' if descending else 'asc'}"
+    )
+
+
+def get_forum_with_stats(forum_id):
+    """Mengambil satu forum beserta username dan statistiknya, None jika tidak ada."""
+    row = forum_listing_query().filter(Forum.id == forum_id).first()
+    if not row:
+        return None
+    return serialize_forum_row(row)
+
+
+def search_forum_content(query, doc_types=('forum', 'comment'), limit=20, offset=0):
+    """
+    Mencari forum/komentar dan mengambil datanya dari database (satu query per tipe).
+
+    Returns:
+        tuple: (list of dict hasil, jumlah dokumen yang cocok)
+    """
+    ranked, total = search_documents(query, doc_types, limit, offset)
+
+    forum_ids = [doc_id for _, doc_type, doc_id, _ in ranked if doc_type == 'forum']
+    comment_ids = [doc_id for _, doc_type, doc_id, _ in ranked if doc_type == 'comment']
+
+    forums = {}
+    if forum_ids:
+        forums = {row[0].id: serialize_forum_row(row)
+                  for row in forum_listing_query().filter(Forum.id.in_(forum_ids)).all()}
+    comments = {}
+    if comment_ids:
+        comments = {comment.id: comment.to_dict() for comment in
+                    Comment.query.options(joinedload(Comment.user)).filter(Comment.id.in_(comment_ids)).all()}
+
+    results = []
+    for score, doc_type, doc_id, forum_id in ranked:
+        item = forums.get(doc_id) if doc_type == 'forum' else comments.get(doc_id)
+        if item is None:
+            continue
+        results.append({'type': doc_type, 'id': doc_id, 'forum_id': forum_id, 'score': score, doc_type: item})
+    return results, total
+
+
+def adjust_forum_counters(forum_id, likes=0, dislikes=0, comments=0):
+    """
+    Menambah/mengurangi counter forum secara atomik di sisi database.
+
+    UPDATE ini harus dijalankan di transaksi yang sama dengan perubahan
+    pada tabel likes/comments agar counter tetap konsisten.
+    """
+    values = {}
+    if likes:
+        values[Forum.like_count] = Forum.like_count + likes
+    if dislikes:
+        values[Forum.dislike_count] = Forum.dislike_count + dislikes
+    if comments:
+        values[Forum.comment_count] = Forum.comment_count + comments
+    if not values:
+        return
+
+    Forum.query.filter(Forum.id == forum_id).update(values, synchronize_session=False)
+
+    if likes or dislikes:
+        refresh_hot_score(forum_id)
+
+
+def refresh_hot_score(forum_id):
+    """
+    Menghitung ulang hot_score satu forum dari counter terbarunya.
+
+    Dipanggil setelah UPDATE counter pada transaksi yang sama; baris forum
+    sudah terkunci oleh UPDATE tersebut sehingga counter yang dibaca konsisten.
+    """
+    row = db.session.query(Forum.like_count, Forum.dislike_count, Forum.created_at) \
+        .filter(Forum.id == forum_id).first()
+    if not row:
+        return
+
+    Forum.query.filter(Forum.id == forum_id).update(
+        {Forum.hot_score: compute_hot_score(*row)},
+        synchronize_session=False
+    )
+
+
+def reconcile_forum_counters():
+    """
+    Menghitung ulang counter forum dari tabel likes dan comments, lalu hot_score.
+
+    Returns:
+        int: Jumlah forum yang counternya diperbaiki
+    """
+    like_total = select(func.count(Like.id)) \
+        .where(and_(Like.forum_id == Forum.id, Like.is_like.is_(True))) \
+        .scalar_subquery()
+    dislike_total = select(func.count(Like.id)) \
+        .where(and_(Like.forum_id == Forum.id, Like.is_like.is_(False))) \
+        .scalar_subquery()
+    comment_total = select(func.count(Comment.id)) \
+        .where(Comment.forum_id == Forum.id) \
+        .scalar_subquery()
+
+    fixed = Forum.query.filter(or_(
+        Forum.like_count != like_total,
+        Forum.dislike_count != dislike_total,
+        Forum.comment_count != comment_total
+    )).update({
+        Forum.like_count: like_total,
+        Forum.dislike_count: dislike_total,
+        Forum.comment_count: comment_total
+    }, synchronize_session=False)
+    db.session.commit()
+
+    reconcile_hot_scores()
+    return fixed
+
+
+def reconcile_hot_scores(batch_size=1000):
+    """Menghitung ulang hot_score semua forum secara bertahap per batch."""
+    last_id = 0
+    while True:
+        rows = db.session.query(
+            Forum.id, Forum.like_count, Forum.dislike_count, Forum.created_at, Forum.hot_score
+        ).filter(Forum.id > last_id).order_by(Forum.id).limit(batch_size).all()
+        if not rows:
+            break
+
+        changed = []
+        for forum_id, like_count, dislike_count, created_at, hot_score in rows:
+            score = compute_hot_score(like_count, dislike_count, created_at)
+            if hot_score is None or abs(hot_score - score) > HOT_SCORE_TOLERANCE:
+                changed.append({'id': forum_id, 'hot_score': score})
+        if changed:
+            db.session.bulk_update_mappings(Forum, changed)
+            db.session.commit()
+
+        last_id = rows[-1][0]
+
+
+def _bulk_delete(model, criteria):
+    """DELETE berbasis set tanpa memuat baris ke session."""
+    if model is Notification:
+        return discard_notifications(criteria)
+    return model.query.filter(criteria).delete(synchronize_session=False)
+
+
+def _bulk_delete_in_chunks(model, criteria, chunk_size):
+    """DELETE per chunk id dengan commit setiap chunk agar lock dan undo log tetap kecil."""
+    deleted = 0
+    while True:
+        ids = [row[0] for row in db.session.query(model.id).filter(criteria)
+               .order_by(model.id).limit(chunk_size).all()]
+        if not ids:
+            return deleted
+        deleted += _bulk_delete(model, model.id.in_(ids))
+        db.session.commit()
+
+
+def delete_forum_cascade(forum_id, chunk_size=None):
+    """
+    Menghapus forum beserta notifikasi, like, dan komentarnya dengan bulk DELETE.
+
+    Urutan mengikuti foreign key: notifikasi (milik forum atau komentarnya),
+    like, komentar, lalu dokumen indeks pencarian dan forum. Tanpa chunk_size semuanya dalam satu transaksi;
+    dengan chunk_size setiap tabel dihapus per chunk dan di-commit bertahap.
+
+    Returns:
+        dict: Jumlah baris terhapus per tabel
+    """
+    forum_comment_ids = select(Comment.id).where(Comment.forum_id == forum_id)
+    steps = [
+        ('notifications', Notification,
+         or_(Notification.forum_id == forum_id, Notification.comment_id.in_(forum_comment_ids))),
+        ('likes', Like, Like.forum_id == forum_id),
+        ('comments', Comment, Comment.forum_id == forum_id),
+    ]
+
+    deleted = {}
+    for name, model, criteria in steps:
+        if chunk_size:
+            deleted[name] = _bulk_delete_in_chunks(model, criteria, chunk_size)
+        else:
+            deleted[name] = _bulk_delete(model, criteria)
+
+    remove_forum_from_index(forum_id)
+    deleted['forums'] = Forum.query.filter(Forum.id == forum_id).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+def delete_forum_task(app, forum_id, chunk_size=1000):
+    """Fungsi yang dijalankan di background thread untuk menghapus forum besar."""
+    with app.app_context():
+        try:
+            deleted = delete_forum_cascade(forum_id, chunk_size=chunk_size)
+            logger.info(f"Forum ID {forum_id} dihapus di background: {deleted}")
+        except Exception:
+            db.session.rollback()
+            logger.exception(f"Gagal menghapus forum ID {forum_id} di background")
+        finally:
+            db.session.remove()
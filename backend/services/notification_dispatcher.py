@@ -0,0 +1,399 @@
+# services/notification_dispatcher.py
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy import or_
+
+from models import db
+from models.comment import Comment
+from models.forum import Forum
+from models.notification import Notification
+from models.user import User
+from services.notification_hub import notification_hub
+from services.notification_service import create_notifications, discard_notifications
+
+logger = logging.getLogger(__name__)
+
+# kind: 'comment', 'like', 'dislike', atau 'unreact' (like/dislike dibatalkan)
+NotificationEvent = namedtuple(
+    'NotificationEvent',
+    ['kind', 'recipient_id', 'actor_id', 'forum_id', 'forum_title', 'comment_id']
+)
+
+REACTION_KINDS = ('like', 'dislike', 'unreact')
+
+# Sentinel _run: tidak ada event baru, hanya reaksi tertahan yang sudah jatuh tempo
+_NO_EVENT = object()
+
+
+def _reaction_key(event):
+    return int(event.actor_id), event.forum_id
+
+
+def coalesce_events(events):
+    """
+    Menggabungkan event reaksi berulang dari aktor yang sama pada forum yang sama.
+
+    Hanya reaksi terakhir yang dipertahankan, termasuk pembatalan ('unreact') yang
+    menarik kembali notifikasi reaksi yang sudah tertulis. Event komentar selalu
+    dipertahankan. Urutan event yang tersisa mengikuti posisi event terakhirnya.
+    """
+    latest = {}
+    for index, event in enumerate(events):
+        if event.kind in REACTION_KINDS:
+            key = ('reaction',) + _reaction_key(event)
+        else:
+            key = ('event', index)
+        latest.pop(key, None)
+        latest[key] = event
+    return list(latest.values())
+
+
+def _reaction_prefixes(username):
+    return [f"{username} {action} forum Anda '" for action in ("menyukai", "tidak menyukai")]
+
+
+def _build_message(event, username):
+    if event.kind == 'comment':
+        return f"{username} mengomentari forum Anda '{event.forum_title}'"
+    like_action = "menyukai" if event.kind == 'like' else "tidak menyukai"
+    return f"{username} {like_action} forum Anda '{event.forum_title}'"
+
+
+def _retract_reaction(event, username):
+    """
+    Menghapus notifikasi reaksi aktor pada forum ini yang belum dibaca penerimanya,
+    sehingga hanya reaksi terakhir yang tersisa. Tidak melakukan commit.
+    """
+    return discard_notifications(
+        Notification.user_id == event.recipient_id,
+        Notification.forum_id == event.forum_id,
+        Notification.comment_id.is_(None),
+        Notification.is_read.is_(False),
+        or_(*[Notification.message.startswith(prefix, autoescape=True)
+              for prefix in _reaction_prefixes(username)])
+    )
+
+
+def write_notification_batch(events):
+    """
+    Menulis satu batch event notifikasi dalam satu transaksi, lalu mem-publish
+    notifikasi yang tertulis ke stream SSE penerimanya.
+
+    Username aktor diambil dengan satu query. Event reaksi lebih dulu menarik
+    notifikasi reaksi aktor yang sama yang belum dibaca; 'unreact' hanya menarik.
+    Event untuk forum/komentar yang sudah dihapus sebelum batch ditulis diabaikan.
+    Harus dipanggil di dalam app context.
+
+    Returns:
+        list: Objek Notification yang ditulis
+    """
+    events = coalesce_events(events)
+    if not events:
+        return []
+
+    actor_ids = {int(event.actor_id) for event in events}
+    forum_ids = {event.forum_id for event in events}
+    comment_ids = {event.comment_id for event in events if event.comment_id}
+
+    usernames = dict(db.session.query(User.id, User.username).filter(User.id.in_(actor_ids)).all())
+    existing_forums = {row[0] for row in db.session.query(Forum.id).filter(Forum.id.in_(forum_ids)).all()}
+    existing_comments = set()
+    if comment_ids:
+        existing_comments = {
+            row[0] for row in db.session.query(Comment.id).filter(Comment.id.in_(comment_ids)).all()
+        }
+
+    entries = []
+    retracted = 0
+    for event in events:
+        if event.forum_id not in existing_forums:
+            continue
+        if event.comment_id and event.comment_id not in existing_comments:
+            continue
+        username = usernames.get(int(event.actor_id))
+        if not username:
+            continue
+        if event.kind in REACTION_KINDS:
+            retracted += _retract_reaction(event, username)
+            if event.kind == 'unreact':
+                continue
+        entries.append({
+            'user_id': event.recipient_id,
+            'message': _build_message(event, username),
+            'forum_id': event.forum_id,
+            'comment_id': event.comment_id
+        })
+
+    if not entries:
+        if retracted:
+            db.session.commit()
+        return []
+
+    notifications = create_notifications(entries)
+    db.session.flush()
+    # Payload dibentuk sebelum commit agar tidak perlu me-refresh setiap baris
+    payloads = [notification.to_dict() for notification in notifications]
+    db.session.commit()
+
+    notification_hub.publish_notifications(payloads)
+    return notifications
+
+
+class NotificationWorker:
+    """
+    Antrian terbatas dan thread worker milik satu aplikasi Flask.
+
+    Event reaksi ditahan coalesce_window detik sejak event pertama untuk pasangan
+    (aktor, forum); event berikutnya dalam jendela itu menggantikannya, sehingga
+    like/batal/like beruntun hanya menghasilkan satu penulisan. Jendela ini
+    terpisah dari batch_window, yang hanya mengatur pengumpulan batch tulis.
+    """
+
+    def __init__(self, app, maxsize=1000, batch_size=100, batch_window=0.2, coalesce_window=5.0,
+                 enqueue_timeout=0.5):
+        self.app = app
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.coalesce_window = coalesce_window
+        self.enqueue_timeout = enqueue_timeout
+        self._held = {}
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stopping = False
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+
+    def start(self):
+        """Menjalankan thread worker (juga setelah fork, mis. worker gunicorn)."""
+        with self._lock:
+            if self.running:
+                return
+            if self._pid != os.getpid():
+                # Antrian dan thread milik proses induk tidak berlaku setelah fork
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._held = {}
+            self._stopping = False
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='notification-dispatcher')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def enqueue(self, event):
+        """
+        Memasukkan event ke antrian.
+
+        Returns:
+            bool: False jika antrian tetap penuh sampai enqueue_timeout (event dibuang)
+        """
+        if self._stopping:
+            return False
+        if not self.running:
+            self.start()
+        try:
+            self._queue.put(event, timeout=self.enqueue_timeout)
+            return True
+        except queue.Full:
+            logger.warning("Antrian notifikasi penuh, event untuk forum %s dibuang", event.forum_id)
+            return False
+
+    def _collect_batch(self, first):
+        """
+        Mengumpulkan event hingga batch_size atau batch_window detik setelah event pertama.
+
+        Returns:
+            tuple: (batch, stop) dengan stop True jika sentinel shutdown ikut terambil
+        """
+        batch = [first]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    event = self._queue.get(timeout=remaining)
+                else:
+                    event = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if event is None:
+                self._queue.task_done()
+                return batch, True
+            batch.append(event)
+        return batch, False
+
+    def _next_release(self):
+        """Detik sampai reaksi tertahan berikutnya jatuh tempo, None jika tidak ada."""
+        if not self._held:
+            return None
+        return max(min(deadline for deadline, _ in self._held.values()) - time.monotonic(), 0)
+
+    def _hold_reactions(self, batch, release_all=False):
+        """
+        Menahan event reaksi dari batch dan mengembalikan event yang siap ditulis:
+        event lain, ditambah reaksi tertahan yang sudah jatuh tempo (atau semua saat shutdown).
+        """
+        ready = []
+        now = time.monotonic()
+        for event in batch:
+            if event.kind not in REACTION_KINDS or self.coalesce_window <= 0:
+                ready.append(event)
+                continue
+            key = _reaction_key(event)
+            held = self._held.get(key)
+            if held is None:
+                self._held[key] = (now + self.coalesce_window, event)
+            else:
+                # Event yang digantikan tidak akan ditulis, dianggap selesai
+                self._held[key] = (held[0], event)
+                self._queue.task_done()
+        for key, (deadline, event) in list(self._held.items()):
+            if release_all or deadline <= now:
+                del self._held[key]
+                ready.append(event)
+        return ready
+
+    def _run(self):
+        while True:
+            try:
+                event = self._queue.get(timeout=self._next_release())
+            except queue.Empty:
+                event = _NO_EVENT
+
+            if event is None:
+                self._queue.task_done()
+                batch, stop = [], True
+            elif event is _NO_EVENT:
+                batch, stop = [], False
+            else:
+                batch, stop = self._collect_batch(event)
+
+            ready = self._hold_reactions(batch, release_all=stop)
+            if ready:
+                try:
+                    self._write(ready)
+                finally:
+                    for _ in ready:
+                        self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch):
+        with self.app.app_context():
+            try:
+                write_notification_batch(batch)
+            except Exception:
+                db.session.rollback()
+                logger.exception("Gagal menulis batch notifikasi, mencoba per event")
+                # Satu event yang gagal tidak boleh membuang seluruh batch
+                for event in coalesce_events(batch):
+                    try:
+                        write_notification_batch([event])
+                    except Exception:
+                        db.session.rollback()
+                        logger.exception("Notifikasi untuk forum %s gagal ditulis", event.forum_id)
+            finally:
+                db.session.remove()
+
+    def flush(self, timeout=5.0):
+        """Menunggu semua event di antrian selesai ditulis. False jika timeout."""
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def shutdown(self, timeout=5.0):
+        """Menulis sisa antrian lalu menghentikan worker; dipanggil saat proses berhenti."""
+        if not self.running:
+            return
+        self._stopping = True
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+
+class NotificationDispatcher:
+    """
+    Extension Flask untuk membuat notifikasi di luar request.
+
+    Route hanya memasukkan event ke antrian; worker menulisnya per batch dalam
+    satu transaksi. Jika NOTIFICATION_ASYNC dimatikan (atau extension belum
+    di-init), notifikasi ditulis langsung di request.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('NOTIFICATION_ASYNC', True)
+        app.config.setdefault('NOTIFICATION_QUEUE_SIZE', 1000)
+        app.config.setdefault('NOTIFICATION_BATCH_SIZE', 100)
+        app.config.setdefault('NOTIFICATION_BATCH_WINDOW', 0.2)
+        app.config.setdefault('NOTIFICATION_COALESCE_WINDOW', 5.0)
+
+        if not app.config['NOTIFICATION_ASYNC']:
+            return
+
+        worker = NotificationWorker(
+            app,
+            maxsize=app.config['NOTIFICATION_QUEUE_SIZE'],
+            batch_size=app.config['NOTIFICATION_BATCH_SIZE'],
+            batch_window=app.config['NOTIFICATION_BATCH_WINDOW'],
+            coalesce_window=app.config['NOTIFICATION_COALESCE_WINDOW']
+        )
+        app.extensions['notification_dispatcher'] = worker
+        atexit.register(worker.shutdown)
+
+    def _worker(self):
+        return current_app.extensions.get('notification_dispatcher')
+
+    def dispatch(self, event):
+        """Mengirim event notifikasi; dipanggil setelah transaksi utama di-commit."""
+        worker = self._worker()
+        if worker is not None:
+            worker.enqueue(event)
+            return
+        write_notification_batch([event])
+
+    def notify_comment(self, forum, actor_id, comment_id):
+        """Notifikasi komentar baru untuk pemilik forum."""
+        if int(forum.user_id) == int(actor_id):
+            return
+        self.dispatch(NotificationEvent('comment', forum.user_id, actor_id, forum.id, forum.title, comment_id))
+
+    def notify_reaction(self, forum, actor_id, is_like, removed=False):
+        """Notifikasi like/dislike; pembatalan menarik notifikasi reaksi yang belum dibaca."""
+        if int(forum.user_id) == int(actor_id):
+            return
+        kind = 'unreact' if removed else ('like' if is_like else 'dislike')
+        self.dispatch(NotificationEvent(kind, forum.user_id, actor_id, forum.id, forum.title, None))
+
+    def flush(self, timeout=5.0):
+        """Menunggu antrian aplikasi saat ini kosong (dipakai di test dan saat shutdown)."""
+        worker = self._worker()
+        return worker.flush(timeout) if worker is not None else True
+
+    def shutdown(self, timeout=5.0):
+        worker = self._worker()
+        if worker is not None:
+            worker.shutdown(timeout)
+
+
+notification_dispatcher = NotificationDispatcher()
@@ -0,0 +1,210 @@
+# services/notification_hub.py
+
+import logging
+import queue
+import threading
+
+from flask import current_app
+from werkzeug.utils import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """Langganan satu channel; pesan dibaca dengan get()."""
+
+    def get(self, timeout=None):
+        """Mengambil pesan berikutnya, None jika timeout."""
+        raise NotImplementedError
+
+    def close(self):
+        """Berhenti berlangganan."""
+        raise NotImplementedError
+
+
+class PubSubBackend:
+    """
+    Interface backend pub/sub untuk NotificationHub.
+
+    Backend bawaan (InProcessBackend) hanya mengirim pesan di dalam satu proses.
+    Deployment dengan beberapa worker gunicorn dapat memakai broker bersama
+    (mis. Redis pub/sub) dengan mengimplementasikan publish() dan subscribe().
+    """
+
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        """Returns: Subscription"""
+        raise NotImplementedError
+
+
+class InProcessSubscription(Subscription):
+    def __init__(self, backend, channel, maxsize):
+        self._backend = backend
+        self.channel = channel
+        self._queue = queue.Queue(maxsize=maxsize)
+
+    def _deliver(self, message):
+        # Subscriber yang lambat kehilangan pesan terlama, bukan memblokir publisher
+        while True:
+            try:
+                self._queue.put_nowait(message)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._backend._unsubscribe(self)
+
+
+class InProcessBackend(PubSubBackend):
+    """Backend pub/sub di memori proses, aman dipakai dari banyak thread."""
+
+    def __init__(self, subscriber_queue_size=100):
+        self.subscriber_queue_size = subscriber_queue_size
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription._deliver(message)
+        return len(subscribers)
+
+    def subscribe(self, channel):
+        subscription = InProcessSubscription(self, channel, self.subscriber_queue_size)
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._channels[subscription.channel]
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._channels.get(channel, ()))
+
+
+class StreamSlots:
+    """Batas jumlah stream SSE yang terbuka bersamaan dalam satu proses worker."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Mengambil satu slot stream.
+
+        Returns:
+            callable untuk melepas slot (aman dipanggil berkali-kali), atau None jika penuh
+        """
+        with self._lock:
+            if self.active >= self.limit:
+                return None
+            self.active += 1
+
+        released = threading.Event()
+
+        def release():
+            with self._lock:
+                if released.is_set():
+                    return
+                released.set()
+                self.active -= 1
+        return release
+
+
+def user_channel(user_id):
+    return f'notifications:user:{int(user_id)}'
+
+
+class NotificationHub:
+    """
+    Extension Flask yang menyebarkan notifikasi baru ke stream SSE penerimanya.
+
+    Backend dipilih lewat config NOTIFICATION_PUBSUB_BACKEND (import string kelas
+    PubSubBackend atau instance), default InProcessBackend.
+    """
+
+    def __init__(self, app=None, backend=None):
+        if app is not None:
+            self.init_app(app, backend)
+
+    def init_app(self, app, backend=None):
+        app.config.setdefault('NOTIFICATION_PUBSUB_BACKEND', None)
+        app.config.setdefault('SSE_HEARTBEAT_SECONDS', 15)
+        app.config.setdefault('SSE_MAX_STREAM_SECONDS', 300)
+        app.config.setdefault('SSE_REPLAY_LIMIT', 50)
+        app.config.setdefault('SSE_DB_CATCH_UP', True)
+        app.config.setdefault('SSE_MAX_STREAMS', max(app.config.get('GUNICORN_THREADS', 16) // 2, 1))
+        app.config.setdefault('SSE_RETRY_AFTER_SECONDS', 10)
+
+        if backend is None:
+            backend = app.config['NOTIFICATION_PUBSUB_BACKEND'] or InProcessBackend
+        if isinstance(backend, str):
+            backend = import_string(backend)
+        if isinstance(backend, type):
+            backend = backend()
+        app.extensions['notification_hub'] = backend
+        app.extensions['notification_streams'] = StreamSlots(app.config['SSE_MAX_STREAMS'])
+
+        if isinstance(backend, InProcessBackend) and app.config.get('GUNICORN_WORKERS', 1) > 1:
+            # Notifikasi yang ditulis worker lain tidak lewat backend ini; stream hanya
+            # menerimanya dari query catch-up database setiap heartbeat
+            logger.warning(
+                "NOTIFICATION_PUBSUB_BACKEND tidak diset dengan %s worker: notifikasi dari worker lain "
+                "sampai ke stream SSE lewat query catch-up tiap %s detik%s",
+                app.config['GUNICORN_WORKERS'], app.config['SSE_HEARTBEAT_SECONDS'],
+                '' if app.config['SSE_DB_CATCH_UP'] else ' (SSE_DB_CATCH_UP nonaktif: TIDAK sampai sampai reconnect)'
+            )
+
+    @property
+    def backend(self):
+        return current_app.extensions.get('notification_hub')
+
+    def publish(self, user_id, payload):
+        backend = self.backend
+        if backend is None:
+            return
+        try:
+            backend.publish(user_channel(user_id), payload)
+        except Exception:
+            # Kegagalan push tidak boleh menggagalkan penulisan notifikasi
+            logger.exception("Gagal mem-publish notifikasi untuk user %s", user_id)
+
+    def publish_notifications(self, payloads):
+        """Mem-publish dict notifikasi (hasil to_dict()) ke channel penerimanya masing-masing."""
+        for payload in payloads:
+            self.publish(payload['user_id'], payload)
+
+    def reserve_stream(self):
+        """Slot stream SSE proses ini; None jika SSE_MAX_STREAMS sudah tercapai."""
+        return current_app.extensions['notification_streams'].reserve()
+
+    def subscribe(self, user_id):
+        backend = self.backend
+        if backend is None:
+            raise RuntimeError('NotificationHub belum di-init untuk aplikasi ini')
+        return backend.subscribe(user_channel(user_id))
+
+
+notification_hub = NotificationHub()
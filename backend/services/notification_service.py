@@ -0,0 +1,118 @@
+# services/notification_service.py
+
+from collections import Counter
+
+from sqlalchemy import func, select
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models import db
+from models.notification import Notification
+from models.user import User
+
+
+def adjust_unread_count(user_id, delta):
+    """Menambah/mengurangi counter notifikasi belum dibaca milik user secara atomik."""
+    if not delta:
+        return
+    User.query.filter(User.id == user_id).update(
+        {User.unread_notification_count: User.unread_notification_count + delta},
+        synchronize_session=False
+    )
+
+
+def create_notifications(entries):
+    """
+    Menambahkan banyak notifikasi sekaligus; counter setiap penerima dinaikkan satu kali.
+
+    Args:
+        entries: List dict dengan key user_id, message, forum_id, comment_id
+
+    Tidak melakukan commit.
+    """
+    notifications = [Notification(**entry) for entry in entries]
+    db.session.add_all(notifications)
+    for user_id, count in Counter(entry['user_id'] for entry in entries).items():
+        adjust_unread_count(user_id, count)
+    return notifications
+
+
+def mark_notification_read(notification):
+    """
+    Menandai satu notifikasi sebagai dibaca. Tidak melakukan commit.
+
+    UPDATE bersyarat is_read = false: dari request yang bersamaan untuk notifikasi
+    yang sama hanya satu yang mengubah baris, jadi counter hanya dikurangi sekali.
+
+    Returns:
+        bool: True jika notifikasi baru saja berubah menjadi dibaca
+    """
+    updated = Notification.query.filter_by(id=notification.id, is_read=False) \
+        .update({Notification.is_read: True}, synchronize_session=False)
+    set_committed_value(notification, 'is_read', True)
+    adjust_unread_count(notification.user_id, -updated)
+    return bool(updated)
+
+
+def mark_all_notifications_read(user_id):
+    """
+    Menandai semua notifikasi user sebagai dibaca. Tidak melakukan commit.
+
+    Counter dikurangi sebanyak baris yang benar-benar berubah sehingga notifikasi
+    yang masuk bersamaan tidak ikut terhapus dari hitungan.
+    """
+    updated = Notification.query.filter_by(user_id=user_id, is_read=False) \
+        .update({Notification.is_read: True}, synchronize_session=False)
+    adjust_unread_count(user_id, -updated)
+    return updated
+
+
+def discard_notifications(*criteria):
+    """
+    Menghapus notifikasi yang memenuhi kriteria dan menyesuaikan counter penerimanya.
+
+    Tidak melakukan commit.
+
+    Returns:
+        int: Jumlah notifikasi yang dihapus
+    """
+    # Notifikasi belum dibaca dihapus per penerima; counter dikurangi sebanyak baris yang
+    # benar-benar terhapus (rowcount), bukan hasil hitungan sebelumnya, sehingga notifikasi
+    # yang ditandai dibaca bersamaan tidak dikurangi dua kali
+    deleted = 0
+    while True:
+        user_ids = [user_id for user_id, in db.session.query(Notification.user_id)
+                    .filter(*criteria, Notification.is_read.is_(False)).distinct()]
+        if not user_ids:
+            break
+        for user_id in user_ids:
+            unread = Notification.query \
+                .filter(*criteria, Notification.user_id == user_id, Notification.is_read.is_(False)) \
+                .delete(synchronize_session=False)
+            adjust_unread_count(user_id, -unread)
+            deleted += unread
+
+    # Sisanya sudah dibaca dan tidak memengaruhi counter
+    return deleted + Notification.query.filter(*criteria).delete(synchronize_session=False)
+
+
+def get_unread_count(user_id):
+    """Mengambil jumlah notifikasi belum dibaca dari counter user (lookup primary key)."""
+    count = db.session.query(User.unread_notification_count).filter(User.id == user_id).scalar()
+    return count or 0
+
+
+def reconcile_unread_counts():
+    """
+    Menghitung ulang counter notifikasi belum dibaca semua user dari tabel notifications.
+
+    Returns:
+        int: Jumlah user yang counternya diperbaiki
+    """
+    unread_total = select(func.count(Notification.id)) \
+        .where(Notification.user_id == User.id, Notification.is_read.is_(False)) \
+        .scalar_subquery()
+
+    fixed = User.query.filter(User.unread_notification_count != unread_total) \
+        .update({User.unread_notification_count: unread_total}, synchronize_session=False)
+    db.session.commit()
+    return fixed
@@ -2,6 +2,19 @@
 
 from datetime import date, timedelta
 
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from models import db
+from models.daily_nutrition_log import DAILY_TOTAL_COLUMNS, DailyNutritionLog
+from models.meal_log import MEAL_NUTRIENTS, MealLog
+
+# Dialek yang mendukung INSERT ... ON CONFLICT DO UPDATE
+_ON_CONFLICT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+# Jumlah percobaan UPDATE lalu INSERT pada dialek tanpa upsert native
+DAILY_UPSERT_ATTEMPTS = 3
+
 def calculate_due_date(lmp_date):
     """Menghitung perkiraan tanggal lahir (HPL) dari HPHT."""
     return lmp_date + timedelta(days=280)
@@ -53,4 +66,102 @@ def calculate_nutrition_goals(age, weight, height, lmp_date):
         "protein": protein_grams,
         "fat": fat_grams,
         "carbs": carbs_grams
-    }
\ No newline at end of file
+    }
+
+
+def _daily_upsert(user_id, day, increments):
+    """
+    INSERT baris harian, atau tambahkan increments ke baris (user_id, day) yang sudah ada,
+    dalam satu statement atomik sehingga request bersamaan tidak saling menimpa.
+
+    Returns:
+        Statement upsert, atau None jika dialek tidak punya upsert native
+    """
+    table = DailyNutritionLog.__table__
+    values = _daily_insert_values(user_id, day, increments)
+
+    dialect = db.engine.dialect.name
+    if dialect == 'mysql':
+        stmt = mysql.insert(table).values(**values)
+        return stmt.on_duplicate_key_update(
+            {column: table.c[column] + stmt.inserted[column] for column in increments}
+        )
+    if dialect in _ON_CONFLICT_INSERTS:
+        stmt = _ON_CONFLICT_INSERTS[dialect](table).values(**values)
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.date],
+            set_={column: table.c[column] + stmt.excluded[column] for column in increments}
+        )
+    return None
+
+
+def _daily_insert_values(user_id, day, increments):
+    values = {column: 0 for column in DAILY_TOTAL_COLUMNS}
+    values.update(increments)
+    values.update(user_id=user_id, date=day)
+    return values
+
+
+def _daily_update_or_insert(user_id, day, increments):
+    """
+    Jalur generik untuk dialek tanpa upsert native: UPDATE increment, lalu INSERT jika
+    belum ada baris. INSERT dijalankan dalam savepoint; jika request lain lebih dulu
+    membuat baris yang sama (IntegrityError), savepoint dibatalkan dan UPDATE diulang.
+    """
+    table = DailyNutritionLog.__table__
+    update = table.update() \
+        .where(table.c.user_id == user_id, table.c.date == day) \
+        .values({column: table.c[column] + amount for column, amount in increments.items()})
+
+    for attempt in range(DAILY_UPSERT_ATTEMPTS):
+        if db.session.execute(update).rowcount:
+            return
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.insert().values(**_daily_insert_values(user_id, day, increments)))
+            return
+        except IntegrityError:
+            if attempt == DAILY_UPSERT_ATTEMPTS - 1:
+                raise
+
+
+def add_to_daily_log(user_id, day, **increments):
+    """
+    Menambah total harian user, mis. add_to_daily_log(1, date.today(), daily_water=250).
+    Tidak melakukan commit.
+
+    Raises:
+        ValueError: Jika nama kolom bukan kolom total harian
+    """
+    unknown = set(increments) - set(DAILY_TOTAL_COLUMNS)
+    if unknown:
+        raise ValueError(f"Kolom log harian tidak dikenal: {', '.join(sorted(unknown))}")
+    if not increments:
+        return
+    stmt = _daily_upsert(user_id, day, increments)
+    if stmt is not None:
+        db.session.execute(stmt)
+    else:
+        _daily_update_or_insert(user_id, day, increments)
+
+
+def get_daily_log(user_id, day):
+    """Log harian (user_id, day) lewat lookup primary key; log bernilai nol jika belum ada."""
+    log = db.session.get(DailyNutritionLog, (user_id, day), populate_existing=True)
+    return log if log is not None else DailyNutritionLog.empty(user_id, day)
+
+
+def record_meal(user_id, nutrients, day=None):
+    """
+    Menyimpan satu kali makan ke MealLog dan menambah totalnya ke log harian.
+    Tidak melakukan commit.
+
+    Args:
+        nutrients: dict nama nutrien (MEAL_NUTRIENTS) -> jumlah; yang tidak ada dianggap 0
+    """
+    day = day or date.today()
+    amounts = {nutrient: float(nutrients.get(nutrient) or 0) for nutrient in MEAL_NUTRIENTS}
+    meal = MealLog(user_id=user_id, date=day, **amounts)
+    db.session.add(meal)
+    add_to_daily_log(user_id, day, **{f'daily_{nutrient}': amount for nutrient, amount in amounts.items()})
+    return meal
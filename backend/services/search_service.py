@@ -0,0 +1,254 @@
+# services/search_service.py
+
+import math
+import re
+from collections import Counter
+
+from sqlalchemy import Float, case, cast, func
+
+from chatbot.nlp_engine import load_stop_words
+from models import db
+from models.comment import Comment
+from models.forum import Forum
+from models.search_index import SearchDocument, SearchPosting
+
+# Parameter BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Kata pada judul forum dihitung lebih berat daripada deskripsi
+TITLE_WEIGHT = 2
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 16
+# Term query yang muncul di lebih dari COMMON_TERM_RATIO dokumen (dan lebih dari
+# COMMON_TERM_MIN_DF dokumen) diabaikan bila ada term lain yang lebih selektif:
+# idf-nya kecil, tetapi posting list-nya paling mahal dibaca
+COMMON_TERM_RATIO = 0.25
+COMMON_TERM_MIN_DF = 1000
+
+_WORD_RE = re.compile(r'[^\W_]+(?:-[^\W_]+)*')
+_PARTICLES = ('lah', 'kah', 'pun')
+_POSSESSIVES = ('nya', 'ku', 'mu')
+_MIN_STEM_LENGTH = 3
+# Kata dasar umum yang kebetulan berakhiran seperti partikel/kata ganti
+_STEM_EXCEPTIONS = frozenset({
+    'sekolah', 'masalah', 'jumlah', 'salah', 'kalah', 'olah', 'telah', 'sudah', 'lelah', 'mudah',
+    'indah', 'daerah', 'sejarah', 'ibadah', 'langkah', 'berkah', 'nikah', 'sedekah', 'kisah',
+    'bertemu', 'ketemu', 'ilmu',
+})
+
+
+def stem(word):
+    """
+    Stemming ringan bahasa Indonesia: hanya partikel (-lah, -kah, -pun) lalu
+    kata ganti kepemilikan (-nya, -ku, -mu), dengan sisa kata minimal 3 huruf.
+    Tanpa kamus kata dasar, imbuhan lain (me-, ber-, -kan, ...) tidak dipotong.
+    """
+    for suffixes in (_PARTICLES, _POSSESSIVES):
+        if word in _STEM_EXCEPTIONS:
+            break
+        for suffix in suffixes:
+            if word.endswith(suffix) and len(word) - len(suffix) >= _MIN_STEM_LENGTH:
+                word = word[:-len(suffix)]
+                break
+    return word
+
+
+def tokenize(text, stop_words=None):
+    """
+    Memecah teks menjadi term pencarian.
+
+    Kata ulang (anak-anak) menjadi satu kata dasar, kata berhubung lain dipecah
+    per bagian. Stopword NLTK yang sama dengan NLPEngine dibuang sebelum stemming.
+    """
+    if stop_words is None:
+        stop_words = load_stop_words()
+
+    terms = []
+    for word in _WORD_RE.findall((text or '').lower()):
+        parts = word.split('-')
+        if len(set(parts)) == 1:
+            parts = parts[:1]
+        for part in parts:
+            if len(part) < 2 or part in stop_words:
+                continue
+            term = stem(part)
+            if term in stop_words or len(term) > MAX_TERM_LENGTH:
+                continue
+            terms.append(term)
+    return terms
+
+
+def forum_terms(title, description):
+    """Frekuensi term berbobot untuk satu forum."""
+    counts = Counter(tokenize(description))
+    for term in tokenize(title):
+        counts[term] += TITLE_WEIGHT
+    return counts
+
+
+def comment_terms(content):
+    return Counter(tokenize(content))
+
+
+def _replace_document(doc_type, doc_id, forum_id, term_counts):
+    """Mengganti posting satu dokumen. Tidak melakukan commit."""
+    document = SearchDocument.query.filter_by(doc_type=doc_type, doc_id=doc_id).first()
+    if document is None:
+        document = SearchDocument(doc_type=doc_type, doc_id=doc_id, forum_id=forum_id)
+        db.session.add(document)
+        db.session.flush()
+    else:
+        SearchPosting.query.filter(SearchPosting.document_id == document.id).delete(synchronize_session=False)
+
+    document.forum_id = forum_id
+    document.length = sum(term_counts.values())
+    if term_counts:
+        db.session.execute(SearchPosting.__table__.insert(), [
+            {'term': term, 'document_id': document.id, 'tf': tf}
+            for term, tf in term_counts.items()
+        ])
+
+
+def _remove_documents(*criteria):
+    """Menghapus dokumen indeks beserta posting-nya. Tidak melakukan commit."""
+    document_ids = db.session.query(SearchDocument.id).filter(*criteria)
+    SearchPosting.query.filter(SearchPosting.document_id.in_(document_ids.scalar_subquery())) \
+        .delete(synchronize_session=False)
+    SearchDocument.query.filter(*criteria).delete(synchronize_session=False)
+
+
+def index_forum(forum):
+    """Mengindeks (ulang) judul dan deskripsi forum. Forum harus sudah punya id."""
+    _replace_document('forum', forum.id, forum.id, forum_terms(forum.title, forum.description))
+
+
+def index_comment(comment):
+    """Mengindeks (ulang) isi komentar. Komentar harus sudah punya id."""
+    _replace_document('comment', comment.id, comment.forum_id, comment_terms(comment.content))
+
+
+def remove_comment_from_index(comment_id):
+    _remove_documents(SearchDocument.doc_type == 'comment', SearchDocument.doc_id == comment_id)
+
+
+def remove_forum_from_index(forum_id):
+    """Menghapus forum dan semua komentarnya dari indeks."""
+    _remove_documents(SearchDocument.forum_id == forum_id)
+
+
+def _collection_stats(doc_types):
+    count, total_length = db.session.query(
+        func.count(SearchDocument.id), func.coalesce(func.sum(SearchDocument.length), 0)
+    ).filter(SearchDocument.doc_type.in_(doc_types)).one()
+    return count, (total_length / count if count else 0.0)
+
+
+def _document_frequencies(terms, doc_types):
+    """Jumlah dokumen per term, satu query GROUP BY pada primary key posting."""
+    return dict(db.session.query(SearchPosting.term, func.count(SearchPosting.document_id))
+                .join(SearchDocument, SearchDocument.id == SearchPosting.document_id)
+                .filter(SearchPosting.term.in_(terms), SearchDocument.doc_type.in_(doc_types))
+                .group_by(SearchPosting.term)
+                .all())
+
+
+def _selective_terms(document_freq, doc_count):
+    """Membuang term yang terlalu umum, kecuali jika semua term query umum (term paling jarang dipakai)."""
+    threshold = max(COMMON_TERM_RATIO * doc_count, COMMON_TERM_MIN_DF)
+    selective = [term for term, df in document_freq.items() if df <= threshold]
+    return selective or [min(document_freq, key=document_freq.get)]
+
+
+def search_documents(query, doc_types=('forum', 'comment'), limit=20, offset=0):
+    """
+    Mencari dokumen dengan ranking BM25.
+
+    Skor dijumlahkan di database (GROUP BY dokumen, ORDER BY skor, LIMIT), sehingga
+    hanya satu halaman hasil yang dibaca ke Python. idf setiap term dihitung dari
+    jumlah dokumennya dan dikirim sebagai konstanta.
+
+    Returns:
+        tuple: (list of (score, doc_type, doc_id, forum_id), jumlah dokumen yang cocok)
+    """
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return [], 0
+
+    doc_count, avg_length = _collection_stats(doc_types)
+    if not doc_count:
+        return [], 0
+
+    document_freq = _document_frequencies(terms, doc_types)
+    if not document_freq:
+        return [], 0
+    terms = _selective_terms(document_freq, doc_count)
+
+    idf = case({
+        term: math.log(1 + (doc_count - document_freq[term] + 0.5) / (document_freq[term] + 0.5))
+        for term in terms
+    }, value=SearchPosting.term)
+    tf = cast(SearchPosting.tf, Float)
+    norm = BM25_K1 * (1 - BM25_B) + (BM25_K1 * BM25_B / (avg_length or 1)) * SearchDocument.length
+    score = func.sum(idf * tf * (BM25_K1 + 1) / (tf + norm)).label('score')
+
+    matches = db.session.query(SearchPosting.document_id) \
+        .join(SearchDocument, SearchDocument.id == SearchPosting.document_id) \
+        .filter(SearchPosting.term.in_(terms), SearchDocument.doc_type.in_(doc_types))
+    total = matches.with_entities(func.count(func.distinct(SearchPosting.document_id))).scalar()
+
+    # Id dokumen sebagai tie-breaker agar urutan stabil antar halaman
+    rows = matches.with_entities(
+        SearchDocument.id, SearchDocument.doc_type, SearchDocument.doc_id, SearchDocument.forum_id, score
+    ).group_by(SearchDocument.id, SearchDocument.doc_type, SearchDocument.doc_id, SearchDocument.forum_id) \
+     .order_by(score.desc(), SearchDocument.id) \
+     .offset(offset).limit(limit) \
+     .all()
+
+    results = [(round(row.score, 6), row.doc_type, row.doc_id, row.forum_id) for row in rows]
+    return results, total
+
+
+def rebuild_search_index(batch_size=500):
+    """
+    Membangun ulang seluruh indeks dari tabel forums dan comments.
+
+    Returns:
+        int: Jumlah dokumen yang diindeks
+    """
+    SearchPosting.query.delete(synchronize_session=False)
+    SearchDocument.query.delete(synchronize_session=False)
+    db.session.commit()
+
+    sources = [
+        ('forum', Forum, lambda f: (f.id, forum_terms(f.title, f.description))),
+        ('comment', Comment, lambda c: (c.forum_id, comment_terms(c.content))),
+    ]
+    indexed = 0
+    for doc_type, model, extract in sources:
+        last_id = 0
+        while True:
+            batch = model.query.filter(model.id > last_id).order_by(model.id).limit(batch_size).all()
+            if not batch:
+                break
+
+            extracted = {item.id: extract(item) for item in batch}
+            db.session.execute(SearchDocument.__table__.insert(), [
+                {'doc_type': doc_type, 'doc_id': doc_id, 'forum_id': forum_id, 'length': sum(counts.values())}
+                for doc_id, (forum_id, counts) in extracted.items()
+            ])
+            document_ids = dict(db.session.query(SearchDocument.doc_id, SearchDocument.id).filter(
+                SearchDocument.doc_type == doc_type, SearchDocument.doc_id.in_(list(extracted))
+            ).all())
+            postings = [
+                {'term': term, 'document_id': document_ids[doc_id], 'tf': tf}
+                for doc_id, (_, counts) in extracted.items()
+                for term, tf in counts.items()
+            ]
+            if postings:
+                db.session.execute(SearchPosting.__table__.insert(), postings)
+            db.session.commit()
+
+            indexed += len(batch)
+            last_id = batch[-1].id
+            db.session.expunge_all()
+    return indexed
@@ -0,0 +1,56 @@
+import unittest
+
+from app import create_app
+from config import ProductionConfig, engine_options
+from models import db
+
+
+class TestCreateApp(unittest.TestCase):
+    def test_profiles_coexist_in_one_process(self):
+        testing = create_app('testing')
+        production = create_app('production', SQLALCHEMY_DATABASE_URI='sqlite://', AUTO_CREATE_TABLES=False)
+
+        self.assertTrue(testing.config['TESTING'])
+        self.assertFalse(testing.config['NOTIFICATION_ASYNC'])
+        self.assertFalse(production.config['DEBUG'])
+        self.assertEqual(production.config['GUNICORN_WORKERS'], ProductionConfig.GUNICORN_WORKERS)
+        # Opsi pool mengikuti URI akhir, bukan URI MySQL bawaan profil
+        self.assertEqual(production.config['SQLALCHEMY_ENGINE_OPTIONS'], {})
+
+        with testing.app_context():
+            testing_engine = db.engine
+        with production.app_context():
+            production_engine = db.engine
+        self.assertIsNot(testing_engine, production_engine)
+
+    def test_blueprints_and_core_routes_registered(self):
+        app = create_app('testing')
+        for name in ('auth', 'chat', 'forum', 'notification'):
+            self.assertTrue(any(bp.startswith(name) for bp in app.blueprints), name)
+
+        response = app.test_client().get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['status'], 'active')
+        self.assertEqual(app.test_client().get('/tidak-ada').status_code, 404)
+
+    def test_overrides_replace_profile_values(self):
+        app = create_app('testing', CHAT_SESSION_BACKEND='jsonl', FORUM_DELETE_CHUNK_SIZE=50)
+        self.assertEqual(app.config['CHAT_SESSION_BACKEND'], 'jsonl')
+        self.assertEqual(app.config['FORUM_DELETE_CHUNK_SIZE'], 50)
+
+    def test_pool_sizes_come_from_profile(self):
+        app = create_app('production', SQLALCHEMY_DATABASE_URI='mysql://u:p@db/forum_db', AUTO_CREATE_TABLES=False)
+        options = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+        self.assertEqual(options['pool_size'], ProductionConfig.DB_POOL_SIZE)
+        self.assertEqual(options['max_overflow'], ProductionConfig.DB_MAX_OVERFLOW)
+
+    def test_engine_options_skip_pool_sizes_for_sqlite(self):
+        self.assertEqual(engine_options('sqlite://', pool_size=10, max_overflow=10), {})
+        options = engine_options('mysql://u:p@db/forum_db', pool_size=10, max_overflow=5)
+        self.assertEqual(options['pool_size'], 10)
+        self.assertEqual(options['max_overflow'], 5)
+        self.assertTrue(options['pool_pre_ping'])
+
+
+if __name__ == '__main__':
+    unittest.main()
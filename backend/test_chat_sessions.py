@@ -0,0 +1,320 @@
+# test_chat_sessions.py
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from app import create_app
+from chatbot.session_store import (
+    InvalidPositionError, JsonlSessionStore, SessionLockTimeout, SqlSessionStore, get_session_store,
+    import_sessions, safe_session_name
+)
+from models import db
+from models.chat_session import ChatMessageLog, ChatSessionState
+from routes import chat_routes
+
+
+def message(content, is_user=True):
+    return {'content': content, 'is_user': is_user, 'timestamp': '2025-07-20T15:53:58', 'attachments': []}
+
+
+def create_chat_app(database_uri='sqlite://', **config):
+    return create_app('testing', SQLALCHEMY_DATABASE_URI=database_uri, **config)
+
+
+def _chat_worker(database_uri, sessions_dir, backend, iterations):
+    """Satu proses 'worker gunicorn' yang menjalankan giliran chat pada sesi yang sama."""
+    app = create_chat_app(database_uri, CHAT_SESSION_BACKEND=backend, CHAT_SESSIONS_DIR=sessions_dir)
+    with app.app_context():
+        store = get_session_store()
+        for _ in range(iterations):
+            with store.lock('shared'):
+                count = store.get_context('shared').get('count', 0) + 1
+                store.append_messages('shared', [message(f'{os.getpid()}:{count}'), message(str(count), False)])
+                time.sleep(0.001)
+                store.update_context('shared', {'count': count})
+
+
+class TestJsonlSessionStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = JsonlSessionStore(self.tmp.name, cache_size=2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_append_only_history_and_context(self):
+        self.assertIsNone(self.store.read_messages('42'))
+        self.assertEqual(self.store.get_context('42'), {})
+
+        self.store.append_messages('42', [message('halo'), message('hai bunda', False)])
+        path = self.store.messages_path('42')
+        size_after_first_turn = os.path.getsize(path)
+        self.store.append_messages('42', [message('trimester 2'), message('jawaban', False)])
+
+        # Giliran kedua hanya menambah byte di akhir file
+        with open(path, 'rb') as f:
+            f.seek(size_after_first_turn)
+            self.assertEqual(len(f.read().splitlines()), 2)
+        self.assertEqual([m['content'] for m in self.store.read_messages('42')],
+                         ['halo', 'hai bunda', 'trimester 2', 'jawaban'])
+
+        self.store.update_context('42', {'last_intent': 'greeting'})
+        self.assertEqual(JsonlSessionStore(self.tmp.name).get_context('42'), {'last_intent': 'greeting'})
+
+    def test_context_cache_is_bounded(self):
+        for user_id in ('a', 'b', 'c'):
+            self.store.update_context(user_id, {'user': user_id})
+        self.assertEqual(len(self.store._contexts), 2)
+        self.assertEqual(self.store.get_context('a'), {'user': 'a'})
+
+    def test_returned_context_is_a_copy(self):
+        self.store.update_context('42', {'last_intent': 'greeting'})
+        self.store.get_context('42')['last_intent'] = 'diubah'
+        self.assertEqual(self.store.get_context('42'), {'last_intent': 'greeting'})
+
+    def test_legacy_json_session_is_migrated(self):
+        legacy = {'user_id': 'user123', 'messages': [message('lama'), message('balasan', False)],
+                  'context': {'last_intent': 'nutrisi_kehamilan'}}
+        with open(os.path.join(self.tmp.name, 'user123.json'), 'w', encoding='utf-8') as f:
+            json.dump(legacy, f, indent=2)
+
+        self.assertEqual(self.store.get_context('user123'), {'last_intent': 'nutrisi_kehamilan'})
+        self.store.append_messages('user123', [message('baru')])
+        self.assertEqual([m['content'] for m in self.store.read_messages('user123')], ['lama', 'balasan', 'baru'])
+
+    def test_truncated_last_line_is_skipped(self):
+        self.store.append_messages('42', [message('utuh')])
+        with open(self.store.messages_path('42'), 'ab') as f:
+            f.write(b'{"content": "terpot')
+        self.assertEqual([m['content'] for m in self.store.read_messages('42')], ['utuh'])
+
+    def test_page_reads_tail_backwards(self):
+        self.assertIsNone(self.store.read_messages_page('42'))
+        # Pesan panjang memaksa pembacaan melewati beberapa blok
+        contents = [f'pesan {i} ' + 'x' * (i * 97 % 3000) for i in range(60)]
+        self.store.append_messages('42', [message(content) for content in contents])
+
+        collected, before = [], None
+        while True:
+            messages, before = self.store.read_messages_page('42', before=before, limit=7)
+            collected = messages + collected
+            if before is None:
+                break
+        self.assertEqual([m['content'] for m in collected], contents)
+
+        messages, before = self.store.read_messages_page('42', limit=3)
+        self.assertEqual([m['content'] for m in messages], contents[-3:])
+        with self.assertRaises(InvalidPositionError):
+            self.store.read_messages_page('42', before=before + 1)
+
+    def test_page_skips_truncated_last_line(self):
+        self.store.append_messages('42', [message('satu'), message('dua')])
+        with open(self.store.messages_path('42'), 'ab') as f:
+            f.write(b'{"content": "terpot')
+        messages, before = self.store.read_messages_page('42', limit=5)
+        self.assertEqual([m['content'] for m in messages], ['satu', 'dua'])
+        self.assertIsNone(before)
+
+    def test_unsafe_user_ids_stay_inside_directory(self):
+        for user_id in ('../etc/passwd', '.hidden', 'a/b', ''):
+            name = safe_session_name(user_id)
+            self.assertNotIn('/', name)
+            self.assertFalse(name.startswith('.'))
+        self.assertEqual(safe_session_name('user123'), 'user123')
+
+
+class TestSqlSessionStore(unittest.TestCase):
+    def setUp(self):
+        self.app = create_chat_app()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.store = get_session_store()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_sql_store_is_the_default(self):
+        self.assertIsInstance(self.store, SqlSessionStore)
+
+    def test_history_and_context_round_trip(self):
+        self.assertIsNone(self.store.read_messages('42'))
+        self.assertIsNone(self.store.read_messages_page('42'))
+        self.assertEqual(self.store.get_context('42'), {})
+
+        self.store.append_messages('42', [message(str(i)) for i in range(5)])
+        self.store.update_context('42', {'last_intent': 'greeting'})
+
+        self.assertEqual([m['content'] for m in self.store.read_messages('42')], ['0', '1', '2', '3', '4'])
+        self.assertEqual(self.store.get_context('42'), {'last_intent': 'greeting'})
+        self.assertEqual(ChatSessionState.query.count(), 1)
+        self.assertEqual(ChatMessageLog.query.count(), 5)
+
+        messages, before = self.store.read_messages_page('42', limit=3)
+        self.assertEqual([m['content'] for m in messages], ['2', '3', '4'])
+        messages, before = self.store.read_messages_page('42', before=before, limit=3)
+        self.assertEqual([m['content'] for m in messages], ['0', '1'])
+        self.assertIsNone(before)
+
+    def test_lock_is_exclusive_until_released(self):
+        with self.store.lock('42'):
+            with self.assertRaises(SessionLockTimeout):
+                with self.store.lock('42', timeout=0.1):
+                    pass
+            # Sesi lain tidak ikut terkunci
+            with self.store.lock('43', timeout=0.1):
+                pass
+        with self.store.lock('42', timeout=0.1):
+            pass
+
+    def test_expired_lease_can_be_taken_over(self):
+        self.store.lock_ttl = -1
+        with self.store.lock('42'):
+            with self.store.lock('42', timeout=0.1):
+                pass
+
+    def test_import_file_sessions(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'user123.json'), 'w', encoding='utf-8') as f:
+                json.dump({'user_id': 'user123', 'messages': [message('lama')],
+                           'context': {'last_intent': 'nutrisi_kehamilan'}}, f)
+            JsonlSessionStore(directory).append_messages('7', [message('halo'), message('hai', False)])
+
+            self.assertEqual(import_sessions(directory, self.store), 2)
+            self.assertEqual(import_sessions(directory, self.store), 0)
+
+        self.assertEqual([m['content'] for m in self.store.read_messages('user123')], ['lama'])
+        self.assertEqual(self.store.get_context('user123'), {'last_intent': 'nutrisi_kehamilan'})
+        self.assertEqual([m['content'] for m in self.store.read_messages('7')], ['halo', 'hai'])
+
+
+@unittest.skipUnless('fork' in multiprocessing.get_all_start_methods(), 'butuh start method fork')
+class TestMultiProcessSessions(unittest.TestCase):
+    PROCESSES = 4
+    ITERATIONS = 15
+
+    def run_workers(self, backend):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        database_uri = 'sqlite:///' + os.path.join(tmp.name, 'chat.db')
+        app = create_chat_app(database_uri, CHAT_SESSION_BACKEND=backend, CHAT_SESSIONS_DIR=tmp.name)
+        with app.app_context():
+            db.create_all()
+
+        fork = multiprocessing.get_context('fork')
+        workers = [fork.Process(target=_chat_worker, args=(database_uri, tmp.name, backend, self.ITERATIONS))
+                   for _ in range(self.PROCESSES)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(60)
+            self.assertEqual(worker.exitcode, 0)
+
+        total = self.PROCESSES * self.ITERATIONS
+        with app.app_context():
+            store = get_session_store()
+            self.assertEqual(store.get_context('shared'), {'count': total})
+            messages = store.read_messages('shared')
+        # Tidak ada giliran yang hilang atau saling menyela
+        self.assertEqual(len(messages), 2 * total)
+        self.assertEqual([m['content'] for m in messages[1::2]], [str(i) for i in range(1, total + 1)])
+        self.assertEqual([m['content'].split(':')[1] for m in messages[::2]], [str(i) for i in range(1, total + 1)])
+
+    def test_sql_store_serialises_turns_across_processes(self):
+        self.run_workers('sql')
+
+    def test_jsonl_store_serialises_turns_across_processes(self):
+        self.run_workers('jsonl')
+
+
+class TestChatTurnLocking(unittest.TestCase):
+    def setUp(self):
+        self.app = create_chat_app()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_session_lock_is_free_while_the_answer_is_generated(self):
+        lock_was_free = []
+
+        def generate(user_id, user_message, use_openai, use_gemini):
+            # Request lain untuk user yang sama bisa mengambil lock selama LLM berjalan
+            with get_session_store().lock(user_id, timeout=0.1):
+                lock_was_free.append(True)
+            nlp_result = {'intent': 'greeting', 'entities': {}, 'context': [], 'confidence': 1.0}
+            return nlp_result, 'jawaban', 'local', []
+
+        store = get_session_store()
+        real_lock = store.lock
+        with patch.object(chat_routes, '_generate_turn', side_effect=generate), \
+                patch.object(store, 'lock', side_effect=real_lock) as lock:
+            response = self.client.post('/api/chat', json={'message': 'halo', 'user_id': '42'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(lock_was_free, [True])
+        # Satu lease per giliran (ditambah satu dari generate di atas), hanya untuk menulis
+        self.assertEqual(lock.call_count, 2)
+        self.assertEqual([m['content'] for m in store.read_messages('42')], ['halo', 'jawaban'])
+        self.assertEqual(store.get_context('42')['last_intent'], 'greeting')
+
+
+class TestHistoryEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.app = create_chat_app(CHAT_SESSION_BACKEND='jsonl', CHAT_SESSIONS_DIR=self.tmp.name)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_history_reads_session_store(self):
+        self.assertEqual(self.client.get('/api/history/42').status_code, 404)
+
+        with self.app.app_context():
+            get_session_store().append_messages('42', [message('halo'), message('hai', False)])
+
+        response = self.client.get('/api/history/42')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['content'] for m in response.get_json()['messages']], ['halo', 'hai'])
+        self.assertFalse(response.get_json()['has_more'])
+
+    def test_history_pages_with_before_cursor(self):
+        with self.app.app_context():
+            get_session_store().append_messages('42', [message(str(i)) for i in range(5)])
+
+        first = self.client.get('/api/history/42?limit=2').get_json()
+        self.assertEqual([m['content'] for m in first['messages']], ['3', '4'])
+        self.assertTrue(first['has_more'])
+
+        second = self.client.get(f"/api/history/42?limit=2&before={first['next_cursor']}").get_json()
+        self.assertEqual([m['content'] for m in second['messages']], ['1', '2'])
+        third = self.client.get(f"/api/history/42?limit=2&before={second['next_cursor']}").get_json()
+        self.assertEqual([m['content'] for m in third['messages']], ['0'])
+        self.assertIsNone(third['next_cursor'])
+
+        self.assertEqual(self.client.get('/api/history/42?before=rusak').status_code, 400)
+
+
+class TestSqlHistoryEndpoint(TestHistoryEndpoint):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.app = create_chat_app()
+        with self.app.app_context():
+            db.create_all()
+        self.client = self.app.test_client()
+
+
+if __name__ == '__main__':
+    unittest.main()
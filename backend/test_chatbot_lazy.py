@@ -0,0 +1,94 @@
+# test_chatbot_lazy.py
+import os
+import subprocess
+import sys
+import threading
+import unittest
+
+from flask import current_app
+
+from app import create_app
+from chatbot.lazy import LazySingleton, warm_up
+from routes import chat_routes
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestLazySingleton(unittest.TestCase):
+    def test_factory_runs_once_across_threads(self):
+        calls = []
+        barrier = threading.Barrier(8)
+
+        def factory():
+            calls.append(1)
+            return object()
+
+        singleton = LazySingleton('test_once', factory)
+        self.assertFalse(singleton.initialized)
+        results = []
+
+        def worker():
+            barrier.wait()
+            results.append(singleton.get())
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+        singleton.reset()
+        self.assertIsNot(singleton.get(), results[0])
+        self.assertEqual(len(calls), 2)
+
+    def test_warm_up_skips_failing_components(self):
+        LazySingleton('test_ok', lambda: 'siap')
+        LazySingleton('test_broken', lambda: 1 / 0)
+        timings = warm_up(['test_ok', 'test_broken'])
+        self.assertIn('test_ok', timings)
+        self.assertNotIn('test_broken', timings)
+
+    def test_per_app_singleton_is_built_for_each_app(self):
+        singleton = LazySingleton('test_per_app', lambda: {'ttl': current_app.config['LLM_CACHE_TTL']},
+                                  per_app=True)
+        first, second = create_app('testing', LLM_CACHE_TTL=60), create_app('testing', LLM_CACHE_TTL=120)
+        with first.app_context():
+            value = singleton.get()
+            self.assertIs(singleton.get(), value)
+            self.assertEqual(value['ttl'], 60)
+        with second.app_context():
+            self.assertFalse(singleton.initialized)
+            self.assertEqual(singleton.get()['ttl'], 120)
+        with first.app_context():
+            self.assertIs(singleton.get(), value)
+
+    def test_chat_components_follow_app_config(self):
+        first, second = create_app('testing', LLM_CACHE_TTL=60), create_app('testing', LLM_CACHE_TTL=120)
+        with first.app_context():
+            first_cache = chat_routes.response_cache.get()
+        with second.app_context():
+            second_cache = chat_routes.response_cache.get()
+        self.assertIsNot(first_cache, second_cache)
+        self.assertEqual(second_cache.stats()['ttl'], 120)
+
+
+class TestChatRoutesImport(unittest.TestCase):
+    def test_import_does_not_load_heavy_dependencies(self):
+        code = (
+            "import sys\n"
+            "import routes.chat_routes as chat\n"
+            "heavy = [m for m in ('nltk', 'google.generativeai', 'openai', 'sklearn') if m in sys.modules]\n"
+            "built = [n for n in ('nlp_engine', 'knowledge_base', 'response_cache', 'gemini_integration')"
+            " if getattr(chat, n).initialized]\n"
+            "print(heavy, built)\n"
+        )
+        output = subprocess.run([sys.executable, '-c', code], cwd=BACKEND_DIR, capture_output=True,
+                                text=True, check=True).stdout
+        self.assertEqual(output.strip().splitlines()[-1], '[] []')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app import create_app
+from config import engine_options
+from utils.db_pool import TimedQueuePool, pool_status
+
+
+class TestTimedQueuePool(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.engine = create_engine(
+            'sqlite:///' + os.path.join(self.tmpdir, 'pool.db'),
+            poolclass=TimedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.2,
+            connect_args={'check_same_thread': False}
+        )
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.tmpdir)
+
+    def test_counts_checkouts_and_physical_connects(self):
+        for _ in range(3):
+            with self.engine.connect() as conn:
+                conn.execute(text('SELECT 1'))
+        status = pool_status(self.engine)
+        self.assertEqual(status['pool'], 'TimedQueuePool')
+        self.assertEqual(status['checkouts'], 3)
+        self.assertEqual(status['connects'], 1)
+        self.assertEqual(status['checked_out'], 0)
+        self.assertEqual(status['timeouts'], 0)
+
+    def test_records_wait_and_timeout_when_pool_exhausted(self):
+        held = self.engine.connect()
+        with self.assertRaises(PoolTimeoutError):
+            self.engine.connect()
+        self.assertEqual(pool_status(self.engine)['checked_out'], 1)
+
+        release = threading.Timer(0.05, held.close)
+        release.start()
+        with self.engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+        release.join()
+
+        status = pool_status(self.engine)
+        self.assertEqual(status['timeouts'], 1)
+        self.assertEqual(status['checkouts'], 2)
+        self.assertEqual(status['waited'], 2)
+        self.assertGreaterEqual(status['wait_max_ms'], 150)
+
+    def test_metrics_survive_dispose(self):
+        with self.engine.connect():
+            pass
+        self.engine.dispose()
+        with self.engine.connect():
+            pass
+        status = pool_status(self.engine)
+        self.assertEqual(status['checkouts'], 2)
+        self.assertEqual(status['connects'], 2)
+
+    def test_concurrent_checkouts_are_all_counted(self):
+        def worker():
+            for _ in range(20):
+                with self.engine.connect() as conn:
+                    conn.execute(text('SELECT 1'))
+
+        engine = create_engine(
+            'sqlite:///' + os.path.join(self.tmpdir, 'pool.db'),
+            poolclass=TimedQueuePool, pool_size=2, max_overflow=0, pool_timeout=5,
+            connect_args={'check_same_thread': False}
+        )
+        self.engine.dispose()
+        self.engine = engine
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        status = pool_status(engine)
+        self.assertEqual(status['checkouts'], 80)
+        self.assertLessEqual(status['connects'], 2)
+
+
+class TestEngineConfiguration(unittest.TestCase):
+    def test_mysql_uses_single_instrumented_pool(self):
+        options = engine_options('mysql+pymysql://u:p@db/forum_db', pool_size=8, max_overflow=2,
+                                 pool_recycle=120, pool_timeout=5, pool_pre_ping=False)
+        self.assertIs(options['poolclass'], TimedQueuePool)
+        self.assertEqual(options['pool_size'], 8)
+        self.assertEqual(options['max_overflow'], 2)
+        self.assertEqual(options['pool_recycle'], 120)
+        self.assertEqual(options['pool_timeout'], 5)
+        self.assertFalse(options['pool_pre_ping'])
+
+    def test_app_engine_takes_pool_settings_from_config(self):
+        app = create_app('production', SQLALCHEMY_DATABASE_URI='mysql+pymysql://u:p@db/forum_db',
+                         AUTO_CREATE_TABLES=False, DB_POOL_SIZE=3, DB_MAX_OVERFLOW=1, DB_POOL_TIMEOUT=7)
+        from models import db
+        with app.app_context():
+            pool = db.engine.pool
+        self.assertIsInstance(pool, TimedQueuePool)
+        self.assertEqual(pool.size(), 3)
+        self.assertEqual(pool._max_overflow, 1)
+        self.assertEqual(pool._timeout, 7)
+        self.assertTrue(pool._pre_ping)
+
+
+class TestPoolHealthEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.app = create_app(
+            'testing',
+            SQLALCHEMY_DATABASE_URI='sqlite:///' + os.path.join(self.tmpdir, 'app.db'),
+            SQLALCHEMY_ENGINE_OPTIONS={'poolclass': TimedQueuePool, 'pool_size': 2, 'max_overflow': 0,
+                                       'connect_args': {'check_same_thread': False}}
+        )
+
+    def tearDown(self):
+        from models import db
+        with self.app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(self.tmpdir)
+
+    def test_reports_pool_metrics(self):
+        client = self.app.test_client()
+        client.get('/api/forums')
+        data = client.get('/health/db').get_json()
+        self.assertEqual(data['pool'], 'TimedQueuePool')
+        self.assertEqual(data['size'], 2)
+        self.assertGreaterEqual(data['checkouts'], 1)
+        self.assertEqual(data['checked_out'], 0)
+        self.assertIn('wait_avg_ms', data)
+
+    def test_static_pool_reports_only_its_type(self):
+        app = create_app('testing')
+        data = app.test_client().get('/health/db').get_json()
+        self.assertEqual(data, {'pool': 'StaticPool'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,353 @@
+# test_forum_queries.py
+import time
+import unittest
+from datetime import date, timedelta
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app
+from models import db
+from models.user import User
+from models.forum import Forum, compute_hot_score
+from models.comment import Comment
+from models.like import Like
+from models.notification import Notification
+from models.daily_nutrition import DailyNutrition
+from models.daily_nutrition_log import DailyNutritionLog
+from models.weekly_assessment import WeeklyAssessment
+from services.forum_service import delete_forum_cascade, reconcile_forum_counters, reconcile_hot_scores
+from services.notification_service import reconcile_unread_counts
+
+
+def create_test_app():
+    return create_app('testing')
+
+
+class QueryCounter:
+    """Menghitung statement SQL yang dieksekusi selama blok with."""
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._before_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._before_execute)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+class TestForumListingQueries(unittest.TestCase):
+    def setUp(self):
+        self.app = create_test_app()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.users = []
+        for i in range(5):
+            user = User(
+                username=f"user{i}",
+                email=f"user{i}@example.com",
+                password="hashed",
+                age=25,
+                height=160,
+                weight=55,
+                lmp_date=date.today() - timedelta(weeks=10)
+            )
+            db.session.add(user)
+            self.users.append(user)
+        db.session.commit()
+
+        for i in range(30):
+            author = self.users[i % len(self.users)]
+            forum = Forum(title=f"Forum ke-{i}", description="Deskripsi forum pengujian", user_id=author.id)
+            db.session.add(forum)
+            db.session.flush()
+            for j, user in enumerate(self.users):
+                db.session.add(Like(user_id=user.id, forum_id=forum.id, is_like=(j % 2 == 0)))
+                db.session.add(Comment(content=f"Komentar {j}", user_id=user.id, forum_id=forum.id))
+        db.session.commit()
+        # Data di atas dimasukkan langsung, counter forum diisi lewat rekonsiliasi
+        reconcile_forum_counters()
+
+        self.user_ids = [user.id for user in self.users]
+        self.client = self.app.test_client()
+        self.token = create_access_token(identity=str(self.user_ids[0]))
+        db.session.remove()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_forum_page_query_count_is_constant(self):
+        """Satu halaman forum tidak boleh memicu query per forum"""
+        for per_page in (5, 25):
+            db.session.remove()
+            with QueryCounter(db.engine) as counter:
+                response = self.client.get(f'/api/forums?per_page={per_page}')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.get_json()['forums']), per_page)
+            # Satu query untuk halaman forum dan satu untuk total
+            self.assertLessEqual(counter.count, 2, counter.statements)
+
+    def test_forum_page_contains_username_and_counts(self):
+        response = self.client.get('/api/forums?per_page=30')
+        forums = response.get_json()['forums']
+        self.assertEqual(len(forums), 30)
+        for forum in forums:
+            self.assertTrue(forum['username'].startswith('user'))
+            self.assertEqual(forum['like_count'], 3)
+            self.assertEqual(forum['dislike_count'], 2)
+            self.assertEqual(forum['comment_count'], 5)
+
+    def test_my_forums_uses_same_query_path(self):
+        db.session.remove()
+        with QueryCounter(db.engine) as counter:
+            response = self.client.get(
+                '/api/forums/me?per_page=10',
+                headers={'Authorization': f'Bearer {self.token}'}
+            )
+        self.assertEqual(response.status_code, 200)
+        forums = response.get_json()['forums']
+        self.assertEqual(len(forums), 6)
+        self.assertTrue(all(f['username'] == 'user0' for f in forums))
+        self.assertLessEqual(counter.count, 2, counter.statements)
+
+    def test_forum_detail_query_count_is_constant(self):
+        forum_id = Forum.query.first().id
+        db.session.remove()
+        with QueryCounter(db.engine) as counter:
+            response = self.client.get(f'/api/forums/{forum_id}')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data['comment_count'], 5)
+        self.assertEqual(len(data['comments']), 5)
+        self.assertTrue(all(c['username'].startswith('user') for c in data['comments']))
+        # Forum + statistik, lalu komentar beserta user-nya
+        self.assertLessEqual(counter.count, 2, counter.statements)
+
+    def _auth(self, user_id):
+        return {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+
+    def test_toggle_like_maintains_counters(self):
+        forum = Forum(title="Forum baru", description="Deskripsi forum baru", user_id=self.user_ids[0])
+        db.session.add(forum)
+        db.session.commit()
+        forum_id = forum.id
+        liker = self.user_ids[1]
+
+        response = self.client.post(f'/api/forums/{forum_id}/like', json={'is_like': True}, headers=self._auth(liker))
+        self.assertEqual(response.get_json()['like_count'], 1)
+        self.assertEqual(response.get_json()['dislike_count'], 0)
+
+        # Like -> dislike memindahkan counter
+        response = self.client.post(f'/api/forums/{forum_id}/like', json={'is_like': False}, headers=self._auth(liker))
+        self.assertEqual(response.get_json()['like_count'], 0)
+        self.assertEqual(response.get_json()['dislike_count'], 1)
+
+        # Dislike yang sama lagi menghapus interaksi
+        response = self.client.post(f'/api/forums/{forum_id}/like', json={'is_like': False}, headers=self._auth(liker))
+        self.assertEqual(response.get_json()['like_count'], 0)
+        self.assertEqual(response.get_json()['dislike_count'], 0)
+
+    def test_comment_add_and_delete_maintain_counter(self):
+        forum_id = Forum.query.first().id
+        commenter = self.user_ids[2]
+
+        response = self.client.post(
+            f'/api/forums/{forum_id}/comments',
+            json={'content': 'Komentar baru'},
+            headers=self._auth(commenter)
+        )
+        self.assertEqual(response.status_code, 201)
+        comment_id = response.get_json()['comment']['id']
+        db.session.remove()
+        self.assertEqual(Forum.query.get(forum_id).comment_count, 6)
+
+        response = self.client.delete(f'/api/comments/{comment_id}', headers=self._auth(commenter))
+        self.assertEqual(response.status_code, 200)
+        db.session.remove()
+        self.assertEqual(Forum.query.get(forum_id).comment_count, 5)
+
+    def test_reconcile_fixes_drifted_counters(self):
+        forum = Forum.query.first()
+        forum.like_count = 99
+        forum.comment_count = 0
+        db.session.commit()
+
+        forum_id = forum.id
+        self.assertEqual(reconcile_forum_counters(), 1)
+        db.session.remove()
+        forum = Forum.query.get(forum_id)
+        self.assertEqual((forum.like_count, forum.dislike_count, forum.comment_count), (3, 2, 5))
+        self.assertEqual(reconcile_forum_counters(), 0)
+
+    def test_sort_by_likes_orders_by_like_count(self):
+        forums = Forum.query.order_by(Forum.id).limit(3).all()
+        for extra, forum in enumerate(forums, start=1):
+            forum.like_count += extra * 10
+        db.session.commit()
+        expected = [f.id for f in reversed(forums)]
+
+        response = self.client.get('/api/forums?sort_by=likes&per_page=3')
+        self.assertEqual([f['id'] for f in response.get_json()['forums']], expected)
+
+        response = self.client.get('/api/forums?sort_by=likes&order=asc&per_page=30')
+        self.assertEqual([f['id'] for f in response.get_json()['forums']][-3:], list(reversed(expected)))
+
+    def test_hot_ranking_prefers_liked_recent_forums(self):
+        forum = Forum(title="Forum populer", description="Deskripsi forum populer", user_id=self.user_ids[0])
+        db.session.add(forum)
+        db.session.commit()
+        forum_id = forum.id
+        self.assertGreater(forum.hot_score, 0)
+
+        for user_id in self.user_ids[1:]:
+            self.client.post(f'/api/forums/{forum_id}/like', json={'is_like': True}, headers=self._auth(user_id))
+
+        response = self.client.get('/api/forums?sort_by=hot&per_page=1')
+        self.assertEqual(response.get_json()['forums'][0]['id'], forum_id)
+
+        db.session.remove()
+        stored = Forum.query.get(forum_id)
+        self.assertAlmostEqual(stored.hot_score, compute_hot_score(4, 0, stored.created_at))
+
+    def test_reconcile_hot_scores_skips_rounding_noise(self):
+        reconcile_hot_scores()
+        forum = Forum.query.first()
+        forum_id, expected = forum.id, forum.hot_score
+        # Sisa pembulatan saat membaca kolom floating point bukan perubahan
+        Forum.query.update({Forum.hot_score: Forum.hot_score + 1e-12}, synchronize_session=False)
+        db.session.commit()
+
+        with QueryCounter(db.engine) as counter:
+            reconcile_hot_scores()
+        self.assertFalse([s for s in counter.statements if s.lstrip().upper().startswith('UPDATE')])
+
+        Forum.query.filter_by(id=forum_id).update({Forum.hot_score: 0}, synchronize_session=False)
+        db.session.commit()
+        reconcile_hot_scores()
+        db.session.remove()
+        self.assertAlmostEqual(Forum.query.get(forum_id).hot_score, expected)
+
+    def _walk_cursor(self, url, items_key):
+        seen, cursor = [], ''
+        while True:
+            response = self.client.get(f'{url}&cursor={cursor}')
+            self.assertEqual(response.status_code, 200)
+            data = response.get_json()
+            seen.extend(item['id'] for item in data[items_key])
+            if not data['has_more']:
+                self.assertIsNone(data['next_cursor'])
+                return seen, data
+            cursor = data['next_cursor']
+
+    def test_cursor_pagination_matches_page_mode(self):
+        for sort_by in ('created_at', 'likes', 'hot'):
+            expected = [f['id'] for f in self.client.get(
+                f'/api/forums?sort_by={sort_by}&per_page=30').get_json()['forums']]
+            seen, last = self._walk_cursor(f'/api/forums?sort_by={sort_by}&per_page=7', 'forums')
+            self.assertEqual(seen, expected)
+            self.assertEqual(last['total'], 30)
+
+    def test_cursor_pagination_can_skip_total(self):
+        db.session.remove()
+        with QueryCounter(db.engine) as counter:
+            response = self.client.get('/api/forums?cursor=&per_page=5&include_total=false')
+        data = response.get_json()
+        self.assertNotIn('total', data)
+        self.assertEqual(len(data['forums']), 5)
+        self.assertTrue(data['has_more'])
+        self.assertEqual(counter.count, 1, counter.statements)
+
+    def test_cursor_rejects_invalid_or_mismatched_cursor(self):
+        response = self.client.get('/api/forums?cursor=bukan-cursor')
+        self.assertEqual(response.status_code, 400)
+
+        cursor = self.client.get('/api/forums?cursor=&per_page=5').get_json()['next_cursor']
+        response = self.client.get(f'/api/forums?cursor={cursor}&sort_by=likes')
+        self.assertEqual(response.status_code, 400)
+
+    def test_comment_cursor_pagination(self):
+        forum_id = Forum.query.first().id
+        seen, last = self._walk_cursor(f'/api/forums/{forum_id}/comments?per_page=2', 'comments')
+        expected = [c['id'] for c in self.client.get(
+            f'/api/forums/{forum_id}/comments?per_page=10').get_json()['comments']]
+        self.assertEqual(seen, expected)
+        self.assertEqual(last['total'], 5)
+
+    def _add_thread_activity(self, forum_id, comments):
+        for i in range(comments):
+            comment = Comment(content=f"Komentar tambahan {i}", user_id=self.user_ids[1], forum_id=forum_id)
+            db.session.add(comment)
+            db.session.flush()
+            db.session.add(Notification(message="Komentar baru", user_id=self.user_ids[0],
+                                        forum_id=forum_id, comment_id=comment.id))
+        db.session.commit()
+        reconcile_unread_counts()
+
+    def _assert_forum_gone(self, forum_id):
+        db.session.remove()
+        self.assertIsNone(Forum.query.get(forum_id))
+        self.assertEqual(Like.query.filter_by(forum_id=forum_id).count(), 0)
+        self.assertEqual(Comment.query.filter_by(forum_id=forum_id).count(), 0)
+        self.assertEqual(Notification.query.filter_by(forum_id=forum_id).count(), 0)
+
+    def test_delete_forum_statement_count_independent_of_thread_size(self):
+        small, large = [f.id for f in Forum.query.filter_by(user_id=self.user_ids[0]).limit(2).all()]
+        self._add_thread_activity(small, 1)
+        self._add_thread_activity(large, 60)
+
+        counts = []
+        for forum_id in (small, large):
+            db.session.remove()
+            with QueryCounter(db.engine) as counter:
+                response = self.client.delete(f'/api/forums/{forum_id}', headers=self._auth(self.user_ids[0]))
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(any(s.startswith('SELECT comments.') or s.startswith('SELECT likes.')
+                                 for s in counter.statements), counter.statements)
+            counts.append(counter.count)
+            self._assert_forum_gone(forum_id)
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(User.query.get(self.user_ids[0]).unread_notification_count, 0)
+
+    def test_delete_forum_cascade_in_chunks(self):
+        forum_id = Forum.query.first().id
+        self._add_thread_activity(forum_id, 7)
+
+        deleted = delete_forum_cascade(forum_id, chunk_size=3)
+        self.assertEqual(deleted, {'notifications': 7, 'likes': 5, 'comments': 12, 'forums': 1})
+        self._assert_forum_gone(forum_id)
+        # Forum lain tidak tersentuh
+        self.assertEqual(Comment.query.count(), 29 * 5)
+
+    def test_delete_forum_in_background_returns_202(self):
+        forum_id = Forum.query.filter_by(user_id=self.user_ids[0]).first().id
+        response = self.client.delete(f'/api/forums/{forum_id}?background=true', headers=self._auth(self.user_ids[0]))
+        self.assertEqual(response.status_code, 202)
+
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            db.session.remove()
+            if Forum.query.get(forum_id) is None:
+                break
+            time.sleep(0.05)
+        self._assert_forum_gone(forum_id)
+
+    def test_forum_detail_not_found(self):
+        response = self.client.get('/api/forums/9999')
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
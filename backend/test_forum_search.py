@@ -0,0 +1,172 @@
+# test_forum_search.py
+import unittest
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy.dialects import mysql
+from sqlalchemy.schema import CreateTable
+
+from app import create_app
+from models import db
+from models.user import User
+from models.forum import Forum
+from models.comment import Comment
+from models.like import Like
+from models.notification import Notification
+from models.daily_nutrition import DailyNutrition
+from models.daily_nutrition_log import DailyNutritionLog
+from models.weekly_assessment import WeeklyAssessment
+from models.search_index import SearchDocument, SearchPosting
+from services import search_service
+from services.search_service import rebuild_search_index, search_documents, stem, tokenize
+from test_forum_queries import QueryCounter
+
+
+def create_test_app():
+    return create_app('testing')
+
+
+class TestTokenizer(unittest.TestCase):
+    def test_light_stemming(self):
+        self.assertEqual(stem('telurnya'), 'telur')
+        self.assertEqual(stem('bolehkah'), 'boleh')
+        self.assertEqual(stem('rumahku'), 'rumah')
+        self.assertEqual(stem('ibunya'), 'ibu')
+        # Kata pendek dan kata dasar berakhiran mirip tidak dipotong
+        self.assertEqual(stem('buku'), 'buku')
+        self.assertEqual(stem('punya'), 'punya')
+        self.assertEqual(stem('sekolah'), 'sekolah')
+
+    def test_tokenize_reduplication_and_stopwords(self):
+        terms = tokenize('Anak-anak yang makan Sayur-Mayur, apakah sehat?', stop_words={'yang', 'apa'})
+        self.assertEqual(terms, ['anak', 'makan', 'sayur', 'mayur', 'sehat'])
+
+    def test_terms_use_binary_collation_on_mysql(self):
+        # Term yang hanya beda aksen harus menjadi primary key berbeda
+        self.assertEqual(tokenize('resep resép', stop_words=set()), ['resep', 'resép'])
+        ddl = str(CreateTable(SearchPosting.__table__).compile(dialect=mysql.dialect()))
+        self.assertIn('term VARCHAR(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL', ddl)
+
+
+class TestForumSearch(unittest.TestCase):
+    def setUp(self):
+        self.app = create_test_app()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        user = User(username="bunda", email="bunda@example.com", password="hashed", age=28,
+                    height=160, weight=55, lmp_date=date.today() - timedelta(weeks=12))
+        db.session.add(user)
+        db.session.commit()
+        self.user_id = user.id
+        self.client = self.app.test_client()
+        self.headers = {'Authorization': f'Bearer {create_access_token(identity=str(self.user_id))}'}
+
+        self.forum_ids = [
+            self._create_forum('Telur untuk ibu hamil', 'Berapa butir telur yang aman dimakan setiap hari?'),
+            self._create_forum('Olahraga trimester kedua', 'Senam hamil dan jalan pagi, ada yang pernah coba?'),
+            self._create_forum('Menu sarapan', 'Roti, susu, dan buah. Kadang ditambah telur rebus.'),
+        ]
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _create_forum(self, title, description):
+        response = self.client.post('/api/forums', json={'title': title, 'description': description},
+                                    headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        return response.get_json()['forum']['id']
+
+    def _search(self, query, **params):
+        params['q'] = query
+        response = self.client.get('/api/forums/search', query_string=params)
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def test_search_ranks_title_matches_first(self):
+        data = self._search('telur')
+        self.assertEqual([r['id'] for r in data['results']], [self.forum_ids[0], self.forum_ids[2]])
+        self.assertEqual(data['total'], 2)
+        self.assertEqual(data['results'][0]['forum']['username'], 'bunda')
+        self.assertGreater(data['results'][0]['score'], data['results'][1]['score'])
+
+    def test_search_matches_stemmed_words(self):
+        data = self._search('telurnya')
+        self.assertEqual(data['total'], 2)
+
+    def test_comments_are_indexed_incrementally(self):
+        response = self.client.post(f'/api/forums/{self.forum_ids[1]}/comments',
+                                    json={'content': 'Yoga prenatal membantu sekali'}, headers=self.headers)
+        comment_id = response.get_json()['comment']['id']
+
+        data = self._search('yoga', type='comment')
+        self.assertEqual([(r['type'], r['id'], r['forum_id']) for r in data['results']],
+                         [('comment', comment_id, self.forum_ids[1])])
+        self.assertEqual(data['results'][0]['comment']['username'], 'bunda')
+
+        self.client.put(f'/api/comments/{comment_id}', json={'content': 'Berenang juga bagus'},
+                        headers=self.headers)
+        self.assertEqual(self._search('yoga')['total'], 0)
+        self.assertEqual(self._search('berenang')['total'], 1)
+
+        self.client.delete(f'/api/comments/{comment_id}', headers=self.headers)
+        self.assertEqual(self._search('berenang')['total'], 0)
+
+    def test_forum_update_and_delete_update_index(self):
+        forum_id = self.forum_ids[2]
+        self.client.put(f'/api/forums/{forum_id}', json={'description': 'Oatmeal dengan pisang'},
+                        headers=self.headers)
+        self.assertEqual([r['id'] for r in self._search('telur')['results']], [self.forum_ids[0]])
+        self.assertEqual(self._search('oatmeal')['total'], 1)
+
+        self.client.post(f'/api/forums/{forum_id}/comments', json={'content': 'Oatmeal enak'}, headers=self.headers)
+        self.client.delete(f'/api/forums/{forum_id}', headers=self.headers)
+        self.assertEqual(self._search('oatmeal')['total'], 0)
+        self.assertEqual(SearchDocument.query.filter_by(forum_id=forum_id).count(), 0)
+
+    def test_rebuild_matches_incremental_index(self):
+        self.client.post(f'/api/forums/{self.forum_ids[0]}/comments',
+                         json={'content': 'Telur ayam kampung lebih baik'}, headers=self.headers)
+        before = self._search('telur ayam')
+
+        self.assertEqual(rebuild_search_index(batch_size=2), 4)
+        after = self._search('telur ayam')
+        self.assertEqual(after, before)
+        self.assertEqual(SearchDocument.query.count(), 4)
+
+    def test_scores_are_aggregated_in_sql(self):
+        with QueryCounter(db.engine) as counter:
+            results, total = search_documents('telur sarapan', limit=1)
+        self.assertEqual(total, 2)
+        self.assertEqual([(doc_type, doc_id) for _, doc_type, doc_id, _ in results], [('forum', self.forum_ids[2])])
+        ranking = [s for s in counter.statements if 'GROUP BY search_documents.id' in s]
+        self.assertEqual(len(ranking), 1)
+        self.assertIn('LIMIT', ranking[0])
+
+    def test_common_terms_are_dropped_when_a_selective_term_exists(self):
+        with patch.object(search_service, 'COMMON_TERM_MIN_DF', 0), \
+                patch.object(search_service, 'COMMON_TERM_RATIO', 0.5):
+            # 'telur' ada di 2 dari 3 forum, 'sarapan' hanya di satu
+            results, total = search_documents('telur sarapan')
+            self.assertEqual([doc_id for _, _, doc_id, _ in results], [self.forum_ids[2]])
+            self.assertEqual(total, 1)
+            # Jika semua term umum, term paling jarang tetap dipakai
+            self.assertEqual(search_documents('telur')[1], 2)
+
+    def test_pagination_and_validation(self):
+        first = self._search('telur', limit=1)
+        second = self._search('telur', limit=1, offset=1)
+        self.assertTrue(first['has_more'])
+        self.assertFalse(second['has_more'])
+        self.assertNotEqual(first['results'][0]['id'], second['results'][0]['id'])
+
+        self.assertEqual(self.client.get('/api/forums/search').status_code, 400)
+        self.assertEqual(self.client.get('/api/forums/search?q=telur&type=x').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,410 @@
+# test_gemini_cache.py
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from chatbot import gemini_integration
+from chatbot.gemini_integration import GeminiIntegration, ModelConfig, build_cache_key
+from chatbot.response_cache import (
+    DiskResponseCache, ResponseCache, TieredResponseCache, create_response_cache, entry_size
+)
+from chatbot.single_flight import SingleFlight
+from routes import chat_routes
+
+KB_DATA = {
+    'food_nutrition': {
+        'name': 'telur', 'category': 'protein hewani', 'portion': '1 butir',
+        'nutrients': {'protein': '6 g', 'lemak': '5 g', 'karbohidrat': '0.6 g', 'kalori': '78 kkal'},
+        'benefits_pregnancy': 'Kolin untuk perkembangan otak janin',
+    }
+}
+
+
+def nlp_result(intent='detail_nutrisi', entities=None, confidence=0.8):
+    return {
+        'intent': intent,
+        'entities': {'food_item': 'telur'} if entities is None else entities,
+        'context': [],
+        'confidence': confidence,
+    }
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Pengganti GenerativeModel yang mencatat setiap prompt yang dikirim."""
+    def __init__(self, name):
+        self.name = name
+        self.prompts = []
+
+    def generate_content(self, prompt, generation_config=None):
+        self.prompts.append(prompt)
+        return FakeResponse(f'jawaban #{len(self.prompts)}')
+
+
+class BlockingModel(FakeModel):
+    """FakeModel yang menahan setiap panggilan sampai ``release`` di-set."""
+    release = threading.Event()
+
+    def generate_content(self, prompt, generation_config=None):
+        self.release.wait(10)
+        return super().generate_content(prompt, generation_config)
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('kondisi tidak terpenuhi dalam batas waktu')
+        time.sleep(0.005)
+
+
+class TestCacheKey(unittest.TestCase):
+    def test_key_ignores_case_punctuation_whitespace_and_confidence(self):
+        first = build_cache_key('Apa gizi telur?', nlp_result(confidence=0.7), KB_DATA)
+        second = build_cache_key('  apa GIZI   telur ', nlp_result(confidence=0.95), KB_DATA)
+        self.assertEqual(first, second)
+
+    def test_key_changes_with_intent_entities_kb_and_config(self):
+        base = build_cache_key('apa gizi telur', nlp_result(), KB_DATA)
+        self.assertNotEqual(base, build_cache_key('apa gizi telur', nlp_result(intent='nutrisi_kehamilan'), KB_DATA))
+        self.assertNotEqual(base, build_cache_key('apa gizi telur', nlp_result(entities={'food_item': 'tahu'}), KB_DATA))
+        self.assertNotEqual(base, build_cache_key('apa gizi telur', nlp_result(), {}))
+        self.assertNotEqual(base, build_cache_key('apa gizi telur', nlp_result(), KB_DATA,
+                                                  model_config=ModelConfig(temperature=0.2)))
+
+    def test_key_independent_of_dict_order(self):
+        reordered = dict(reversed(list(KB_DATA['food_nutrition'].items())))
+        self.assertEqual(
+            build_cache_key('apa gizi telur', nlp_result(entities={'a': 1, 'b': 2}), KB_DATA),
+            build_cache_key('apa gizi telur', nlp_result(entities={'b': 2, 'a': 1}), {'food_nutrition': reordered})
+        )
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_least_recently_used_entry_is_evicted_first(self):
+        cache = ResponseCache(max_size=3)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key.upper())
+        self.assertEqual(cache.get('a'), 'A')  # 'a' menjadi yang terbaru dipakai
+        cache.set('d', 'D')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual([cache.get(key) for key in ('a', 'c', 'd')], ['A', 'C', 'D'])
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_byte_cap_bounds_memory(self):
+        response = 'x' * 1000
+        cap = entry_size('key-00', response) * 5
+        cache = ResponseCache(max_bytes=cap)
+        for i in range(20):
+            cache.set(f'key-{i:02d}', response)
+        self.assertLessEqual(cache.bytes, cap)
+        self.assertEqual(len(cache), 5)
+        self.assertEqual(cache.get('key-19'), response)
+        self.assertIsNone(cache.get('key-00'))
+
+        cache.set('huge', 'x' * cap)
+        self.assertNotIn('huge', cache)
+        self.assertEqual(len(cache), 5)
+
+    def test_expired_entries_are_dropped_without_being_read(self):
+        clock = FakeClock()
+        cache = ResponseCache(ttl=10, clock=clock)
+        cache.set('lama', 'L')
+        clock.now = 5
+        cache.set('baru', 'B')
+        clock.now = 11
+        cache.set('lain', 'X')  # set juga membersihkan entri kedaluwarsa
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.stats()['expirations'], 1)
+        clock.now = 15.5
+        self.assertIsNone(cache.get('baru'))
+        self.assertEqual(cache.get('lain'), 'X')
+
+    def test_replacing_a_key_refreshes_ttl_and_size(self):
+        clock = FakeClock()
+        cache = ResponseCache(ttl=10, clock=clock)
+        cache.set('k', 'pendek')
+        clock.now = 8
+        cache.set('k', 'jawaban yang lebih panjang')
+        clock.now = 12
+        self.assertEqual(cache.get('k'), 'jawaban yang lebih panjang')
+        self.assertEqual(cache.bytes, entry_size('k', 'jawaban yang lebih panjang'))
+
+    def test_concurrent_access_keeps_accounting_consistent(self):
+        cache = ResponseCache(max_size=50)
+
+        def worker(offset):
+            for i in range(2000):
+                key = f'k{(offset + i) % 120}'
+                if cache.get(key) is None:
+                    cache.set(key, key * 3)
+
+        threads = [threading.Thread(target=worker, args=(n * 17,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = cache.stats()
+        self.assertEqual(stats['hits'] + stats['misses'], 8 * 2000)
+        self.assertLessEqual(stats['size'], 50)
+        self.assertEqual(stats['bytes'], sum(entry_size(key, value) for key, (value, _) in cache._entries.items()))
+
+
+def _write_entries(path, worker, count):
+    cache = DiskResponseCache(path)
+    for i in range(count):
+        cache.set(f'w{worker}-{i}', f'jawaban {worker}-{i}')
+
+
+class TestDiskResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'cache', 'llm.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_entries_survive_a_new_instance(self):
+        DiskResponseCache(self.path).set('k', 'jawaban tersimpan')
+        cache = DiskResponseCache(self.path)
+        self.assertEqual(cache.get('k'), 'jawaban tersimpan')
+        self.assertIsNone(cache.get('lain'))
+        self.assertEqual((cache.stats()['hits'], cache.stats()['misses']), (1, 1))
+
+    def test_expired_entries_miss_and_are_purged(self):
+        clock = FakeClock()
+        cache = DiskResponseCache(self.path, ttl=10, clock=clock)
+        cache.set('lama', 'L')
+        clock.now = 10
+        self.assertIsNone(cache.get('lama'))
+        cache.set('baru', 'B')
+        stats = cache.stats()
+        self.assertEqual((stats['size'], stats['expirations']), (1, 1))
+        self.assertEqual(stats['bytes'], len('baru') + len('B'))
+
+    def test_byte_cap_evicts_least_recently_read(self):
+        clock = FakeClock()
+        response = 'x' * 100
+        cache = DiskResponseCache(self.path, max_bytes=(len('k00') + 100) * 40, touch_interval=0, clock=clock)
+        for i in range(40):
+            clock.now = i
+            cache.set(f'k{i:02d}', response)
+        self.assertEqual(cache.stats()['evictions'], 0)
+        clock.now = 100
+        self.assertEqual(cache.get('k00'), response)  # k00 menjadi yang terbaru dibaca
+        clock.now = 101
+        cache.set('k40', response)
+
+        stats = cache.stats()
+        self.assertLessEqual(stats['bytes'], stats['max_bytes'])
+        self.assertGreater(stats['evictions'], 0)
+        self.assertEqual(cache.get('k00'), response)
+        self.assertEqual(cache.get('k40'), response)
+        self.assertIsNone(cache.get('k01'))
+
+        cache.set('huge', 'x' * stats['max_bytes'])
+        self.assertIsNone(cache.get('huge'))
+
+    def test_concurrent_writers_in_separate_processes(self):
+        DiskResponseCache(self.path)
+        context = multiprocessing.get_context('spawn')
+        processes = [context.Process(target=_write_entries, args=(self.path, n, 50)) for n in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(60)
+            self.assertEqual(process.exitcode, 0)
+
+        cache = DiskResponseCache(self.path)
+        self.assertEqual(cache.get('w3-49'), 'jawaban 3-49')
+        stats = cache.stats()
+        self.assertEqual(stats['size'], 200)
+        self.assertEqual(stats['bytes'], sum(len(f'w{n}-{i}') + len(f'jawaban {n}-{i}')
+                                             for n in range(4) for i in range(50)))
+        self.assertEqual(stats['errors'], 0)
+
+    def test_tiered_cache_promotes_disk_hits_to_memory(self):
+        DiskResponseCache(self.path).set('k', 'dari worker lain')
+        cache = TieredResponseCache(ResponseCache(), DiskResponseCache(self.path))
+        self.assertEqual(cache.get('k'), 'dari worker lain')
+        self.assertEqual(cache.get('k'), 'dari worker lain')
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['disk']['hits']), (1, 1))
+
+    def test_create_from_config(self):
+        self.assertIsInstance(create_response_cache({'LLM_CACHE_DISK': False}), ResponseCache)
+        cache = create_response_cache({'LLM_CACHE_PATH': self.path, 'LLM_CACHE_TTL': 60})
+        self.assertIsInstance(cache, TieredResponseCache)
+        self.assertEqual((cache.memory.ttl, cache.disk.ttl, cache.disk.path), (60, 60, self.path))
+
+
+class TestOpenAIResponseCache(unittest.TestCase):
+    def test_openai_responses_share_the_cache(self):
+        client = MagicMock()
+        client.ChatCompletion.create.return_value = SimpleNamespace(
+            choices=[SimpleNamespace(message={'content': ' jawaban openai '})]
+        )
+        cache = ResponseCache()
+        with patch.object(chat_routes.openai_client, 'get', return_value=client), \
+                patch.object(chat_routes.response_cache, 'get', return_value=cache):
+            first = chat_routes.generate_openai_response('Apa gizi telur?', nlp_result(), KB_DATA)
+            second = chat_routes.generate_openai_response('apa gizi telur', nlp_result(), KB_DATA)
+
+        self.assertEqual((first, second), ('jawaban openai', 'jawaban openai'))
+        self.assertEqual(client.ChatCompletion.create.call_count, 1)
+        # Key OpenAI tidak bertabrakan dengan key Gemini untuk pertanyaan yang sama
+        self.assertIsNone(cache.get(build_cache_key('apa gizi telur', nlp_result(), KB_DATA, 'gemini-2.0-flash')))
+
+
+@patch.dict(os.environ, {'GOOGLE_API_KEY': 'test-key'})
+@patch.object(gemini_integration.genai, 'configure')
+@patch.object(gemini_integration.genai, 'GenerativeModel', side_effect=FakeModel)
+class TestGeminiResponseCache(unittest.TestCase):
+    def test_repeated_question_hits_cache(self, model_class, configure):
+        gemini = GeminiIntegration()
+
+        first = gemini.generate_response('Apa gizi telur?', nlp_result(confidence=0.7), KB_DATA)
+        second = gemini.generate_response('apa gizi telur', nlp_result(confidence=0.9), KB_DATA)
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(gemini.model.prompts), 1)
+        stats = gemini.get_model_info()['cache']
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['size'], 1)
+
+    def test_prompt_timestamp_does_not_affect_cache(self, model_class, configure):
+        gemini = GeminiIntegration()
+        with patch.object(gemini_integration, 'datetime') as fake_datetime:
+            fake_datetime.now.return_value.strftime.return_value = '2026-01-01 08:00:00'
+            gemini.generate_response('apa gizi telur', nlp_result(), KB_DATA)
+            fake_datetime.now.return_value.strftime.return_value = '2026-01-01 08:00:59'
+            gemini.generate_response('apa gizi telur', nlp_result(), KB_DATA)
+        self.assertEqual(len(gemini.model.prompts), 1)
+        self.assertIn('2026-01-01 08:00:00', gemini.model.prompts[0])
+
+    def test_different_intent_misses(self, model_class, configure):
+        gemini = GeminiIntegration()
+        gemini.generate_response('apa gizi telur', nlp_result(), KB_DATA)
+        gemini.generate_response('apa gizi telur', nlp_result(intent='nutrisi_kehamilan'), KB_DATA)
+        self.assertEqual(len(gemini.model.prompts), 2)
+        stats = gemini.get_model_info()['cache']
+        self.assertEqual((stats['hits'], stats['misses']), (0, 2))
+
+    def test_cache_disabled(self, model_class, configure):
+        gemini = GeminiIntegration(enable_cache=False)
+        gemini.generate_response('apa gizi telur', nlp_result(), KB_DATA)
+        gemini.generate_response('apa gizi telur', nlp_result(), KB_DATA)
+        self.assertEqual(len(gemini.model.prompts), 2)
+        self.assertIsNone(gemini.get_model_info()['cache'])
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_leader_exception_reaches_waiters_and_key_is_released(self):
+        flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        errors = []
+
+        def failing():
+            started.set()
+            release.wait(5)
+            raise RuntimeError('API gagal')
+
+        def call(fn):
+            try:
+                flight.do('k', fn)
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        leader = threading.Thread(target=call, args=(failing,))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=call, args=(failing,)) for _ in range(3)]
+        for thread in followers:
+            thread.start()
+        wait_until(lambda: flight.coalesced == 3)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join()
+
+        self.assertEqual(errors, ['API gagal'] * 4)
+        self.assertEqual(flight.stats(), {'leaders': 1, 'coalesced': 3, 'in_flight': 0})
+        self.assertEqual(flight.do('k', lambda: 'lagi'), 'lagi')
+
+
+@patch.dict(os.environ, {'GOOGLE_API_KEY': 'test-key'})
+@patch.object(gemini_integration.genai, 'configure')
+@patch.object(gemini_integration.genai, 'GenerativeModel', side_effect=BlockingModel)
+class TestGeminiSingleFlight(unittest.TestCase):
+    def setUp(self):
+        BlockingModel.release = threading.Event()
+
+    def _ask_concurrently(self, gemini, messages):
+        results = [None] * len(messages)
+
+        def worker(index, message):
+            results[index] = gemini.generate_response(message, nlp_result(), KB_DATA)
+
+        threads = [threading.Thread(target=worker, args=item) for item in enumerate(messages)]
+        for thread in threads:
+            thread.start()
+        # Semua pemanggil selain yang pertama sudah menunggu panggilan yang sedang berjalan
+        wait_until(lambda: gemini._inflight.coalesced == len(messages) - 1)
+        BlockingModel.release.set()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_identical_questions_call_model_once(self, model_class, configure):
+        gemini = GeminiIntegration()
+        messages = ['Apa gizi telur?'] + ['apa gizi telur'] * 7
+        results = self._ask_concurrently(gemini, messages)
+
+        self.assertEqual(len(gemini.model.prompts), 1)
+        self.assertEqual(results, ['jawaban #1'] * 8)
+        info = gemini.get_model_info()
+        self.assertEqual(info['inflight'], {'leaders': 1, 'coalesced': 7, 'in_flight': 0})
+        # Permintaan berikutnya dilayani cache
+        self.assertEqual(gemini.generate_response('apa gizi telur', nlp_result(), KB_DATA), 'jawaban #1')
+        self.assertEqual(len(gemini.model.prompts), 1)
+
+    def test_coalescing_works_without_cache(self, model_class, configure):
+        gemini = GeminiIntegration(enable_cache=False)
+        results = self._ask_concurrently(gemini, ['apa gizi telur'] * 4)
+        self.assertEqual(results, ['jawaban #1'] * 4)
+        self.assertEqual(len(gemini.model.prompts), 1)
+
+    def test_different_questions_are_not_coalesced(self, model_class, configure):
+        gemini = GeminiIntegration()
+        BlockingModel.release.set()
+        threads = [threading.Thread(target=gemini.generate_response, args=(message, nlp_result(), KB_DATA))
+                   for message in ('apa gizi telur', 'apa gizi tahu', 'apa gizi ikan')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(gemini.model.prompts), 3)
+        self.assertEqual(gemini.get_model_info()['inflight']['coalesced'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
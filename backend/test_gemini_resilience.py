@@ -0,0 +1,190 @@
+# test_gemini_resilience.py
+import os
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from app import create_app
+from chatbot import gemini_integration
+from chatbot.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from chatbot.gemini_integration import GeminiIntegration, GeminiUnavailableError
+from routes import chat_routes
+
+KB_DATA = {}
+NLP_RESULT = {'intent': 'detail_nutrisi', 'entities': {'food_item': 'telur'}, 'context': [], 'confidence': 0.9}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class ScriptedModel:
+    """Pengganti GenerativeModel: ``behavior`` dipanggil untuk setiap prompt (exception = API gagal)."""
+    behavior = staticmethod(lambda: 'jawaban')
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+
+    def generate_content(self, prompt, generation_config=None):
+        self.calls += 1
+        return FakeResponse(type(self).behavior())
+
+
+def failing():
+    raise RuntimeError('503 Service Unavailable')
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_after_threshold_and_recovers_through_half_open(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CLOSED)  # kegagalan harus berturut-turut
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+        self.assertFalse(breaker.allow())
+
+        clock.now = 30
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertFalse(breaker.allow())  # hanya satu percobaan saat half-open
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+
+        clock.now = 60
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertEqual(breaker.stats()['times_opened'], 2)
+        self.assertEqual(breaker.stats()['rejected'], 2)
+
+
+@patch.dict(os.environ, {'GOOGLE_API_KEY': 'test-key'})
+@patch.object(gemini_integration.genai, 'configure')
+@patch.object(gemini_integration.genai, 'GenerativeModel', side_effect=ScriptedModel)
+class TestGeminiResilience(unittest.TestCase):
+    def tearDown(self):
+        ScriptedModel.behavior = staticmethod(lambda: 'jawaban')
+
+    def _gemini(self, **kwargs):
+        options = dict(enable_cache=False, fallback_model='gemini-2.0-flash')
+        options.update(kwargs)
+        gemini = GeminiIntegration(**options)
+        self.addCleanup(gemini.close)
+        return gemini
+
+    def test_timeout_is_enforced_without_waiting_for_hung_call(self, model_class, configure):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        ScriptedModel.behavior = staticmethod(lambda: release.wait(10) and 'terlambat')
+        gemini = self._gemini(timeout=0.2)
+
+        started = time.monotonic()
+        with self.assertRaises(GeminiUnavailableError):
+            gemini.generate_response('apa gizi telur', NLP_RESULT, KB_DATA)
+        self.assertLess(time.monotonic() - started, 2)
+
+    def test_executor_is_shared_and_bounded(self, model_class, configure):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        ScriptedModel.behavior = staticmethod(lambda: release.wait(10) and 'terlambat')
+        gemini = self._gemini(timeout=0.05, max_concurrency=2, circuit_failure_threshold=100)
+        executor = gemini._executor
+        threads_before = threading.active_count()
+
+        for i in range(5):
+            with self.assertRaises(GeminiUnavailableError):
+                gemini.generate_response(f'pertanyaan {i}', NLP_RESULT, KB_DATA)
+
+        self.assertIs(gemini._executor, executor)
+        self.assertLessEqual(threading.active_count() - threads_before, 2)
+        # Hanya dua panggilan yang sempat berjalan; sisanya dibatalkan saat masih antre
+        self.assertEqual(gemini.model.calls, 2)
+
+    def test_failure_falls_back_without_sleeping_on_request_thread(self, model_class, configure):
+        ScriptedModel.behavior = staticmethod(failing)
+        gemini = self._gemini(fallback_model='gemini-1.5-flash', circuit_failure_threshold=100)
+        started = time.monotonic()
+        with patch.object(gemini_integration.time, 'sleep') as sleep:
+            with self.assertRaises(GeminiUnavailableError):
+                gemini.generate_response('apa gizi telur', NLP_RESULT, KB_DATA)
+        self.assertLess(time.monotonic() - started, 0.5)
+        sleep.assert_not_called()
+        # Satu percobaan model utama, lalu langsung satu percobaan model fallback
+        self.assertEqual(gemini.model.calls, 1)
+        self.assertEqual(gemini.fallback_model_instance.calls, 1)
+
+        ScriptedModel.behavior = staticmethod(lambda: 'jawaban')
+        self.assertEqual(gemini.generate_response('apa gizi tahu', NLP_RESULT, KB_DATA), 'jawaban')
+        self.assertEqual(gemini.model.calls, 2)
+        self.assertEqual(gemini.fallback_model_instance.calls, 1)
+
+    def test_open_circuit_skips_the_api(self, model_class, configure):
+        ScriptedModel.behavior = staticmethod(failing)
+        gemini = self._gemini(circuit_failure_threshold=2)
+        for question in ('apa gizi telur', 'apa gizi ikan', 'apa gizi bayam'):
+            with self.assertRaises(GeminiUnavailableError):
+                gemini.generate_response(question, NLP_RESULT, KB_DATA)
+        # Circuit terbuka setelah request kedua gagal, request ketiga tidak memanggil API
+        self.assertEqual(gemini.model.calls, 2)
+        self.assertEqual(gemini.circuit_breaker.state, OPEN)
+
+        clock = FakeClock()
+        gemini.circuit_breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+        gemini.circuit_breaker.record_failure()
+        gemini.circuit_breaker.record_failure()
+        started = time.monotonic()
+        with self.assertRaises(GeminiUnavailableError):
+            gemini.generate_response('apa gizi tahu', NLP_RESULT, KB_DATA)
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(gemini.model.calls, 2)
+
+        ScriptedModel.behavior = staticmethod(lambda: 'pulih')
+        clock.now = 30
+        self.assertEqual(gemini.generate_response('apa gizi tahu', NLP_RESULT, KB_DATA), 'pulih')
+        self.assertEqual(gemini.get_model_info()['circuit_breaker']['state'], CLOSED)
+
+
+class TestChatRouteFallback(unittest.TestCase):
+    @patch.dict(os.environ, {'GOOGLE_API_KEY': 'test-key'})
+    @patch.object(gemini_integration.genai, 'configure')
+    @patch.object(gemini_integration.genai, 'GenerativeModel', side_effect=ScriptedModel)
+    def test_open_circuit_answers_with_local_generator(self, model_class, configure):
+        gemini = GeminiIntegration(enable_cache=False)
+        self.addCleanup(gemini.close)
+        for _ in range(gemini.circuit_breaker.failure_threshold):
+            gemini.circuit_breaker.record_failure()
+
+        app = create_app('testing')
+        with app.app_context():
+            engine = chat_routes.nlp_engine.get()
+        with patch.object(chat_routes, 'gemini_api_key', 'test-key'), \
+                patch.object(chat_routes.gemini_integration, 'get', return_value=gemini), \
+                patch.object(engine, 'process_message', return_value=dict(NLP_RESULT)) as process_message:
+            response = app.test_client().post('/api/chat', json={
+                'message': 'apa gizi telur', 'user_id': 'ibu', 'use_gemini': True
+            })
+
+        data = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['response_source'], 'local')
+        self.assertTrue(data['response'])
+        self.assertEqual(gemini.model.calls, 0)
+        process_message.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+# test_intent_classifier.py
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from chatbot.intent_classifier import IntentClassifier
+from chatbot.nlp_engine import NLPEngine
+
+
+class TestIntentClassifier(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.classifier = IntentClassifier(model_path=None).ensure_loaded()
+
+    def test_classifies_bundled_intents(self):
+        cases = {
+            'apa kandungan gizi telur?': 'detail_nutrisi',
+            'halo bunda': 'greeting',
+            'bagaimana cara mencegah stunting pada anak': 'pencegahan_stunting',
+            'makanan untuk trimester pertama': 'nutrisi_kehamilan',
+            'terima kasih ya': 'general_query',
+        }
+        results = self.classifier.classify_many(list(cases))
+        self.assertEqual([intent for intent, _ in results], list(cases.values()))
+
+    def test_single_message_path_matches_batch(self):
+        messages = ['Apa makanan yang baik untuk trimester pertama?', 'halo', 'zzz qqq', '']
+        batch = self.classifier.predict_proba(messages)
+        single = np.vstack([self.classifier.predict_proba([message]) for message in messages])
+        np.testing.assert_allclose(single, batch, atol=1e-12)
+        np.testing.assert_allclose(batch.sum(axis=1), 1.0)
+
+    def test_low_confidence_uses_fallback(self):
+        classifier = IntentClassifier(model_path=None, min_confidence=1.01)
+        classifier._set_model(self.classifier._vectorizers, self.classifier._coef,
+                              self.classifier._intercept, self.classifier.labels)
+        self.assertEqual(classifier.classify('halo')[0], 'general_query')
+        self.assertEqual(classifier.classify('halo', fallback=lambda text: 'dari_keyword')[0], 'dari_keyword')
+
+
+class TestIntentModelArtifact(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.intents_file = os.path.join(self.tmp.name, 'intents.json')
+        self.model_path = os.path.join(self.tmp.name, 'intent_model.joblib')
+        self.write_intents({'sapaan': ['halo', 'hai bunda', 'selamat pagi'],
+                            'gizi': ['kandungan gizi telur', 'vitamin bayam', 'protein ikan']})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_intents(self, intents):
+        with open(self.intents_file, 'w', encoding='utf-8') as f:
+            json.dump({'intents': [{'intent': name, 'examples': examples} for name, examples in intents.items()]}, f)
+
+    def classifier(self):
+        return IntentClassifier(self.intents_file, self.model_path, min_confidence=0.0)
+
+    def test_model_is_trained_once_and_loaded_lazily(self):
+        classifier = self.classifier()
+        self.assertFalse(classifier.is_loaded)
+        self.assertEqual(classifier.classify('halo')[0], 'sapaan')
+        self.assertTrue(os.path.exists(self.model_path))
+
+        reloaded = self.classifier()
+        reloaded.train = None  # artefak harus dimuat, bukan dilatih ulang
+        self.assertEqual(reloaded.classify('vitamin telur')[0], 'gizi')
+
+    def test_changed_training_data_retrains(self):
+        self.classifier().ensure_loaded()
+        self.write_intents({'sapaan': ['halo', 'hai bunda'], 'gizi': ['gizi telur', 'vitamin'],
+                            'stunting': ['cegah stunting', 'anak pendek']})
+        self.assertEqual(self.classifier().ensure_loaded().labels, ['gizi', 'sapaan', 'stunting'])
+
+
+class TestNLPEngineClassifierMode(unittest.TestCase):
+    def test_classifier_mode_with_keyword_fallback(self):
+        classifier = IntentClassifier(model_path=None).ensure_loaded()
+        engine = NLPEngine(intent_mode='classifier', intent_classifier=classifier)
+        self.assertEqual(engine.process_message('Berapa kandungan gizi telur?')['intent'], 'detail_nutrisi')
+
+        classifier.min_confidence = 1.01
+        # Semua prediksi jatuh ke deteksi keyword
+        self.assertEqual(engine.detect_intents(['halo bunda', 'cegah stunting']),
+                         ['greeting', 'pencegahan_stunting'])
+
+    def test_unknown_mode_is_rejected(self):
+        with self.assertRaises(ValueError):
+            NLPEngine(intent_mode='regex')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,244 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from flask_jwt_extended import create_access_token
+from flask_migrate import downgrade, upgrade
+from sqlalchemy import event, inspect, text
+
+from app import create_app
+from models import db
+from models.user import User
+from models.forum import Forum, compute_hot_score
+from models.comment import Comment
+from models.notification import Notification
+from models.daily_nutrition_log import DailyNutritionLog
+from models.weekly_assessment import WeeklyAssessment
+
+# Index yang ditambahkan migrasi 0002
+HOT_QUERY_INDEXES = {
+    'comments': 'ix_comments_forum_id_created_at_id',
+    'daily_nutrition_log': 'ix_daily_nutrition_log_user_id_date',
+    'forums': 'ix_forums_user_id_created_at_id',
+    'notifications': 'ix_notifications_user_id_is_read_created_at',
+    'weekly_assessments': 'ix_weekly_assessments_user_id_week_start_date_status',
+}
+
+# Sejak 0003 log harian dibaca lewat primary key (user_id, date)
+QUERY_PLAN_INDEXES = dict(HOT_QUERY_INDEXES, daily_nutrition_log='sqlite_autoindex_daily_nutrition_log_1')
+
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.app = create_app('testing', SQLALCHEMY_DATABASE_URI='sqlite:///' + os.path.join(self.tmpdir, 'app.db'),
+                              AUTO_CREATE_TABLES=False)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+
+    def tearDown(self):
+        db.session.remove()
+        db.engine.dispose()
+        self.ctx.pop()
+        shutil.rmtree(self.tmpdir)
+
+    def test_upgrade_matches_models(self):
+        upgrade()
+        with db.engine.connect() as conn:
+            diff = compare_metadata(MigrationContext.configure(conn), db.metadata)
+        self.assertEqual(diff, [])
+
+    def test_hot_query_indexes_added_and_removed(self):
+        upgrade(revision='0002')
+        inspector = inspect(db.engine)
+        for table, index in HOT_QUERY_INDEXES.items():
+            self.assertIn(index, {ix['name'] for ix in inspector.get_indexes(table)})
+
+        downgrade(revision='0001')
+        inspector = inspect(db.engine)
+        for table, index in HOT_QUERY_INDEXES.items():
+            self.assertNotIn(index, {ix['name'] for ix in inspector.get_indexes(table)})
+
+        upgrade()
+        downgrade(revision='base')
+        self.assertEqual(set(inspect(db.engine).get_table_names()), {'alembic_version'})
+
+    def test_daily_log_rows_are_summed_per_day(self):
+        upgrade(revision='0002')
+        day = date(2026, 3, 2)
+        with db.engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO users (id, username, email, password, age, height, weight) "
+                "VALUES (1, 'ibu', 'ibu@example.com', 'x', 28, 160, 55)"
+            ))
+            rows = [(400, 20, 0, 0), (600, 30, 0, 0), (0, 0, 500, 7.5)]
+            for calories, protein, water, sleep in rows:
+                conn.execute(text(
+                    "INSERT INTO daily_nutrition_log (user_id, date, daily_calories, daily_protein, daily_fat, "
+                    "daily_carbs, daily_folic_acid, daily_iron, daily_calcium, daily_zinc, daily_water, daily_sleep) "
+                    "VALUES (1, :day, :calories, :protein, 0, 0, 0, 0, 0, 0, :water, :sleep)"
+                ), {'day': day, 'calories': calories, 'protein': protein, 'water': water, 'sleep': sleep})
+
+        upgrade()
+        with db.engine.connect() as conn:
+            daily = conn.execute(text(
+                "SELECT daily_calories, daily_protein, daily_water, daily_sleep FROM daily_nutrition_log"
+            )).fetchall()
+            meals = conn.execute(text("SELECT calories, protein FROM meal_logs ORDER BY id")).fetchall()
+        self.assertEqual([tuple(row) for row in daily], [(1000, 50, 500, 7.5)])
+        self.assertEqual([tuple(row) for row in meals], [(400, 20), (600, 30)])
+
+        downgrade(revision='0002')
+        with db.engine.connect() as conn:
+            daily = conn.execute(text("SELECT daily_calories, daily_water FROM daily_nutrition_log")).fetchall()
+        self.assertEqual([tuple(row) for row in daily], [(1000, 500)])
+
+    def test_pre_series_database_gets_counters_backfilled(self):
+        # Database lama hasil db.create_all() yang ditandai 0001
+        upgrade(revision='0001')
+        with db.engine.begin() as conn:
+            for user_id in (1, 2, 3):
+                conn.execute(text(
+                    "INSERT INTO users (id, username, email, password, age, height, weight) "
+                    "VALUES (:id, :name, :email, 'x', 28, 160, 55)"
+                ), {'id': user_id, 'name': f'ibu{user_id}', 'email': f'ibu{user_id}@example.com'})
+            conn.execute(text(
+                "INSERT INTO forums (id, title, description, user_id, created_at, updated_at) "
+                "VALUES (1, 'Forum', 'Deskripsi', 1, '2026-03-02 08:00:00', '2026-03-02 08:00:00')"
+            ))
+            conn.execute(text(
+                "INSERT INTO likes (user_id, forum_id, is_like) VALUES (2, 1, 1), (3, 1, 1), (1, 1, 0)"
+            ))
+            conn.execute(text(
+                "INSERT INTO comments (id, content, user_id, forum_id) VALUES (1, 'Komentar', 2, 1)"
+            ))
+            conn.execute(text(
+                "INSERT INTO notifications (message, is_read, user_id, forum_id, comment_id) "
+                "VALUES ('Baru', 0, 1, 1, 1), ('Lama', 1, 1, 1, 1)"
+            ))
+
+        upgrade()
+        forum = Forum.query.get(1)
+        self.assertEqual((forum.like_count, forum.dislike_count, forum.comment_count), (2, 1, 1))
+        self.assertEqual(forum.hot_score, compute_hot_score(2, 1, forum.created_at))
+        self.assertEqual(User.query.get(1).unread_notification_count, 1)
+        response = self.app.test_client().get('/api/forums?sort=hot')
+        self.assertEqual(response.status_code, 200, response.get_data(as_text=True))
+
+        downgrade(revision='0003')
+        columns = {column['name'] for column in inspect(db.engine).get_columns('forums')}
+        self.assertNotIn('like_count', columns)
+        self.assertNotIn('chat_sessions', inspect(db.engine).get_table_names())
+
+
+class StatementRecorder:
+    """Merekam statement SELECT beserta parameternya selama blok with."""
+    def __init__(self, engine):
+        self.engine = engine
+        self.selects = []
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            self.selects.append((statement, parameters))
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._before_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._before_execute)
+
+
+class TestHotQueryPlans(unittest.TestCase):
+    """EXPLAIN QUERY PLAN untuk query utama setiap route harus memakai index komposit."""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        users = []
+        for i in range(3):
+            user = User(username=f"user{i}", email=f"user{i}@example.com", password="hashed",
+                        age=25, height=160, weight=55, lmp_date=date.today() - timedelta(weeks=10))
+            db.session.add(user)
+            users.append(user)
+        db.session.flush()
+
+        today = date.today()
+        week_start = today - timedelta(days=today.weekday())
+        for user in users:
+            for day in range(10):
+                db.session.add(DailyNutritionLog(user_id=user.id, date=today - timedelta(days=day)))
+            for week in range(4):
+                db.session.add(WeeklyAssessment(user_id=user.id, week_start_date=week_start - timedelta(weeks=week),
+                                                status='completed'))
+            for i in range(5):
+                forum = Forum(title=f"Forum {user.id}-{i}", description="Deskripsi", user_id=user.id)
+                db.session.add(forum)
+                db.session.flush()
+                for other in users:
+                    comment = Comment(content="Komentar", user_id=other.id, forum_id=forum.id)
+                    db.session.add(comment)
+                    db.session.flush()
+                    db.session.add(Notification(message="Notifikasi", user_id=user.id, forum_id=forum.id,
+                                                comment_id=comment.id, is_read=(i % 2 == 0)))
+        db.session.commit()
+
+        self.user_id = users[0].id
+        self.forum_id = Forum.query.filter_by(user_id=self.user_id).first().id
+        self.client = self.app.test_client()
+        self.headers = {'Authorization': f'Bearer {create_access_token(identity=str(self.user_id))}'}
+        db.session.remove()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _query_plans(self, path, table):
+        """Menjalankan route, lalu EXPLAIN untuk setiap SELECT yang membaca dari ``table``."""
+        with StatementRecorder(db.engine) as recorder:
+            response = self.client.get(path, headers=self.headers)
+        self.assertEqual(response.status_code, 200, response.get_data(as_text=True))
+
+        plans = []
+        with db.engine.connect() as conn:
+            for statement, parameters in recorder.selects:
+                if f'FROM {table}' not in statement:
+                    continue
+                rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+                plans.append((statement, [row[-1] for row in rows]))
+        self.assertTrue(plans, f'{path} tidak menjalankan SELECT pada {table}')
+        return plans
+
+    def assertUsesIndex(self, path, table):
+        index = QUERY_PLAN_INDEXES[table]
+        for statement, details in self._query_plans(path, table):
+            self.assertTrue(any(index in detail for detail in details), (statement, details))
+            self.assertFalse(any(detail.startswith(f'SCAN {table}') and 'INDEX' not in detail
+                                 for detail in details), (statement, details))
+
+    def test_today_nutrition_log(self):
+        self.assertUsesIndex('/nutrition/log/today', 'daily_nutrition_log')
+
+    def test_weekly_assessment_status(self):
+        self.assertUsesIndex('/assessment/status', 'weekly_assessments')
+
+    def test_notification_list(self):
+        self.assertUsesIndex('/api/notifications', 'notifications')
+
+    def test_forum_comments(self):
+        self.assertUsesIndex(f'/api/forums/{self.forum_id}/comments', 'comments')
+
+    def test_my_forums(self):
+        self.assertUsesIndex('/api/forums/me', 'forums')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+# test_moderation.py
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+from flask import Flask
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from models import db
+from models.user import User
+from models.forum import Forum
+from models.comment import Comment
+from models.like import Like
+from models.notification import Notification
+from models.daily_nutrition import DailyNutrition
+from models.daily_nutrition_log import DailyNutritionLog
+from models.weekly_assessment import WeeklyAssessment
+from utils.aho_corasick import AhoCorasick
+from utils.moderation import DEFAULT_FORBIDDEN_WORDS_FILE, ForbiddenWordList, check_content, find_forbidden_words
+
+
+class TestAhoCorasick(unittest.TestCase):
+    def test_overlapping_and_nested_patterns(self):
+        automaton = AhoCorasick(['he', 'she', 'his', 'hers'])
+        matches = [(start, pattern) for start, _, pattern in automaton.iter_matches('ushers')]
+        self.assertEqual(matches, [(1, 'she'), (2, 'he'), (2, 'hers')])
+
+    def test_whole_words_only(self):
+        automaton = AhoCorasick(['babi', 'kata kasar'])
+        self.assertIsNone(automaton.search('kebabian', whole_words=True))
+        self.assertIsNotNone(automaton.search('kebabian'))
+        self.assertEqual(automaton.findall('dasar babi! ini kata kasar.', whole_words=True), ['babi', 'kata kasar'])
+        self.assertIsNone(automaton.search('kata kasarnya', whole_words=True))
+
+    def test_duplicates_and_empty_patterns_are_ignored(self):
+        automaton = AhoCorasick(['abc', '', 'abc'])
+        self.assertEqual(len(automaton), 1)
+        self.assertEqual(automaton.findall('abc abc'), ['abc'])
+
+
+class TestForbiddenWordList(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'words.txt')
+        self._write(['tolol', '# komentar', ''])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, words):
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(words))
+
+    def test_reloads_when_file_changes(self):
+        word_list = ForbiddenWordList(self.path, check_interval=0)
+        first = word_list.automaton()
+        self.assertEqual(first.patterns, ['tolol'])
+        # Tanpa perubahan file automaton yang sama dipakai ulang
+        self.assertIs(word_list.automaton(), first)
+
+        self._write(['tolol', 'goblok'])
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.assertEqual(word_list.automaton().patterns, ['tolol', 'goblok'])
+
+    def test_missing_file_uses_default_list(self):
+        word_list = ForbiddenWordList(os.path.join(self.tmp.name, 'tidak-ada.txt'))
+        self.assertIn('kata_terlarang_1', word_list.automaton().patterns)
+
+    def test_check_content_uses_configured_file(self):
+        app = Flask(__name__)
+        app.config['FORBIDDEN_WORDS_FILE'] = self.path
+        with app.app_context():
+            self.assertTrue(check_content('Dasar TOLOL'))
+            self.assertFalse(check_content('Tololnya bukan kata utuh'))
+            self.assertEqual(find_forbidden_words('tolol, tolol'), ['tolol'])
+            self.assertFalse(check_content(''))
+
+    def test_default_list_allows_nutrition_questions_about_pork_and_dog_meat(self):
+        app = Flask(__name__)
+        app.config['FORBIDDEN_WORDS_FILE'] = DEFAULT_FORBIDDEN_WORDS_FILE
+        with app.app_context():
+            self.assertFalse(check_content('Boleh makan daging babi saat hamil?'))
+            self.assertFalse(check_content('Apakah daging anjing aman untuk ibu hamil?'))
+            self.assertFalse(check_content('Benarkah kurang gizi membuat anak bodoh?'))
+            self.assertEqual(find_forbidden_words('Dasar babi, dasar ANJING'), ['dasar babi', 'dasar anjing'])
+
+
+class TestModerationRoutes(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, 'words.txt')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('goblok\n')
+
+        self.app = create_app('testing', FORBIDDEN_WORDS_FILE=path)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        user = User(username="bunda", email="bunda@example.com", password="hashed", age=28,
+                    height=160, weight=55, lmp_date=date.today() - timedelta(weeks=12))
+        db.session.add(user)
+        db.session.commit()
+        self.client = self.app.test_client()
+        self.headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        self.tmp.cleanup()
+
+    def test_forum_and_comment_with_forbidden_words_are_rejected(self):
+        response = self.client.post('/api/forums', headers=self.headers,
+                                    json={'title': 'Pertanyaan goblok', 'description': 'Deskripsi forum biasa'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Forum.query.count(), 0)
+
+        response = self.client.post('/api/forums', headers=self.headers,
+                                    json={'title': 'Pertanyaan biasa', 'description': 'Deskripsi forum biasa'})
+        self.assertEqual(response.status_code, 201)
+        forum_id = response.get_json()['forum']['id']
+
+        response = self.client.post(f'/api/forums/{forum_id}/comments', headers=self.headers,
+                                    json={'content': 'Dasar GOBLOK'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Comment.query.count(), 0)
+
+        response = self.client.post(f'/api/forums/{forum_id}/comments', headers=self.headers,
+                                    json={'content': 'Terima kasih infonya'})
+        self.assertEqual(response.status_code, 201)
+        comment_id = response.get_json()['comment']['id']
+
+        response = self.client.put(f'/api/comments/{comment_id}', headers=self.headers, json={'content': 'goblok'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.put(f'/api/forums/{forum_id}', headers=self.headers, json={'title': 'goblok'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_nutrition_question_about_pork_is_accepted_with_default_list(self):
+        self.app.config['FORBIDDEN_WORDS_FILE'] = DEFAULT_FORBIDDEN_WORDS_FILE
+        question = 'Boleh makan daging babi saat hamil?'
+
+        response = self.client.post('/api/forums', headers=self.headers,
+                                    json={'title': question, 'description': 'Daging anjing juga sering ditawarkan'})
+        self.assertEqual(response.status_code, 201)
+        forum_id = response.get_json()['forum']['id']
+
+        response = self.client.put(f'/api/forums/{forum_id}', headers=self.headers,
+                                   json={'description': question})
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.post(f'/api/forums/{forum_id}/comments', headers=self.headers,
+                                    json={'content': question})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Comment.query.count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+# test_nlp_engine.py
+import unittest
+
+from chatbot.nlp_engine import NLPEngine
+
+
+class TestKeywordMatcher(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = NLPEngine()
+
+    def test_intent_and_entities_in_one_pass(self):
+        result = self.engine.process_message('Apa makanan yang baik untuk trimester pertama?')
+        self.assertEqual(result['intent'], 'nutrisi_kehamilan')
+        self.assertEqual(result['entities'], {'trimester': 'pertama'})
+        self.assertIn('rekomendasi_makanan', result['context'])
+
+    def test_affixed_words_still_match(self):
+        self.assertEqual(self.engine.process_message('Selama kehamilannya ibu butuh apa?')['intent'],
+                         'nutrisi_kehamilan')
+
+    def test_short_keywords_need_whole_words(self):
+        self.assertEqual(self.engine.process_message('Hi bunda')['intent'], 'greeting')
+        # 'hi' di dalam 'sehingga' dan 'hilang' tidak dihitung sebagai sapaan
+        self.assertEqual(self.engine.process_message('sehingga hilang')['intent'], 'general_query')
+
+    def test_later_entity_overrides_earlier_one(self):
+        # Urutan tabel: ikan_salmon lalu ikan, sama seperti loop substring sebelumnya
+        self.assertEqual(self.engine.process_message('kandungan gizi ikan salmon')['entities'],
+                         {'food_item': 'ikan'})
+
+    def test_ties_go_to_first_intent(self):
+        # 'nutrisi' ada di nutrisi_kehamilan dan detail_nutrisi
+        self.assertEqual(self.engine.process_message('nutrisi')['intent'], 'nutrisi_kehamilan')
+
+    def test_rebuilt_after_keyword_table_changes(self):
+        engine = NLPEngine()
+        engine.entity_keywords['alpukat'] = ['alpukat']
+        engine._build_keyword_matcher()
+        self.assertEqual(engine.process_message('jus alpukat')['entities'], {'food_item': 'alpukat'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,474 @@
+# test_notifications.py
+import os
+import tempfile
+import time
+import unittest
+from datetime import date, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from models import db
+from models.user import User
+from models.forum import Forum
+from models.comment import Comment
+from models.like import Like
+from models.notification import Notification
+from models.daily_nutrition import DailyNutrition
+from models.daily_nutrition_log import DailyNutritionLog
+from models.weekly_assessment import WeeklyAssessment
+from services.notification_service import (
+    adjust_unread_count, discard_notifications, get_unread_count, mark_notification_read, reconcile_unread_counts
+)
+from services.notification_hub import InProcessBackend, notification_hub, user_channel
+from services.notification_dispatcher import (
+    NotificationEvent, coalesce_events, notification_dispatcher, write_notification_batch
+)
+from test_forum_queries import QueryCounter
+
+
+def create_test_app(database_uri='sqlite://', **config):
+    return create_app('testing', SQLALCHEMY_DATABASE_URI=database_uri, **config)
+
+
+def seed_users_and_forum(test):
+    users = []
+    for i in range(3):
+        user = User(
+            username=f"user{i}",
+            email=f"user{i}@example.com",
+            password="hashed",
+            age=25,
+            height=160,
+            weight=55,
+            lmp_date=date.today() - timedelta(weeks=10)
+        )
+        db.session.add(user)
+        users.append(user)
+    db.session.commit()
+    test.user_ids = [user.id for user in users]
+
+    forum = Forum(title="Forum pemilik", description="Deskripsi forum pengujian", user_id=test.user_ids[0])
+    db.session.add(forum)
+    db.session.commit()
+    test.forum_id = forum.id
+
+
+class TestNotificationFeed(unittest.TestCase):
+    def setUp(self):
+        self.app = create_test_app()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        seed_users_and_forum(self)
+
+        self.client = self.app.test_client()
+        db.session.remove()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _auth(self, user_id):
+        return {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+
+    def _comment(self, user_id, content='Komentar baru'):
+        response = self.client.post(
+            f'/api/forums/{self.forum_id}/comments',
+            json={'content': content},
+            headers=self._auth(user_id)
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.get_json()['comment']['id']
+
+    def _unread(self):
+        db.session.remove()
+        return get_unread_count(self.user_ids[0])
+
+    def test_counter_follows_comment_like_and_read(self):
+        owner = self.user_ids[0]
+        self._comment(self.user_ids[1])
+        self._comment(self.user_ids[2])
+        self.client.post(f'/api/forums/{self.forum_id}/like', json={'is_like': True}, headers=self._auth(self.user_ids[1]))
+        self.assertEqual(self._unread(), 3)
+
+        # Komentar/like pemilik forum sendiri tidak membuat notifikasi
+        self._comment(owner)
+        self.assertEqual(self._unread(), 3)
+
+        notification_id = Notification.query.filter_by(user_id=owner).first().id
+        response = self.client.post(f'/api/notifications/{notification_id}/read', headers=self._auth(owner))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._unread(), 2)
+
+        # Menandai ulang notifikasi yang sama tidak mengurangi counter lagi
+        self.client.post(f'/api/notifications/{notification_id}/read', headers=self._auth(owner))
+        self.assertEqual(self._unread(), 2)
+
+        self.client.post('/api/notifications/read-all', headers=self._auth(owner))
+        self.assertEqual(self._unread(), 0)
+
+    def test_concurrent_mark_read_decrements_once(self):
+        owner = self.user_ids[0]
+        self._comment(self.user_ids[1])
+        self._comment(self.user_ids[2])
+
+        # Request kedua sudah memuat notifikasi (belum dibaca) sebelum request pertama menulis
+        stale = Notification.query.filter_by(user_id=owner).first()
+        self.assertFalse(stale.is_read)
+        Notification.query.filter_by(id=stale.id).update({Notification.is_read: True}, synchronize_session=False)
+        adjust_unread_count(owner, -1)
+
+        self.assertFalse(mark_notification_read(stale))
+        db.session.commit()
+        self.assertEqual(self._unread(), 1)
+
+    def test_discard_counts_only_rows_it_deleted(self):
+        owner = self.user_ids[0]
+        self._comment(self.user_ids[1])
+        self._comment(self.user_ids[2])
+        first = Notification.query.filter_by(user_id=owner).first()
+        first.is_read = True
+        db.session.query(User).filter_by(id=owner).update(
+            {User.unread_notification_count: User.unread_notification_count - 1})
+        db.session.commit()
+
+        self.assertEqual(discard_notifications(Notification.forum_id == self.forum_id), 2)
+        db.session.commit()
+        self.assertEqual(self._unread(), 0)
+        self.assertEqual(Notification.query.count(), 0)
+
+    def test_deleting_comment_discards_unread_notification(self):
+        comment_id = self._comment(self.user_ids[1])
+        self.assertEqual(self._unread(), 1)
+
+        response = self.client.delete(f'/api/comments/{comment_id}', headers=self._auth(self.user_ids[1]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._unread(), 0)
+        self.assertEqual(Notification.query.count(), 0)
+
+    def test_deleting_forum_discards_unread_notifications(self):
+        self._comment(self.user_ids[1])
+        self._comment(self.user_ids[2])
+        self.assertEqual(self._unread(), 2)
+
+        response = self.client.delete(f'/api/forums/{self.forum_id}', headers=self._auth(self.user_ids[0]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._unread(), 0)
+
+    def test_unread_count_is_single_lookup(self):
+        for _ in range(5):
+            self._comment(self.user_ids[1])
+
+        db.session.remove()
+        with QueryCounter(db.engine) as counter:
+            response = self.client.get('/api/notifications/unread-count', headers=self._auth(self.user_ids[0]))
+        self.assertEqual(response.get_json()['unread_count'], 5)
+        self.assertEqual(counter.count, 1, counter.statements)
+
+    def test_page_mode_is_bounded_and_unread_first(self):
+        owner = self.user_ids[0]
+        for i in range(25):
+            self._comment(self.user_ids[1], content=f'Komentar {i}')
+        read_id = Notification.query.filter_by(user_id=owner).order_by(Notification.id.desc()).first().id
+        self.client.post(f'/api/notifications/{read_id}/read', headers=self._auth(owner))
+
+        response = self.client.get('/api/notifications', headers=self._auth(owner))
+        data = response.get_json()
+        self.assertEqual(len(data['notifications']), 20)
+        self.assertTrue(data['has_more'])
+        self.assertEqual(data['unread_count'], 24)
+        self.assertTrue(all(not n['is_read'] for n in data['notifications']))
+
+        data = self.client.get('/api/notifications?page=2', headers=self._auth(owner)).get_json()
+        self.assertEqual(len(data['notifications']), 5)
+        self.assertFalse(data['has_more'])
+        self.assertEqual(data['notifications'][-1]['id'], read_id)
+
+    def test_cursor_mode_uses_page_mode_order(self):
+        owner = self.user_ids[0]
+        for i in range(25):
+            self._comment(self.user_ids[1], content=f'Komentar {i}')
+        read_id = Notification.query.filter_by(user_id=owner).order_by(Notification.id.desc()).first().id
+        self.client.post(f'/api/notifications/{read_id}/read', headers=self._auth(owner))
+
+        page_ids = []
+        for page in (1, 2):
+            data = self.client.get(f'/api/notifications?page={page}', headers=self._auth(owner)).get_json()
+            page_ids += [n['id'] for n in data['notifications']]
+
+        cursor_ids, cursor = [], ''
+        while True:
+            data = self.client.get(f'/api/notifications?per_page=10&cursor={cursor}',
+                                   headers=self._auth(owner)).get_json()
+            cursor_ids += [n['id'] for n in data['notifications']]
+            if not data['has_more']:
+                break
+            cursor = data['next_cursor']
+
+        self.assertEqual(len(page_ids), 25)
+        self.assertEqual(cursor_ids, page_ids)
+        self.assertEqual(cursor_ids[-1], read_id)
+
+    def test_reconcile_fixes_drifted_counter(self):
+        self._comment(self.user_ids[1])
+        User.query.filter_by(id=self.user_ids[0]).update({User.unread_notification_count: 42})
+        User.query.filter_by(id=self.user_ids[1]).update({User.unread_notification_count: -1})
+        db.session.commit()
+
+        self.assertEqual(reconcile_unread_counts(), 2)
+        self.assertEqual(self._unread(), 1)
+        self.assertEqual(get_unread_count(self.user_ids[1]), 0)
+        self.assertEqual(reconcile_unread_counts(), 0)
+
+
+class TestNotificationDispatcher(unittest.TestCase):
+    """Dispatcher background dengan database SQLite berbasis file (dipakai bersama oleh thread worker)."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.app = create_test_app(
+            f"sqlite:///{os.path.join(self.tmp.name, 'test.db')}",
+            NOTIFICATION_ASYNC=True,
+            NOTIFICATION_BATCH_WINDOW=0.05,
+            NOTIFICATION_COALESCE_WINDOW=1.0
+        )
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        seed_users_and_forum(self)
+        self.client = self.app.test_client()
+        db.session.remove()
+
+    def tearDown(self):
+        notification_dispatcher.shutdown()
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        self.tmp.cleanup()
+
+    def _auth(self, user_id):
+        return {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+
+    def _like(self, user_id, is_like=True):
+        response = self.client.post(f'/api/forums/{self.forum_id}/like', json={'is_like': is_like},
+                                    headers=self._auth(user_id))
+        self.assertEqual(response.status_code, 200)
+
+    def _messages(self):
+        db.session.remove()
+        return [n.message for n in Notification.query.order_by(Notification.id).all()]
+
+    def test_request_does_not_write_notification_inline(self):
+        with QueryCounter(db.engine) as counter:
+            response = self.client.post(
+                f'/api/forums/{self.forum_id}/comments',
+                json={'content': 'Komentar baru'},
+                headers=self._auth(self.user_ids[1])
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(any(s.startswith('INSERT INTO notifications') for s in counter.statements))
+
+        self.assertTrue(notification_dispatcher.flush())
+        self.assertEqual(self._messages(), ["user1 mengomentari forum Anda 'Forum pemilik'"])
+        self.assertEqual(get_unread_count(self.user_ids[0]), 1)
+
+    def test_like_toggles_are_coalesced(self):
+        # like -> dislike -> like oleh aktor yang sama dalam jendela coalescing, walau
+        # jaraknya melebihi batch window: satu notifikasi
+        self._like(self.user_ids[1], True)
+        time.sleep(0.15)
+        self._like(self.user_ids[1], False)
+        time.sleep(0.15)
+        self._like(self.user_ids[1], True)
+        # like -> batal: tidak ada notifikasi
+        self._like(self.user_ids[2], True)
+        self._like(self.user_ids[2], True)
+
+        self.assertTrue(notification_dispatcher.flush())
+        self.assertEqual(self._messages(), ["user1 menyukai forum Anda 'Forum pemilik'"])
+        self.assertEqual(get_unread_count(self.user_ids[0]), 1)
+
+    def test_shutdown_flushes_pending_events(self):
+        for _ in range(5):
+            self.client.post(f'/api/forums/{self.forum_id}/comments', json={'content': 'Komentar'},
+                             headers=self._auth(self.user_ids[1]))
+        notification_dispatcher.shutdown()
+        self.assertEqual(len(self._messages()), 5)
+        self.assertEqual(get_unread_count(self.user_ids[0]), 5)
+
+    def test_events_for_deleted_forum_are_skipped(self):
+        forum = Forum.query.get(self.forum_id)
+        events = [NotificationEvent('like', forum.user_id, self.user_ids[1], forum.id, forum.title, None)]
+        db.session.delete(forum)
+        db.session.commit()
+
+        self.assertEqual(write_notification_batch(events), [])
+        self.assertEqual(self._messages(), [])
+
+    def test_coalesce_keeps_comments_and_last_reaction(self):
+        events = [
+            NotificationEvent('comment', 1, '2', 10, 'Forum', 100),
+            NotificationEvent('like', 1, '2', 10, 'Forum', None),
+            NotificationEvent('comment', 1, '2', 10, 'Forum', 101),
+            NotificationEvent('dislike', 1, 2, 10, 'Forum', None),
+            NotificationEvent('like', 1, '3', 10, 'Forum', None),
+            NotificationEvent('unreact', 1, '3', 10, 'Forum', None),
+        ]
+        coalesced = coalesce_events(events)
+        self.assertEqual([(e.kind, e.comment_id) for e in coalesced],
+                         [('comment', 100), ('comment', 101), ('dislike', None), ('unreact', None)])
+
+    def test_unreact_retracts_written_like_notification(self):
+        forum = Forum.query.get(self.forum_id)
+        like = NotificationEvent('like', forum.user_id, self.user_ids[1], forum.id, forum.title, None)
+        other = NotificationEvent('like', forum.user_id, self.user_ids[2], forum.id, forum.title, None)
+        write_notification_batch([like, other])
+        self.assertEqual(get_unread_count(self.user_ids[0]), 2)
+
+        write_notification_batch([like._replace(kind='unreact')])
+        self.assertEqual(self._messages(), ["user2 menyukai forum Anda 'Forum pemilik'"])
+        self.assertEqual(get_unread_count(self.user_ids[0]), 1)
+
+        # Reaksi baru menggantikan notifikasi reaksi sebelumnya yang belum dibaca
+        write_notification_batch([other._replace(kind='dislike')])
+        self.assertEqual(self._messages(), ["user2 tidak menyukai forum Anda 'Forum pemilik'"])
+        self.assertEqual(get_unread_count(self.user_ids[0]), 1)
+
+
+class TestNotificationStream(unittest.TestCase):
+    def setUp(self):
+        self.app = create_test_app(SSE_HEARTBEAT_SECONDS=0.05, SSE_MAX_STREAM_SECONDS=5)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        seed_users_and_forum(self)
+        self.client = self.app.test_client()
+        self.backend = self.app.extensions['notification_hub']
+        db.session.remove()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _auth(self, user_id, **headers):
+        headers['Authorization'] = f'Bearer {create_access_token(identity=str(user_id))}'
+        return headers
+
+    def _comment(self, user_id):
+        response = self.client.post(f'/api/forums/{self.forum_id}/comments', json={'content': 'Komentar baru'},
+                                    headers=self._auth(user_id))
+        self.assertEqual(response.status_code, 201)
+
+    def _next_event(self, chunks):
+        """Membaca chunk SSE berikutnya yang bukan heartbeat."""
+        for chunk in chunks:
+            text = chunk.decode('utf-8')
+            if not text.startswith(':') and not text.startswith('retry'):
+                return text
+        return None
+
+    def test_stream_pushes_new_notifications(self):
+        owner = self.user_ids[0]
+        response = self.client.get('/api/notifications/stream', headers=self._auth(owner), buffered=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        chunks = response.response
+
+        self.assertIn('event: unread_count', self._next_event(chunks))
+        self.assertEqual(self.backend.subscriber_count(user_channel(owner)), 1)
+
+        self._comment(self.user_ids[1])
+        event = self._next_event(chunks)
+        notification_id = Notification.query.one().id
+        self.assertIn(f'id: {notification_id}', event)
+        self.assertIn('event: notification', event)
+        self.assertIn('mengomentari forum Anda', event)
+
+        response.close()
+        self.assertEqual(self.backend.subscriber_count(user_channel(owner)), 0)
+
+    def test_stream_catches_up_notifications_from_other_workers(self):
+        owner = self.user_ids[0]
+        self._comment(self.user_ids[1])  # sudah ada sebelum stream dibuka, tidak dikirim ulang
+        response = self.client.get('/api/notifications/stream', headers=self._auth(owner), buffered=False)
+        chunks = response.response
+        self.assertIn('event: unread_count', self._next_event(chunks))
+
+        # Ditulis "worker lain": masuk database tanpa lewat backend pub/sub proses ini
+        notification = Notification(message='Dari worker lain', user_id=owner, forum_id=self.forum_id)
+        db.session.add(notification)
+        db.session.commit()
+        notification_id = notification.id
+        db.session.remove()
+
+        event = self._next_event(chunks)
+        self.assertIn(f'id: {notification_id}', event)
+        self.assertIn('Dari worker lain', event)
+        response.close()
+
+    def test_stream_replays_after_last_event_id(self):
+        owner = self.user_ids[0]
+        for _ in range(3):
+            self._comment(self.user_ids[1])
+        first_id = Notification.query.order_by(Notification.id).first().id
+
+        response = self.client.get('/api/notifications/stream', buffered=False,
+                                   headers=self._auth(owner, **{'Last-Event-ID': str(first_id)}))
+        chunks = response.response
+        self.assertIn('"unread_count": 3', self._next_event(chunks))
+        self.assertIn(f'id: {first_id + 1}', self._next_event(chunks))
+        self.assertIn(f'id: {first_id + 2}', self._next_event(chunks))
+        response.close()
+
+    def test_streams_per_worker_are_capped(self):
+        self.app.extensions['notification_streams'].limit = 1
+        first = self.client.get('/api/notifications/stream', headers=self._auth(self.user_ids[0]), buffered=False)
+        self.assertEqual(first.status_code, 200)
+
+        rejected = self.client.get('/api/notifications/stream', headers=self._auth(self.user_ids[1]), buffered=False)
+        self.assertEqual(rejected.status_code, 503)
+        self.assertEqual(rejected.headers['Retry-After'], '10')
+        self.assertEqual(self.backend.subscriber_count(user_channel(self.user_ids[1])), 0)
+
+        # Slot dilepas saat stream pertama ditutup
+        first.close()
+        second = self.client.get('/api/notifications/stream', headers=self._auth(self.user_ids[1]), buffered=False)
+        self.assertEqual(second.status_code, 200)
+        second.close()
+        self.assertEqual(self.app.extensions['notification_streams'].active, 0)
+
+    def test_stream_requires_token(self):
+        response = self.client.get('/api/notifications/stream')
+        self.assertEqual(response.status_code, 401)
+
+    def test_in_process_backend_fans_out_and_drops_oldest(self):
+        backend = InProcessBackend(subscriber_queue_size=2)
+        first = backend.subscribe('kanal')
+        second = backend.subscribe('kanal')
+        self.assertEqual(backend.publish('kanal', 1), 2)
+        backend.publish('kanal', 2)
+        backend.publish('kanal', 3)
+
+        self.assertEqual([first.get(0), first.get(0), first.get(0)], [2, 3, None])
+        self.assertEqual(second.get(0), 2)
+        first.close()
+        second.close()
+        self.assertEqual(backend.publish('kanal', 4), 0)
+
+    def test_in_process_backend_with_several_workers_is_logged(self):
+        with self.assertLogs('services.notification_hub', level='WARNING') as logs:
+            create_test_app(GUNICORN_WORKERS=4)
+        self.assertIn('4 worker', logs.output[0])
+
+    def test_backend_is_pluggable_from_config(self):
+        app = create_test_app(
+            NOTIFICATION_PUBSUB_BACKEND='services.notification_hub:InProcessBackend'
+        )
+        self.assertIsInstance(app.extensions['notification_hub'], InProcessBackend)
+
+
+if __name__ == '__main__':
+    unittest.main()
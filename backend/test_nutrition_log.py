@@ -0,0 +1,201 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import date, timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app
+from models import db
+from models.user import User
+from models.daily_nutrition_log import DailyNutritionLog
+from models.meal_log import MealLog
+from services import nutrition_service
+from services.nutrition_service import add_to_daily_log, get_daily_log, record_meal
+
+
+def _create_user():
+    user = User(username="ibu", email="ibu@example.com", password="hashed", age=28, height=160, weight=55,
+                lmp_date=date.today() - timedelta(weeks=12))
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+class TestDailyNutritionLog(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.user_id = _create_user()
+        self.client = self.app.test_client()
+        self.headers = {'Authorization': f'Bearer {create_access_token(identity=str(self.user_id))}'}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_meals_are_logged_and_summed_into_one_daily_row(self):
+        for calories, protein in ((450, 20), (700, 35)):
+            response = self.client.post('/food_detection/store_nutritional_info', headers=self.headers,
+                                        json={'calories': calories, 'protein': protein, 'fat': 10, 'carbs': 60})
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(MealLog.query.filter_by(user_id=self.user_id).count(), 2)
+        self.assertEqual(DailyNutritionLog.query.count(), 1)
+        log = get_daily_log(self.user_id, date.today())
+        self.assertEqual(log.daily_calories, 1150)
+        self.assertEqual(log.daily_protein, 55)
+        self.assertEqual(log.daily_fat, 20)
+        self.assertEqual(log.daily_iron, 0)
+
+    def test_invalid_meal_value_is_rejected(self):
+        response = self.client.post('/food_detection/store_nutritional_info', headers=self.headers,
+                                    json={'calories': 'banyak'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(MealLog.query.count(), 0)
+
+    def test_water_and_sleep_increment_the_same_row(self):
+        for expected in (250, 500):
+            response = self.client.post('/food_detection/log/water', headers=self.headers)
+            self.assertEqual(response.get_json()['new_total_water'], expected)
+        response = self.client.post('/food_detection/log/sleep', headers=self.headers, json={'hours': 6.5})
+        self.assertEqual(response.get_json()['new_total_sleep'], 6.5)
+        self.client.post('/food_detection/store_nutritional_info', headers=self.headers, json={'calories': 300})
+
+        self.assertEqual(DailyNutritionLog.query.count(), 1)
+        data = self.client.get('/food_detection/log/today', headers=self.headers).get_json()
+        self.assertEqual(data['daily_water'], 500)
+        self.assertEqual(data['daily_sleep'], 6.5)
+        self.assertEqual(data['daily_calories'], 300)
+
+    def test_today_log_without_entries_is_zero_and_not_stored(self):
+        data = self.client.get('/food_detection/log/today', headers=self.headers).get_json()
+        self.assertEqual(data['daily_water'], 0)
+        self.assertEqual(data['date'], date.today().isoformat())
+        data = self.client.get('/nutrition/log/today', headers=self.headers).get_json()
+        self.assertEqual(data['daily_calories'], 0)
+        self.assertEqual(DailyNutritionLog.query.count(), 0)
+
+    def test_summary_reads_daily_row_by_primary_key(self):
+        record_meal(self.user_id, {'calories': 500, 'protein': 25})
+        record_meal(self.user_id, {'calories': 250})
+        add_to_daily_log(self.user_id, date.today(), daily_water=750, daily_sleep=7)
+        # Hari lain tidak ikut terhitung
+        record_meal(self.user_id, {'calories': 900}, day=date.today() - timedelta(days=1))
+        db.session.commit()
+        self.client.get('/nutrition/summary', headers=self.headers)  # membuat target nutrisi
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            response = self.client.get('/nutrition/summary', headers=self.headers)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        consumed = response.get_json()['consumed']
+        self.assertEqual(consumed['daily_calories'], 750)
+        self.assertEqual(consumed['daily_protein'], 25)
+        self.assertEqual(consumed['daily_water'], 750)
+        self.assertEqual(consumed['daily_sleep'], 7)
+        daily_reads = [s for s in statements if 'FROM daily_nutrition_log' in s]
+        self.assertEqual(len(daily_reads), 1, daily_reads)
+        self.assertNotIn('sum(', daily_reads[0].lower())
+        self.assertIn('daily_nutrition_log.user_id = ? AND daily_nutrition_log.date = ?', daily_reads[0])
+
+    def test_unknown_column_is_rejected(self):
+        with self.assertRaises(ValueError):
+            add_to_daily_log(self.user_id, date.today(), daily_coffee=1)
+
+    @patch.dict(nutrition_service._ON_CONFLICT_INSERTS, clear=True)
+    def test_dialect_without_native_upsert_updates_or_inserts(self):
+        add_to_daily_log(self.user_id, date.today(), daily_water=250)
+        add_to_daily_log(self.user_id, date.today(), daily_water=250, daily_sleep=7)
+        db.session.commit()
+
+        log = get_daily_log(self.user_id, date.today())
+        self.assertEqual((log.daily_water, log.daily_sleep), (500, 7))
+        self.assertEqual(DailyNutritionLog.query.count(), 1)
+
+    @patch.dict(nutrition_service._ON_CONFLICT_INSERTS, clear=True)
+    def test_insert_race_without_native_upsert_retries_the_update(self):
+        table = DailyNutritionLog.__table__
+        execute = db.session.execute
+        statements = []
+
+        def racing_execute(statement, *args, **kwargs):
+            statements.append(statement)
+            if len(statements) == 1:
+                # Request lain membuat baris tepat setelah UPDATE pertama tidak menemukan apa pun
+                execute(table.insert().values(**nutrition_service._daily_insert_values(
+                    self.user_id, date.today(), {'daily_water': 250})))
+                return SimpleNamespace(rowcount=0)
+            return execute(statement, *args, **kwargs)
+
+        with patch.object(db.session, 'execute', side_effect=racing_execute):
+            add_to_daily_log(self.user_id, date.today(), daily_water=500)
+        db.session.commit()
+
+        # UPDATE, INSERT yang bentrok, lalu UPDATE ulang
+        self.assertEqual(len(statements), 3)
+        self.assertEqual(get_daily_log(self.user_id, date.today()).daily_water, 750)
+        self.assertEqual(DailyNutritionLog.query.count(), 1)
+
+
+class TestConcurrentDailyLog(unittest.TestCase):
+    """Increment dari banyak thread tidak boleh hilang (upsert atomik, bukan baca-ubah-tulis)."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.app = create_app(
+            'testing',
+            SQLALCHEMY_DATABASE_URI='sqlite:///' + os.path.join(self.tmpdir, 'nutrition.db'),
+            SQLALCHEMY_ENGINE_OPTIONS={'connect_args': {'check_same_thread': False, 'timeout': 30}}
+        )
+        with self.app.app_context():
+            db.create_all()
+            self.user_id = _create_user()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(self.tmpdir)
+
+    def test_concurrent_water_increments_are_not_lost(self):
+        with self.app.app_context():
+            headers = {'Authorization': f'Bearer {create_access_token(identity=str(self.user_id))}'}
+        errors = []
+
+        def worker():
+            client = self.app.test_client()
+            for _ in range(10):
+                response = client.post('/food_detection/log/water', headers=headers)
+                if response.status_code != 200:
+                    errors.append(response.get_json())
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        with self.app.app_context():
+            self.assertEqual(get_daily_log(self.user_id, date.today()).daily_water, 40 * 250)
+            self.assertEqual(DailyNutritionLog.query.count(), 1)
+
+    @patch.dict(nutrition_service._ON_CONFLICT_INSERTS, clear=True)
+    def test_concurrent_increments_without_native_upsert_are_not_lost(self):
+        self.test_concurrent_water_increments_are_not_lost()
+
+
+if __name__ == '__main__':
+    unittest.main()
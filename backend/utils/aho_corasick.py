@@ -0,0 +1,99 @@
+from collections import deque
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == '_'
+
+
+def on_word_boundary(text, start, end):
+    """True jika text[start:end] diapit batas kata (seperti \\b pada regex)."""
+    if start > 0 and _is_word_char(text[start - 1]) and _is_word_char(text[start]):
+        return False
+    if end < len(text) and _is_word_char(text[end]) and _is_word_char(text[end - 1]):
+        return False
+    return True
+
+
+class AhoCorasick:
+    """
+    Automaton Aho-Corasick untuk mencari banyak pola sekaligus dalam satu kali lintasan teks.
+
+    Waktu pencarian O(panjang teks + jumlah kecocokan), tidak bergantung pada jumlah pola.
+    Pola dan teks dicocokkan apa adanya; lakukan lower() sebelumnya untuk pencocokan
+    tanpa membedakan huruf besar/kecil.
+    """
+
+    def __init__(self, patterns):
+        # State 0 adalah root; setiap state menyimpan transisi karakter -> state
+        self._goto = [{}]
+        self._fail = [0]
+        # Pola yang berakhir di setiap state (termasuk lewat rantai fail)
+        self._output = [()]
+        self.patterns = []
+
+        for pattern in patterns:
+            if pattern:
+                self._add(pattern)
+        self._build()
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def _add(self, pattern):
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+                self._goto[state][ch] = next_state
+            state = next_state
+        if pattern not in self._output[state]:
+            self._output[state] = self._output[state] + (pattern,)
+            self.patterns.append(pattern)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def iter_matches(self, text, whole_words=False):
+        """
+        Menghasilkan (start, end, pattern) untuk setiap kecocokan, berurutan menurut posisi akhir.
+
+        Dengan whole_words=True, kecocokan harus diapit batas kata (seperti \\b pada regex).
+        """
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+        for index, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not output[state]:
+                continue
+            end = index + 1
+            for pattern in output[state]:
+                start = end - len(pattern)
+                if whole_words and not on_word_boundary(text, start, end):
+                    continue
+                yield start, end, pattern
+
+    def search(self, text, whole_words=False):
+        """Mengembalikan kecocokan pertama (start, end, pattern) atau None."""
+        return next(self.iter_matches(text, whole_words), None)
+
+    def findall(self, text, whole_words=False):
+        """Daftar pola unik yang ditemukan, sesuai urutan kemunculan."""
+        return list(dict.fromkeys(pattern for _, _, pattern in self.iter_matches(text, whole_words)))
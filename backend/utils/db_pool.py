@@ -0,0 +1,105 @@
+import threading
+import time
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+class PoolMetrics:
+    """Counter checkout/tunggu pool koneksi; aman dipakai banyak thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.connects = 0
+            self.timeouts = 0
+            self.waited = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+
+    def record_checkout(self, wait, timed_out=False, waited_threshold=0.001):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            if wait >= waited_threshold:
+                self.waited += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def snapshot(self):
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                'checkouts': self.checkouts,
+                'connects': self.connects,
+                'timeouts': self.timeouts,
+                'waited': self.waited,
+                'wait_total_ms': round(self.wait_total * 1000, 3),
+                'wait_avg_ms': round(self.wait_total * 1000 / attempts, 3) if attempts else 0.0,
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool yang mencatat lama menunggu koneksi, jumlah checkout, koneksi fisik
+    baru (termasuk reconnect setelah pre-ping/recycle), dan timeout.
+
+    Metrics dibawa ke pool baru saat engine.dispose() membuat ulang pool.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_checkout(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record_checkout(time.perf_counter() - started)
+        return record
+
+    def _create_connection(self):
+        record = super()._create_connection()
+        self.metrics.record_connect()
+        return record
+
+
+def pool_status(engine):
+    """
+    Status pool engine: ukuran, koneksi yang sedang dipakai, dan metrics checkout.
+
+    Pool selain TimedQueuePool (mis. StaticPool SQLite) hanya melaporkan nama kelasnya.
+    """
+    pool = engine.pool
+    status = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'max_overflow': pool._max_overflow,
+            'checked_out': pool.checkedout(),
+            'overflow': max(pool.overflow(), 0),
+            'idle': pool.checkedin(),
+        })
+    metrics = getattr(pool, 'metrics', None)
+    if metrics is not None:
+        status.update(metrics.snapshot())
+    return status
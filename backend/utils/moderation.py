@@ -1,7 +1,99 @@
-import re
-from flask import current_app
+import os
+import threading
+import time
+from flask import current_app, has_app_context
 from models.forum import Forum
 from models.comment import Comment
+from utils.aho_corasick import AhoCorasick
+
+DEFAULT_FORBIDDEN_WORDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'forbidden_words.txt')
+
+# Fallback jika file daftar kata tidak ditemukan
+DEFAULT_FORBIDDEN_WORDS = [
+    "kata_terlarang_1",
+    "kata_terlarang_2"
+]
+
+# Interval minimal (detik) antar pemeriksaan mtime file daftar kata
+RELOAD_CHECK_INTERVAL = 1.0
+
+
+class ForbiddenWordList:
+    """
+    Daftar kata terlarang yang dimuat sekali ke automaton Aho-Corasick.
+
+    File dibaca ulang hanya jika mtime-nya berubah; pemeriksaan mtime dibatasi
+    paling sering sekali per RELOAD_CHECK_INTERVAL detik.
+    """
+
+    def __init__(self, path, check_interval=RELOAD_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+        self._automaton = None
+
+    def _read_words(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                words = [line.strip().lower() for line in file]
+        except OSError:
+            words = DEFAULT_FORBIDDEN_WORDS
+        return [word for word in words if word and not word.startswith('#')]
+
+    def _current_mtime(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def automaton(self):
+        now = time.monotonic()
+        if self._automaton is not None and now - self._checked_at < self.check_interval:
+            return self._automaton
+
+        with self._lock:
+            if self._automaton is not None and now - self._checked_at < self.check_interval:
+                return self._automaton
+            mtime = self._current_mtime()
+            if self._automaton is None or mtime != self._mtime:
+                self._automaton = AhoCorasick(self._read_words())
+                self._mtime = mtime
+            self._checked_at = now
+            return self._automaton
+
+
+_word_lists = {}
+_word_lists_lock = threading.Lock()
+
+
+def get_forbidden_word_list(path=None):
+    """Mengambil daftar kata terlarang (dibagi antar request) untuk path tertentu."""
+    if path is None:
+        path = DEFAULT_FORBIDDEN_WORDS_FILE
+        if has_app_context():
+            path = current_app.config.get('FORBIDDEN_WORDS_FILE') or path
+
+    word_list = _word_lists.get(path)
+    if word_list is None:
+        with _word_lists_lock:
+            word_list = _word_lists.setdefault(path, ForbiddenWordList(path))
+    return word_list
+
+
+def find_forbidden_words(content):
+    """
+    Mencari kata terlarang (utuh per kata, tanpa membedakan huruf besar/kecil)
+
+    Returns:
+        list: Kata terlarang yang ditemukan
+    """
+    if not content:
+        return []
+    return get_forbidden_word_list().automaton().findall(content.lower(), whole_words=True)
+
 
 def check_content(content):
     """
@@ -13,26 +105,9 @@ def check_content(content):
     Returns:
         bool: True jika konten mengandung kata terlarang
     """
-    # Load forbidden words from file
-    try:
-        with open(current_app.config['FORBIDDEN_WORDS_FILE'], 'r') as file:
-            forbidden_words = [line.strip() for line in file.readlines()]
-    except:
-        # Fallback to default list if file not found
-        forbidden_words = [
-            "kata_terlarang_1",
-            "kata_terlarang_2"
-        ]
-    
-    # Convert content to lowercase for case-insensitive checking
-    content_lower = content.lower()
-    
-    # Check for forbidden words
-    for word in forbidden_words:
-        if word and re.search(r'\b' + re.escape(word) + r'\b', content_lower):
-            return True
-    
-    return False
+    if not content:
+        return False
+    return get_forbidden_word_list().automaton().search(content.lower(), whole_words=True) is not None
 
 def auto_moderate_forum(forum_id):
     """
@@ -0,0 +1,139 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+# Batas maksimal item per halaman untuk mode cursor
+MAX_CURSOR_LIMIT = 100
+
+
+class InvalidCursorError(ValueError):
+    """Exception raised when a pagination cursor cannot be decoded or does not match the query."""
+    pass
+
+
+class CursorPage:
+    """Hasil satu halaman keyset pagination."""
+    def __init__(self, items, next_cursor, has_more, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.has_more = has_more
+        self.total = total
+
+    def to_dict(self, items_key, serialize):
+        """Membentuk dictionary respons API dengan daftar item pada items_key."""
+        data = {
+            items_key: [serialize(item) for item in self.items],
+            'next_cursor': self.next_cursor,
+            'has_more': self.has_more
+        }
+        if self.total is not None:
+            data['total'] = self.total
+        return data
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and 'dt' in value:
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+
+def encode_cursor(values, scope):
+    """
+    Membuat cursor opaque dari nilai kunci item terakhir.
+
+    Args:
+        values: Nilai kolom kunci (mis. [created_at, id]) dari item terakhir
+        scope: Penanda urutan query (mis. 'created_at:desc') agar cursor
+               tidak dipakai ulang pada urutan yang berbeda
+    """
+    payload = json.dumps({'s': scope, 'v': [_encode_value(v) for v in values]}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, scope):
+    """Mengembalikan nilai kunci dari cursor, raise InvalidCursorError jika tidak valid."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        values = [_decode_value(v) for v in payload['v']]
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursorError('Cursor tidak valid')
+
+    if payload.get('s') != scope:
+        raise InvalidCursorError('Cursor tidak sesuai dengan urutan yang diminta')
+    return values
+
+
+def _seek_condition(columns, values, descending):
+    """
+    Kondisi (c1, c2, ...) < (v1, v2, ...) yang portabel untuk MySQL dan SQLite.
+
+    Batas c1 <= v1 di depan memberi database range seek pada index,
+    sisanya (OR) hanya memfilter baris dengan nilai c1 yang sama.
+    ``descending`` berisi arah untuk setiap kolom.
+    """
+    clauses = []
+    for i, column in enumerate(columns):
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        compare = column < values[i] if descending[i] else column > values[i]
+        clauses.append(and_(*equal_prefix, compare))
+
+    leading = columns[0] <= values[0] if descending[0] else columns[0] >= values[0]
+    return and_(leading, or_(*clauses))
+
+
+def keyset_paginate(query, columns, key, cursor=None, limit=10, descending=True,
+                    with_total=True, scope=''):
+    """
+    Keyset (cursor) pagination: tanpa OFFSET, biaya per halaman konstan.
+
+    Args:
+        query: Query yang belum diberi ORDER BY/LIMIT
+        columns: Kolom kunci berurutan, kolom terakhir harus unik (mis. id)
+        key: Fungsi yang mengambil nilai kunci dari satu item hasil query
+        cursor: Cursor dari halaman sebelumnya, None/'' untuk halaman pertama
+        limit: Jumlah item per halaman (dibatasi MAX_CURSOR_LIMIT)
+        descending: Arah urutan, bool untuk semua kolom atau list bool per kolom
+        with_total: False untuk melewati COUNT(*)
+        scope: Penanda urutan yang disimpan di dalam cursor
+    """
+    limit = max(1, min(limit or 10, MAX_CURSOR_LIMIT))
+    if isinstance(descending, bool):
+        descending = [descending] * len(columns)
+
+    total = query.order_by(None).count() if with_total else None
+
+    if cursor:
+        values = decode_cursor(cursor, scope)
+        if len(values) != len(columns):
+            raise InvalidCursorError('Cursor tidak valid')
+        query = query.filter(_seek_condition(columns, values, descending))
+
+    order = [c.desc() if desc else c.asc() for c, desc in zip(columns, descending)]
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    items = rows[:limit]
+    next_cursor = encode_cursor(key(items[-1]), scope) if has_more else None
+
+    return CursorPage(items, next_cursor, has_more, total)
+
+
+def cursor_args(args):
+    """
+    Membaca parameter mode cursor dari request.args.
+
+    Returns:
+        tuple: (cursor, with_total), cursor None berarti mode page/per_page lama
+    """
+    if 'cursor' not in args:
+        return None, True
+    with_total = args.get('include_total', 'true').lower() not in ('0', 'false', 'no')
+    return args.get('cursor', ''), with_total